@@ -1,13 +1,28 @@
 from flask import Flask, request, render_template, redirect, jsonify, make_response, session, url_for
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.schema import CreateIndex, CreateTable
 from flask_jwt_extended import (
     JWTManager, create_access_token, jwt_required,
     get_jwt_identity, unset_jwt_cookies
 )
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from collections import OrderedDict
 from datetime import timedelta
 import os
 import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from password_hasher import HasherBusy, PasswordHasher
+from score_writer import ScoreWriter
+from game_store import DatabaseGameStore, MemoryGameStore, SQLiteGameStore
+from metrics import Registry, instrument
+from profiler import RequestProfiler
 
 
 app = Flask(__name__)
@@ -15,6 +30,50 @@ app.config['SECRET_KEY'] = 'supersecretkey'
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URI")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Pooled connections; SQLite waits on a locked database instead of failing
+if (app.config['SQLALCHEMY_DATABASE_URI'] or "").startswith("sqlite"):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {"connect_args": {"timeout": 5}}
+    # In-memory SQLite gets Flask-SQLAlchemy's single-connection StaticPool,
+    # which takes no pool sizing
+    if make_url(app.config['SQLALCHEMY_DATABASE_URI']).database not in (None, "", ":memory:"):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'].update(pool_size=5, max_overflow=5)
+else:
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {"pool_size": 5, "max_overflow": 10, "pool_pre_ping": True, "pool_recycle": 300}
+
+# Score writes: "sync" commits each score in its request; "group" queues it
+# and returns once its batch is committed; "async" returns as soon as it is
+# queued (write-behind, the last few ms of scores can be lost on a crash).
+# Batches only form from requests in flight at once in one process: under
+# single-threaded sync gunicorn workers every "group" batch holds one score,
+# so it needs threaded (gthread) workers to commit fewer times.
+app.config['SCORE_WRITE_MODE'] = os.getenv('SCORE_WRITE_MODE', 'sync')
+app.config['SCORE_BATCH_SIZE'] = int(os.getenv('SCORE_BATCH_SIZE', 200))
+app.config['SCORE_FLUSH_INTERVAL'] = float(os.getenv('SCORE_FLUSH_INTERVAL', 0.02))
+# WAL + synchronous=NORMAL survives app crashes; FULL also survives power loss
+app.config['SQLITE_SYNCHRONOUS'] = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+
+# Password hashing pool, one per worker process. The Procfile runs gthread
+# workers with REQUEST_THREADS threads each; at most half of them may wait on
+# a hash, beyond that logins get a 503 instead of starving game requests. The
+# WEB_CONCURRENCY workers' pools together use about half the cores.
+# PASSWORD_HASH_METHOD pins the werkzeug method (e.g. "scrypt:32768:8:1");
+# otherwise scrypt's N is calibrated to the target latency, never below
+# werkzeug's default. Weaker hashes are upgraded on login.
+app.config['REQUEST_THREADS'] = int(os.getenv('REQUEST_THREADS', 8))
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv(
+    'PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2 // int(os.getenv('WEB_CONCURRENCY', 1)))))
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.getenv('PASSWORD_HASH_MAX_PENDING', max(1, app.config['REQUEST_THREADS'] // 2)))
+app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD')
+app.config['PASSWORD_HASH_TARGET_MS'] = int(os.getenv('PASSWORD_HASH_TARGET_MS', 250))
+
+# Game state lives server-side; the session cookie only carries the game id.
+# "database" keeps it in the app's database, shared by every worker and host;
+# "sqlite" in a local file shared by workers on one host; "memory" in the
+# process, only for a single worker.
+app.config['GAME_STORE'] = os.getenv('GAME_STORE', 'database')
+app.config['GAME_STORE_PATH'] = os.getenv('GAME_STORE_PATH', os.path.join(app.instance_path, 'games.db'))
+app.config['GAME_TTL'] = int(os.getenv('GAME_TTL', 1800))
+
 # JWT Settings
 app.config["JWT_SECRET_KEY"] = os.getenv('JWT_SECRET_KEY', 'defaultjwtsecret')
 app.config["JWT_TOKEN_LOCATION"] = ["cookies"]
@@ -26,6 +85,36 @@ app.config["JWT_COOKIE_CSRF_PROTECT"] = False
 db = SQLAlchemy(app)
 jwt = JWTManager(app)
 
+# Prometheus metrics on /metrics; METRICS_DIR merges every gunicorn worker
+metrics = Registry(os.getenv('METRICS_DIR'))
+# Sampling profiler for single requests, off unless PROFILE_TOKEN is set
+profiler = RequestProfiler(
+    token=os.getenv('PROFILE_TOKEN'),
+    directory=os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'guess-the-number-profiles')),
+)
+instrument(app, metrics, profiler)
+cache_lookups = metrics.counter('cache_requests_total', 'Cache lookups by cache and result.', ['cache', 'result'])
+
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={app.config['SQLITE_SYNCHRONOUS']}")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    metrics.phases.observe(time.perf_counter() - conn.info["query_started"].pop(), phase="db")
+
 
 # --- Models ---
 class User(db.Model):
@@ -37,9 +126,278 @@ class User(db.Model):
 
 class HighScore(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(50), nullable=False)
+    username = db.Column(db.String(50), nullable=False, index=True)
+    score = db.Column(db.Integer, nullable=False)
+
+
+# Best score per user, kept up to date by submit_score() so the leaderboard
+# never has to GROUP BY the whole score history.
+class BestScore(db.Model):
+    username = db.Column(db.String(50), primary_key=True)
     score = db.Column(db.Integer, nullable=False)
 
+
+db.Index('ix_best_score_rank', BestScore.score.desc(), BestScore.username)
+
+
+# In-progress games for GAME_STORE=database
+class Game(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    owner = db.Column(db.String(80), nullable=False)
+    target = db.Column(db.Integer, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False)
+    game_over = db.Column(db.Boolean, nullable=False)
+    expires = db.Column(db.Float, nullable=False, index=True)
+
+
+# --- Credentials ---
+hasher = PasswordHasher(
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+    method=app.config['PASSWORD_HASH_METHOD'],
+    target_ms=app.config['PASSWORD_HASH_TARGET_MS'],
+    timer=metrics.timed,
+)
+
+# Usernames recently found not to exist, so repeated bad logins skip the DB.
+# Short TTL: a user registered through another worker is only refused briefly.
+UNKNOWN_USER_TTL = 30
+UNKNOWN_USER_MAX = 10000
+_unknown_users = {}
+
+def find_password_hash(username):
+    expires = _unknown_users.get(username)
+    if expires is not None:
+        if expires > time.monotonic():
+            cache_lookups.inc(cache="unknown_users", result="hit")
+            return None
+        _unknown_users.pop(username, None)
+    cache_lookups.inc(cache="unknown_users", result="miss")
+
+    # Single-column lookup on the unique username index
+    pwhash = db.session.execute(db.select(User.password).where(User.username == username)).scalar()
+    if pwhash is None:
+        if len(_unknown_users) >= UNKNOWN_USER_MAX:
+            _unknown_users.clear()
+        _unknown_users[username] = time.monotonic() + UNKNOWN_USER_TTL
+    return pwhash
+
+
+def busy_response():
+    resp = jsonify({"msg": "Server busy, please try again"})
+    resp.headers["Retry-After"] = "1"
+    return resp, 503
+
+
+_db_ready = False
+_db_lock = threading.Lock()
+
+def upsert_best(stmt):
+    """Make an INSERT into best_score keep the higher score on a clash."""
+    return stmt.on_conflict_do_update(
+        index_elements=[BestScore.username],
+        set_={'score': stmt.excluded.score},
+        where=stmt.excluded.score > BestScore.score,
+    )
+
+
+def init_db():
+    # IF NOT EXISTS instead of create_all()'s check-then-create, which races
+    # other workers starting at the same time. It also adds indexes put on a
+    # model after its table already existed.
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            conn.execute(CreateTable(table, if_not_exists=True))
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+    backfill_best_scores()
+    db.session.commit()
+
+
+def backfill_best_scores():
+    # Every worker may get here at once on an upgraded database; as an upsert
+    # the losers only rewrite the same maxima instead of hitting the key
+    if BestScore.query.first() is not None or HighScore.query.first() is None:
+        return
+    best = db.select(HighScore.username, db.func.max(HighScore.score)) \
+        .where(db.true()).group_by(HighScore.username)  # WHERE keeps SQLite from reading ON CONFLICT as a join
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite_insert if dialect == 'sqlite' else pg_insert
+        db.session.execute(upsert_best(insert(BestScore).from_select(['username', 'score'], best)))
+        return
+    for username, score in db.session.execute(best).all():
+        record_best_score(username, score)
+
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Create tables and indexes and backfill best scores, before serving."""
+    init_db()
+    print("✅ Database ready")
+
+
+@app.before_request
+def ensure_db():
+    global _db_ready
+    if _db_ready:
+        return
+    with _db_lock:
+        if _db_ready:
+            return
+        init_db()
+        _db_ready = True
+
+
+def record_best_score(username, score):
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite_insert if dialect == 'sqlite' else pg_insert
+        db.session.execute(upsert_best(insert(BestScore).values(username=username, score=score)))
+        return
+    best = db.session.get(BestScore, username)
+    if best is None:
+        db.session.add(BestScore(username=username, score=score))
+    elif score > best.score:
+        best.score = score
+
+
+def write_scores(items):
+    with app.app_context():
+        db.session.add_all([HighScore(username=username, score=score) for username, score in items])
+        best = {}
+        for username, score in items:
+            best[username] = max(score, best.get(username, score))
+        for username, score in best.items():
+            record_best_score(username, score)
+        db.session.commit()
+    invalidate_leaderboard_cache()
+
+
+score_writer = ScoreWriter(
+    write_scores,
+    batch_size=app.config['SCORE_BATCH_SIZE'],
+    flush_interval=app.config['SCORE_FLUSH_INTERVAL'],
+)
+metrics.callback('score_writer_batches_total', 'Score batches committed by the writer thread.', [],
+                 lambda: {(): score_writer.batches})
+metrics.callback('score_writer_scores_total', 'Scores written by the writer thread.', [],
+                 lambda: {(): score_writer.written})
+metrics.callback('score_writer_dropped_total', 'Queued scores dropped after failing to write.', [],
+                 lambda: {(): score_writer.dropped})
+
+
+# --- Game state ---
+MAX_ATTEMPTS = 7
+
+if app.config['GAME_STORE'] == 'sqlite':
+    games = SQLiteGameStore(app.config['GAME_STORE_PATH'], ttl=app.config['GAME_TTL'])
+elif app.config['GAME_STORE'] == 'memory':
+    games = MemoryGameStore(ttl=app.config['GAME_TTL'])
+else:
+    games = DatabaseGameStore(Game.__table__, lambda: db.engine, ttl=app.config['GAME_TTL'])
+
+
+def current_game():
+    game_id = session.get("game_id")
+    if not game_id:
+        return None, None
+    state = games.get(game_id)
+    if state is None or state.owner != get_jwt_identity():
+        return game_id, None
+    return game_id, state
+
+
+# A guess only counts if the game is unchanged since it was read; a rejected
+# guess reveals nothing about the target
+GUESS_CONFLICT = "Another guess or submission changed this game first; try again."
+
+def apply_guess(state, guess):
+    if state.game_over:
+        return "The game is over."
+    try:
+        guess = int(guess)
+    except ValueError:
+        return "Invalid input. Enter a number between 1 and 50 or 'q' to quit."
+
+    if not 1 <= guess <= 50:
+        message = "Guess must be between 1 and 50."
+    elif guess == state.target:
+        message = "Correct! You guessed the number!"
+        state.game_over = True
+    elif guess < state.target:
+        message = "Too low!"
+    else:
+        message = "Too high!"
+    state.attempts -= 1
+    if state.attempts <= 0 and not state.game_over:
+        message = "Game Over! No attempts left."
+        state.game_over = True
+    return message
+
+
+# --- Leaderboard ---
+LEADERBOARD_TTL = 30  # seconds; other workers only see new scores after this
+LEADERBOARD_MAX_PER_PAGE = 100
+LEADERBOARD_CACHE_SIZE = 256  # pages kept per worker, least recently used first out
+
+_leaderboard_cache = OrderedDict()
+_leaderboard_lock = threading.Lock()
+
+def invalidate_leaderboard_cache():
+    with _leaderboard_lock:
+        _leaderboard_cache.clear()
+
+
+def leaderboard_page(page=1, per_page=20):
+    key = (page, per_page)
+    now = time.monotonic()
+    with _leaderboard_lock:
+        cached = _leaderboard_cache.get(key)
+        if cached:
+            _leaderboard_cache.move_to_end(key)
+    if cached and cached[0] > now:
+        cache_lookups.inc(cache="leaderboard", result="hit")
+        return cached[1]
+    cache_lookups.inc(cache="leaderboard", result="miss")
+
+    # Pages past the end show the last page, and never reach the database as
+    # an OFFSET too large for it
+    total = BestScore.query.count()
+    page = min(page, max(-(-total // per_page), 1))
+    rows = BestScore.query.order_by(BestScore.score.desc(), BestScore.username) \
+        .offset((page - 1) * per_page).limit(per_page).all()
+    entries = []
+    for i, row in enumerate(rows):
+        if i == 0:
+            rank = user_rank(row.username, row.score)
+        elif row.score < rows[i - 1].score:
+            rank = (page - 1) * per_page + i + 1
+        entries.append({"rank": rank, "username": row.username, "high_score": row.score})
+    result = {"page": page, "per_page": per_page, "total": total, "entries": entries}
+    with _leaderboard_lock:
+        _leaderboard_cache[key] = (now + LEADERBOARD_TTL, result)
+        _leaderboard_cache.move_to_end(key)
+        while len(_leaderboard_cache) > LEADERBOARD_CACHE_SIZE:
+            _leaderboard_cache.popitem(last=False)
+    return result
+
+
+def user_rank(username, score=None):
+    # Competition ranking: users with the same best score share a rank
+    if score is None:
+        best = db.session.get(BestScore, username)
+        if best is None:
+            return None
+        score = best.score
+    return BestScore.query.filter(BestScore.score > score).count() + 1
+
+
+def page_args():
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", 20, type=int), 1), LEADERBOARD_MAX_PER_PAGE)
+    return page, per_page
+
 # --- Home Route ---
 @app.route("/", methods=["GET"])
 @jwt_required(optional=True)
@@ -70,10 +428,14 @@ def register():
     if len(password) < 4:
         return "Password must be at least 4 characters", 400
 
-    hashed_pw = generate_password_hash(password)
+    try:
+        hashed_pw = hasher.hash(password)
+    except HasherBusy:
+        return busy_response()
     new_user = User(username=username, password=hashed_pw)
     db.session.add(new_user)
     db.session.commit()
+    _unknown_users.pop(username, None)
     return redirect(url_for('login'))
 
 
@@ -87,11 +449,25 @@ def login():
     username = data.get("username")
     password = data.get("password")
 
-    user = User.query.filter_by(username=username).first()
-
-    if not user or not check_password_hash(user.password, password):
+    if not username or not password:
         return jsonify({"msg": "Invalid credentials"}), 401
 
+    pwhash = find_password_hash(username)
+    try:
+        if pwhash is None or not hasher.verify(pwhash, password):
+            return jsonify({"msg": "Invalid credentials"}), 401
+    except HasherBusy:
+        return busy_response()
+
+    if hasher.needs_rehash(pwhash):
+        # Hash parameters changed since this password was stored; when the
+        # pool is busy the upgrade simply waits for a later login.
+        try:
+            User.query.filter_by(username=username).update({"password": hasher.hash(password)})
+            db.session.commit()
+        except HasherBusy:
+            pass
+
     access_token = create_access_token(identity=username)
     resp = jsonify({"msg": "Login successful"})
     resp.set_cookie("access_token_cookie", access_token, httponly=True)
@@ -116,82 +492,120 @@ def logout():
 @jwt_required()
 def start_game():
     target = random.randint(1, 50)
-    session["target"] = target
-    session["attempts"] = 7
-    session["game_over"] = False
+    old_game_id = session.get("game_id")
+    if old_game_id:
+        games.delete(old_game_id)
+    session["game_id"] = games.create(get_jwt_identity(), target, MAX_ATTEMPTS)
     return redirect("/play_game")  # Redirects to game screen
 
 
 @app.route("/play_game", methods=["GET", "POST"])
 @jwt_required()
 def play_game():
-    if 'target' not in session:
+    game_id, state = current_game()
+    if state is None:
         return redirect(url_for('welcome'))
 
     message = ""
-    game_over = session.get('game_over', False)
-    attempts = session.get('attempts', 0)
-
     if request.method == "POST":
         guess = request.form.get("guess", "").strip()
         if guess.lower() == 'q':
-            session['game_over'] = True
+            # A quit game is not scored, so it is simply dropped
+            games.delete(game_id)
             return redirect(url_for('leaderboard'))
-
-        try:
-            guess = int(guess)
-            target = session.get('target')
-            if not 1 <= guess <= 50:
-                message = "Guess must be between 1 and 50."
-            elif guess == target:
-                message = "Correct! You guessed the number!"
-                session['game_over'] = True
-            elif guess < target:
-                message = "Too low!"
-            else:
-                message = "Too high!"
-            session['attempts'] -= 1
-            if session['attempts'] <= 0 and not session['game_over']:
-                message = "Game Over! No attempts left."
-                session['game_over'] = True
-        except ValueError:
-            message = "Invalid input. Enter a number between 1 and 50 or 'q' to quit."
+        attempts = state.attempts
+        message = apply_guess(state, guess)
+        if state.attempts != attempts and not games.save(game_id, state, attempts):
+            return GUESS_CONFLICT, 409
 
     return render_template(
         "game.html",
         message=message,
-        attempts=session.get('attempts', 0),
-        game_over=session.get('game_over', False)
+        attempts=state.attempts,
+        game_over=state.game_over,
+        target=state.target if state.game_over else None
     )
 
 
+@app.route("/api/guess", methods=["POST"])
+@jwt_required()
+def guess_api():
+    game_id, state = current_game()
+    if state is None:
+        return jsonify({"msg": "No active game"}), 404
+
+    data = request.get_json(silent=True) or {}
+    guess = str(data.get("guess", "")).strip()
+    if guess.lower() == 'q':
+        games.delete(game_id)
+        return jsonify({"message": "Quit.", "attempts": state.attempts, "game_over": True,
+                        "redirect": url_for('leaderboard')})
+
+    attempts = state.attempts
+    message = apply_guess(state, guess)
+    if state.attempts != attempts and not games.save(game_id, state, attempts):
+        return jsonify({"msg": GUESS_CONFLICT}), 409
+    result = {"message": message, "attempts": state.attempts, "game_over": state.game_over}
+    if state.game_over:
+        result["target"] = state.target
+    return jsonify(result)
+
+
 @app.route("/submit_score", methods=["POST"])
 @jwt_required()
 def submit_score():
+    # The score is what the server-side game record says: the attempts left
+    # when it finished. Anything the client posts is ignored.
+    game_id, state = current_game()
+    # Deleting the game claims it, so each game is scored at most once
+    if state is None or not state.game_over or not games.delete(game_id):
+        return jsonify({"msg": "No finished game to score"}), 400
+    username = get_jwt_identity()
+    score = state.attempts
     try:
-        data = request.get_json()
-        score = data.get("score")
-        username = get_jwt_identity()
-        if not username or score is None:
-            return jsonify({"msg": "Missing username or score"}), 400
-        new_score = HighScore(username=username, score=int(score))
+        mode = app.config['SCORE_WRITE_MODE']
+        if mode in ("group", "async"):
+            if not score_writer.submit((username, score), wait=(mode == "group")):
+                games.restore(game_id, state)
+                return jsonify({"msg": "Too many score submissions, try again shortly"}), 503
+            return jsonify({"msg": "Score submitted successfully!"}), 200
+
+        new_score = HighScore(username=username, score=score)
         db.session.add(new_score)
+        record_best_score(username, score)
         db.session.commit()
+        invalidate_leaderboard_cache()
         return jsonify({"msg": "Score submitted successfully!"}), 200
     except Exception as e:
+        # Put the game back so the score can be submitted again
+        games.restore(game_id, state)
         return jsonify({"msg": "Error processing score submission", "error": str(e)}), 500
 
 
 @app.route("/leaderboard", methods=["GET"])
 @jwt_required()
 def leaderboard():
-    high_scores = db.session.query(
-        HighScore.username, db.func.max(HighScore.score).label('high_score')
-    ).group_by(HighScore.username).order_by(db.desc('high_score')).all()
-    return render_template("leaderboard.html", high_scores=high_scores)
+    page, per_page = page_args()
+    board = leaderboard_page(page, per_page)
+    return render_template(
+        "leaderboard.html",
+        high_scores=board["entries"],
+        page=board["page"],
+        per_page=per_page,
+        has_next=board["page"] * per_page < board["total"],
+        your_rank=user_rank(get_jwt_identity()),
+    )
+
+
+@app.route("/api/leaderboard", methods=["GET"])
+@jwt_required()
+def leaderboard_api():
+    page, per_page = page_args()
+    board = dict(leaderboard_page(page, per_page), your_rank=user_rank(get_jwt_identity()))
+    return jsonify(board)
 
 
 if __name__ == "__main__":
     with app.app_context():
-        db.create_all()
+        init_db()
     app.run(debug=True)
@@ -0,0 +1,253 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import func, select
+
+
+class GameState:
+    __slots__ = ("owner", "target", "attempts", "game_over", "expires")
+
+    def __init__(self, owner, target, attempts, game_over=False, expires=0.0):
+        self.owner = owner
+        self.target = target
+        self.attempts = attempts
+        self.game_over = game_over
+        self.expires = expires
+
+
+def new_game_id():
+    return secrets.token_urlsafe(12)
+
+
+def _copy(state, expires):
+    return GameState(state.owner, state.target, state.attempts, state.game_over, expires)
+
+
+class MemoryGameStore:
+    """Games kept in this process, evicted ``ttl`` seconds after last use.
+
+    Entries are ordered by last use, so eviction only ever looks at the
+    oldest end. Only suitable when a single process serves all requests.
+    ``delete`` returns whether the game was still there, so exactly one
+    caller gets to finish a game. ``save`` only updates a running game whose
+    attempts are still the ``attempts`` the caller read, and returns whether
+    it did, so of concurrent guesses exactly one counts and none can bring
+    back a claimed game. Only ``create`` and ``restore`` (which puts a game
+    back under its id) insert.
+    """
+
+    def __init__(self, ttl=1800):
+        self.ttl = ttl
+        self._games = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, owner, target, attempts):
+        game_id = new_game_id()
+        self.restore(game_id, GameState(owner, target, attempts))
+        return game_id
+
+    def restore(self, game_id, state):
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            if game_id in self._games:
+                raise KeyError(f"game {game_id} already exists")
+            self._games[game_id] = _copy(state, now + self.ttl)
+
+    def get(self, game_id):
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            state = self._games.get(game_id)
+            if state is None:
+                return None
+            state.expires = now + self.ttl
+            self._games.move_to_end(game_id)
+            # A copy, so a caller's changes only land through save()
+            return _copy(state, state.expires)
+
+    def save(self, game_id, state, attempts):
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            current = self._games.get(game_id)
+            if current is None or current.game_over or current.attempts != attempts:
+                return False
+            state.expires = now + self.ttl
+            self._games[game_id] = _copy(state, state.expires)
+            self._games.move_to_end(game_id)
+            return True
+
+    def delete(self, game_id):
+        with self._lock:
+            return self._games.pop(game_id, None) is not None
+
+    def __len__(self):
+        return len(self._games)
+
+    def _evict(self, now):
+        while self._games:
+            game_id, state = next(iter(self._games.items()))
+            if state.expires > now:
+                break
+            del self._games[game_id]
+
+
+class SQLiteGameStore:
+    """Games in a SQLite file shared by every worker process on one host.
+
+    Expired rows are deleted every ``sweep_every`` writes using the index
+    on ``expires``. As in ``MemoryGameStore``, ``save`` is a conditional
+    update that never inserts.
+    """
+
+    def __init__(self, path, ttl=1800, sweep_every=500):
+        self.path = path
+        self.ttl = ttl
+        self.sweep_every = sweep_every
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS game ("
+                "id TEXT PRIMARY KEY, owner TEXT NOT NULL, target INTEGER NOT NULL, "
+                "attempts INTEGER NOT NULL, game_over INTEGER NOT NULL, expires REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_game_expires ON game (expires)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create(self, owner, target, attempts):
+        game_id = new_game_id()
+        self.restore(game_id, GameState(owner, target, attempts))
+        return game_id
+
+    def restore(self, game_id, state):
+        now = time.time()
+        state.expires = now + self.ttl
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO game (id, owner, target, attempts, game_over, expires) VALUES (?, ?, ?, ?, ?, ?)",
+                (game_id, state.owner, state.target, state.attempts, int(state.game_over), state.expires),
+            )
+            self._written(conn, now)
+
+    def get(self, game_id):
+        now = time.time()
+        row = self._connect().execute(
+            "SELECT owner, target, attempts, game_over, expires FROM game WHERE id = ? AND expires > ?",
+            (game_id, now),
+        ).fetchone()
+        if row is None:
+            return None
+        return GameState(row[0], row[1], row[2], bool(row[3]), row[4])
+
+    def save(self, game_id, state, attempts):
+        now = time.time()
+        state.expires = now + self.ttl
+        with self._connect() as conn:
+            applied = conn.execute(
+                "UPDATE game SET attempts = ?, game_over = ?, expires = ? "
+                "WHERE id = ? AND attempts = ? AND NOT game_over AND expires > ?",
+                (state.attempts, int(state.game_over), state.expires, game_id, attempts, now),
+            ).rowcount > 0
+            self._written(conn, now)
+        return applied
+
+    def _written(self, conn, now):
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            conn.execute("DELETE FROM game WHERE expires <= ?", (now,))
+
+    def delete(self, game_id):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM game WHERE id = ?", (game_id,)).rowcount > 0
+
+    def __len__(self):
+        return self._connect().execute("SELECT count(*) FROM game WHERE expires > ?", (time.time(),)).fetchone()[0]
+
+
+class DatabaseGameStore:
+    """Games in ``table`` of the app's own database.
+
+    Shared by every worker and every host using that database, which is
+    what serverless deployments need. ``engine`` is called for the engine
+    on each use, so it can come from the current app context. Expired rows
+    are deleted every ``sweep_every`` writes using the index on ``expires``.
+    As in ``MemoryGameStore``, ``save`` is a conditional update that never
+    inserts.
+    """
+
+    def __init__(self, table, engine, ttl=1800, sweep_every=500):
+        self.table = table
+        self.engine = engine
+        self.ttl = ttl
+        self.sweep_every = sweep_every
+        self._writes = 0
+
+    def create(self, owner, target, attempts):
+        game_id = new_game_id()
+        self.restore(game_id, GameState(owner, target, attempts))
+        return game_id
+
+    def restore(self, game_id, state):
+        now = time.time()
+        state.expires = now + self.ttl
+        with self.engine().begin() as conn:
+            conn.execute(self.table.insert().values(
+                id=game_id, owner=state.owner, target=state.target, attempts=state.attempts,
+                game_over=state.game_over, expires=state.expires))
+            self._written(conn, now)
+
+    def get(self, game_id):
+        t = self.table
+        with self.engine().connect() as conn:
+            row = conn.execute(
+                select(t.c.owner, t.c.target, t.c.attempts, t.c.game_over, t.c.expires)
+                .where(t.c.id == game_id, t.c.expires > time.time())
+            ).first()
+        if row is None:
+            return None
+        return GameState(row[0], row[1], row[2], bool(row[3]), row[4])
+
+    def save(self, game_id, state, attempts):
+        now = time.time()
+        state.expires = now + self.ttl
+        t = self.table
+        with self.engine().begin() as conn:
+            applied = conn.execute(
+                t.update()
+                .where(t.c.id == game_id, t.c.attempts == attempts, t.c.game_over.is_(False), t.c.expires > now)
+                .values(attempts=state.attempts, game_over=state.game_over, expires=state.expires)
+            ).rowcount > 0
+            self._written(conn, now)
+        return applied
+
+    def _written(self, conn, now):
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            conn.execute(self.table.delete().where(self.table.c.expires <= now))
+
+    def delete(self, game_id):
+        with self.engine().begin() as conn:
+            return conn.execute(self.table.delete().where(self.table.c.id == game_id)).rowcount > 0
+
+    def __len__(self):
+        with self.engine().connect() as conn:
+            return conn.execute(select(func.count()).select_from(self.table)
+                                .where(self.table.c.expires > time.time())).scalar()
@@ -0,0 +1,118 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Hash families in order of strength: scrypt is memory-hard, PBKDF2 is not
+FAMILY_STRENGTH = {"pbkdf2": 1, "scrypt": 2}
+# What werkzeug fills in for a method given without parameters
+METHOD_DEFAULTS = {"pbkdf2": ["sha256", str(DEFAULT_PBKDF2_ITERATIONS)], "scrypt": ["32768", "8", "1"]}
+
+
+class HasherBusy(Exception):
+    """Raised instead of queueing when the hashing pool is saturated."""
+
+
+class PasswordHasher:
+    """Runs password hashing on a small dedicated thread pool.
+
+    PBKDF2 and scrypt release the GIL, so at most ``workers`` cores are spent
+    on hashing no matter how many logins arrive; game requests keep the
+    rest. At most ``max_pending`` hashes may be running or queued, and
+    beyond that callers get ``HasherBusy`` straight away instead of piling
+    up behind the pool.
+
+    Without an explicit ``method`` scrypt's work factor N is calibrated once
+    per process so one hash takes about ``target_ms``, but never below
+    ``min_n`` (werkzeug's own default) nor above ``max_n``, which bounds the
+    128 * 8 * N bytes each running hash holds. ``needs_rehash`` moves users
+    to a stronger family or a higher cost on login, never to a weaker one, so
+    an explicit PBKDF2 ``method`` keeps existing scrypt hashes as they are.
+
+    ``timer(phase)``, when given, returns a context manager wrapped around
+    each hash or verify, including its wait for a free worker.
+    """
+
+    def __init__(self, workers, max_pending, method=None, target_ms=250,
+                 min_n=2 ** 15, max_n=2 ** 17, timer=None):
+        self.workers = workers
+        self.timer = timer or (lambda phase: nullcontext())
+        self.target_ms = target_ms
+        self.min_n = min_n
+        self.max_n = max_n
+        self._method = method
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    @property
+    def method(self):
+        if self._method is None:
+            with self._lock:
+                if self._method is None:
+                    self._method = f"scrypt:{self.calibrate()}:8:1"
+        return self._method
+
+    def calibrate(self, probe_n=2 ** 14):
+        started = time.perf_counter()
+        hashlib.scrypt(b"calibration", salt=b"salt", n=probe_n, r=8, p=1, maxmem=132 * probe_n * 8)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        # The cost is linear in N, which must be a power of two; the nearest
+        # one also lets workers calibrating a few % apart agree on it
+        n = 2 ** round(math.log2(max(probe_n * self.target_ms / max(elapsed_ms, 0.001), 1)))
+        return min(max(n, self.min_n), self.max_n)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        stored = parse_method(pwhash.split("$", 1)[0])
+        wanted = parse_method(self.method)
+        if stored[0] not in FAMILY_STRENGTH:
+            return True
+        if stored[0] != wanted[0]:
+            return FAMILY_STRENGTH[wanted[0]] > FAMILY_STRENGTH[stored[0]]
+        if wanted[0] == "pbkdf2":
+            if stored[1] != wanted[1]:
+                return True
+            # Only upgrade clearly weaker hashes, not ones a few % off
+            return int(stored[2]) < int(wanted[2]) * 0.8
+        # scrypt: upgrade a lower work factor N
+        return int(stored[1]) < int(wanted[1])
+
+    def _pool(self):
+        # One pool per process, created after any gunicorn fork
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._pool().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        with self.timer("password_hash"):
+            return future.result()
+
+
+def parse_method(method):
+    """Split a werkzeug method string, filling in the parameters it defaults."""
+    parts = method.split(":")
+    defaults = METHOD_DEFAULTS.get(parts[0], [])
+    return parts + defaults[len(parts) - 1:]
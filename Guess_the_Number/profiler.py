@@ -0,0 +1,100 @@
+# Generated from shared/profiler.py by shared/sync_shared.py; edit that file, not this copy.
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qs
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval.
+
+    A helper thread reads the target thread's frame from
+    ``sys._current_frames()`` every ``interval`` seconds and counts each
+    distinct stack, so the profiled code itself runs unmodified. Code that
+    holds the GIL is only sampled every ``sys.getswitchinterval()`` (5ms by
+    default), so short requests may come back with few or no samples.
+    ``collapsed()`` returns the counts in the folded format read by
+    flamegraph.pl and speedscope: ``outer;inner;leaf count`` per line.
+    """
+
+    def __init__(self, thread_id=None, interval=0.001):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.name = None
+        self.stacks = Counter()
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._done.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _short_path(filename):
+    parts = filename.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+
+class RequestProfiler:
+    """Profiles the requests that ask for it, one sampler per request.
+
+    A request opts in with ``?profile=<token>`` or an ``X-Profile: <token>``
+    header. The token keeps anyone else from switching it on. Without a
+    token every request passes straight through. Each profiled request
+    writes its folded stacks to ``directory``, and the file name is
+    returned in the ``X-Profile-Stacks`` response header.
+    """
+
+    def __init__(self, token=None, directory=None, interval=0.001):
+        self.token = token
+        self.directory = directory
+        self.interval = interval
+
+    def wanted(self, environ):
+        if not self.token:
+            return False
+        value = environ.get("HTTP_X_PROFILE")
+        if value is None:
+            query = environ.get("QUERY_STRING", "")
+            if "profile=" not in query:
+                return False
+            value = parse_qs(query).get("profile", [""])[0]
+        return hmac.compare_digest(value.encode(), self.token.encode())
+
+    def start(self, environ):
+        path = re.sub(r"[^A-Za-z0-9]+", "_", environ.get("PATH_INFO", "")).strip("_") or "root"
+        sampler = SamplingProfiler(interval=self.interval)
+        sampler.name = f"{time.time_ns() // 1_000_000}-{os.getpid()}-{path[:60]}.folded"
+        return sampler.start()
+
+    def finish(self, sampler):
+        sampler.stop()
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, sampler.name), "w") as f:
+            f.write(sampler.collapsed())
+        print(f"🔥 Wrote {sum(sampler.stacks.values())} stack sample(s) to {sampler.name}")
@@ -0,0 +1,173 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+
+class _Pending:
+    __slots__ = ("item", "done", "error", "attempts")
+
+    def __init__(self, item, wait):
+        self.item = item
+        self.done = threading.Event() if wait else None
+        self.error = None
+        self.attempts = 0
+
+
+class ScoreWriter:
+    """Bounded queue of score submissions flushed in batched transactions.
+
+    A background thread takes whatever is queued, lingers up to
+    ``flush_interval`` seconds for up to ``batch_size`` items, and hands the
+    batch to ``flush(items)``, which must write them in one transaction.
+
+    ``submit(item, wait=True)`` is group commit: the caller returns once its
+    batch is committed, so nothing acknowledged can be lost. With
+    ``wait=False`` the caller returns as soon as the item is queued; a failed
+    batch is retried, and whatever is still queued is flushed at exit, but a
+    hard crash can lose the last ``flush_interval`` worth of scores.
+
+    When a batch fails its items are written one by one, so one bad item only
+    fails itself: a waiting caller gets its error, a queued one is retried
+    with backoff and dropped (logged and counted in ``dropped``) after
+    ``max_attempts``. At most ``max_retry`` items are held for retry.
+    """
+
+    def __init__(self, flush, batch_size=100, flush_interval=0.02, max_queue=10000, put_timeout=1.0,
+                 max_attempts=10, max_retry=1000):
+        self.flush = flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_attempts = max_attempts
+        self.max_retry = max_retry
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._retry = []
+        self._failed_flushes = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._stopping = False
+        self.batches = 0
+        self.written = 0
+        self.dropped = 0
+        atexit.register(self.close)
+
+    def submit(self, item, wait=False):
+        """Queue ``item``; False when the queue stayed full for ``put_timeout``."""
+        self._ensure_started()
+        pending = _Pending(item, wait)
+        try:
+            self._queue.put(pending, timeout=self.put_timeout)
+        except queue.Full:
+            return False
+        if wait:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+        return True
+
+    def close(self):
+        self._stopping = True
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=5)
+        # Whatever the thread did not get to is written here
+        while True:
+            batch = self._drain(block=False)
+            if not batch and not self._retry:
+                break
+            self._flush(batch)
+            if self._retry:
+                self._drop(self._retry, "at exit")
+                self._retry = []
+                break
+
+    def _ensure_started(self):
+        # The thread is per process: started lazily so it survives a fork
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _drain(self, block=True):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval) if block else self._queue.get_nowait())
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if block and remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopping:
+            batch = self._drain()
+            if batch or self._retry:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        pending = self._retry + batch
+        try:
+            self.flush([p.item for p in pending])
+        except Exception as e:
+            print(f"⚠️ Failed to write {len(pending)} score(s): {e}")
+            failures = [(pending[0], e)] if len(pending) == 1 else self._flush_each(pending)
+        else:
+            failures = []
+            self._committed(pending)
+
+        self._retry = []
+        for p, error in failures:
+            p.attempts += 1
+            if p.done is not None:
+                # Waiting callers get their own error; fire-and-forget ones are retried
+                p.error = error
+                p.done.set()
+            elif p.attempts < self.max_attempts:
+                self._retry.append(p)
+            else:
+                self._drop([p], f"after {p.attempts} attempts: {error}")
+        if len(self._retry) > self.max_retry:
+            self._drop(self._retry[:-self.max_retry], "with the retry list full")
+            self._retry = self._retry[-self.max_retry:]
+
+        if failures:
+            # Back off while the database keeps failing, up to 64 intervals
+            self._failed_flushes += 1
+            time.sleep(self.flush_interval * 2 ** min(self._failed_flushes - 1, 6))
+        else:
+            self._failed_flushes = 0
+
+    def _flush_each(self, pending):
+        failures = []
+        for p in pending:
+            try:
+                self.flush([p.item])
+            except Exception as e:
+                failures.append((p, e))
+            else:
+                self._committed([p])
+        return failures
+
+    def _committed(self, pending):
+        self.batches += 1
+        self.written += len(pending)
+        for p in pending:
+            if p.done is not None:
+                p.done.set()
+
+    def _drop(self, pending, reason):
+        self.dropped += len(pending)
+        for p in pending:
+            print(f"❌ Dropping score {p.item!r} {reason}")
@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app.py is imported by bare name, as gunicorn does from Guess_the_Number/, and
+# reads its configuration from the environment at import time
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+WORKDIR = tempfile.mkdtemp(prefix='guess-the-number-tests-')
+os.environ.setdefault('DATABASE_URI', f"sqlite:///{os.path.join(WORKDIR, 'scores.db')}")
+os.environ.setdefault('GAME_STORE_PATH', os.path.join(WORKDIR, 'games.db'))
+os.environ.setdefault('JWT_SECRET_KEY', 'guess-the-number-test-secret-0123456789')
+# Cheap hashes: the suite is not measuring password hashing
+os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+
+
+@pytest.fixture
+def game_app():
+    """The app module against an empty database."""
+    import app as game_app
+
+    with game_app.app.app_context():
+        game_app.db.drop_all()
+        with game_app.db.engine.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE IF EXISTS best_score")
+    game_app._db_ready = False
+    game_app.invalidate_leaderboard_cache()
+    return game_app
+
+
+@pytest.fixture
+def client(game_app):
+    """A test client logged in as ``alice``."""
+    client = game_app.app.test_client()
+    credentials = {'username': 'alice', 'password': 'secret'}
+    client.post('/register', json=credentials)
+    assert client.post('/login', json=credentials).status_code == 200
+    return client
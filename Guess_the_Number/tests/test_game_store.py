@@ -0,0 +1,67 @@
+"""What every game store's save() lets through."""
+import pytest
+
+from game_store import DatabaseGameStore, GameState, MemoryGameStore, SQLiteGameStore
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'database'])
+def store(request, tmp_path, game_app):
+    if request.param == 'memory':
+        yield MemoryGameStore()
+    elif request.param == 'sqlite':
+        yield SQLiteGameStore(str(tmp_path / 'games.db'))
+    else:
+        with game_app.app.app_context():
+            game_app.init_db()
+            yield DatabaseGameStore(game_app.Game.__table__, lambda: game_app.db.engine)
+
+
+def guess(store, game_id, attempts_left=None, game_over=False):
+    state = store.get(game_id)
+    read = state.attempts
+    state.attempts = read - 1 if attempts_left is None else attempts_left
+    state.game_over = game_over
+    return store.save(game_id, state, read)
+
+
+def test_save_updates_the_game_it_read(store):
+    game_id = store.create('alice', 25, 7)
+    assert guess(store, game_id)
+    state = store.get(game_id)
+    assert (state.owner, state.target, state.attempts, state.game_over) == ('alice', 25, 6, False)
+
+
+def test_stale_save_is_rejected(store):
+    game_id = store.create('alice', 25, 7)
+    first, second = store.get(game_id), store.get(game_id)
+    first.attempts = second.attempts = 6
+    assert store.save(game_id, first, 7)
+    assert not store.save(game_id, second, 7)
+    assert store.get(game_id).attempts == 6
+
+
+def test_finished_game_is_never_saved_over(store):
+    game_id = store.create('alice', 25, 7)
+    assert guess(store, game_id, game_over=True)
+    assert not guess(store, game_id)
+    assert store.get(game_id).attempts == 6
+
+
+def test_save_never_brings_back_a_claimed_game(store):
+    game_id = store.create('alice', 25, 7)
+    state = store.get(game_id)
+    assert store.delete(game_id)
+    state.attempts = 6
+    assert not store.save(game_id, state, 7)
+    assert store.get(game_id) is None
+    assert store.save('unknown', GameState('alice', 25, 6), 7) is False
+
+
+def test_restore_puts_a_claimed_game_back(store):
+    game_id = store.create('alice', 25, 7)
+    state = store.get(game_id)
+    assert store.delete(game_id)
+    store.restore(game_id, state)
+    assert store.get(game_id).attempts == 7
+    with pytest.raises(Exception):
+        store.restore(game_id, state)
@@ -0,0 +1,70 @@
+"""First-request schema setup on a database from before best_score existed."""
+import os
+import subprocess
+import sys
+import threading
+
+from sqlalchemy import inspect
+
+from conftest import APP_DIR
+
+
+def old_database(game_app):
+    with game_app.app.app_context():
+        with game_app.db.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE TABLE high_score (id INTEGER PRIMARY KEY, username VARCHAR(50) NOT NULL, score INTEGER NOT NULL)")
+            conn.exec_driver_sql(
+                "INSERT INTO high_score (username, score) VALUES ('alice', 3), ('alice', 6), ('bob', 2)")
+
+
+def test_concurrent_first_requests_backfill_once(game_app):
+    old_database(game_app)
+    start = threading.Barrier(6)
+    errors = []
+
+    def first_request():
+        with game_app.app.app_context():
+            start.wait()
+            try:
+                game_app.init_db()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                game_app.db.session.remove()
+
+    threads = [threading.Thread(target=first_request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with game_app.app.app_context():
+        best = {row.username: row.score for row in game_app.BestScore.query}
+        indexes = {index['name'] for index in inspect(game_app.db.engine).get_indexes('high_score')}
+    assert best == {'alice': 6, 'bob': 2}
+    assert 'ix_high_score_username' in indexes
+
+
+def test_init_db_command(game_app):
+    old_database(game_app)
+    result = game_app.app.test_cli_runner().invoke(args=['init-db'])
+    assert result.exit_code == 0, result.output
+    with game_app.app.app_context():
+        assert game_app.db.session.get(game_app.BestScore, 'bob').score == 2
+
+
+def test_in_memory_database():
+    # The app reads DATABASE_URI at import, so it is imported afresh
+    script = """
+import app
+client = app.app.test_client()
+credentials = {'username': 'alice', 'password': 'secret'}
+assert client.post('/register', json=credentials).status_code == 302, 'register'
+assert client.post('/login', json=credentials).status_code == 200, 'login'
+assert client.get('/start_game').status_code == 302, 'start_game'
+"""
+    env = dict(os.environ, DATABASE_URI='sqlite://')
+    result = subprocess.run([sys.executable, '-c', script], cwd=APP_DIR, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,73 @@
+"""Leaderboard paging, ranking and caching."""
+import pytest
+
+
+@pytest.fixture
+def seed(client, game_app):
+    """Replaces the best scores with ``{username: score}``."""
+    def seed(best):
+        with game_app.app.app_context():
+            game_app.BestScore.query.delete()
+            game_app.db.session.add_all(game_app.BestScore(username=u, score=s) for u, s in best.items())
+            game_app.db.session.commit()
+        game_app.invalidate_leaderboard_cache()
+    return seed
+
+
+def board(client, **args):
+    response = client.get('/api/leaderboard', query_string=args)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def ranks(page):
+    return [(e['rank'], e['username'], e['high_score']) for e in page['entries']]
+
+
+def test_competition_ranks(client, seed):
+    seed({'alice': 5, 'bob': 7, 'carol': 7, 'dave': 3, 'erin': 5})
+    page = board(client)
+    assert ranks(page) == [(1, 'bob', 7), (1, 'carol', 7), (3, 'alice', 5), (3, 'erin', 5), (5, 'dave', 3)]
+    assert page['your_rank'] == 3
+    assert page['total'] == 5
+
+
+def test_ties_across_page_boundaries(client, seed):
+    seed({'alice': 6, 'bob': 4, 'carol': 4, 'dave': 4, 'erin': 2})
+    assert ranks(board(client, page=1, per_page=2)) == [(1, 'alice', 6), (2, 'bob', 4)]
+    assert ranks(board(client, page=2, per_page=2)) == [(2, 'carol', 4), (2, 'dave', 4)]
+    assert ranks(board(client, page=3, per_page=2)) == [(5, 'erin', 2)]
+
+
+@pytest.mark.parametrize('page', [4, 10 ** 20])
+def test_pages_past_the_end_show_the_last_page(client, seed, page):
+    seed({'alice': 6, 'bob': 4, 'carol': 4, 'dave': 4, 'erin': 2})
+    result = board(client, page=page, per_page=2)
+    assert result['page'] == 3
+    assert ranks(result) == [(5, 'erin', 2)]
+    assert client.get('/leaderboard', query_string={'page': page}).status_code == 200
+
+
+def test_empty_leaderboard(client, seed):
+    seed({})
+    assert board(client, page=5) == {'page': 1, 'per_page': 20, 'total': 0, 'entries': [], 'your_rank': None}
+
+
+def test_cache_is_bounded(client, game_app, seed, monkeypatch):
+    monkeypatch.setattr(game_app, 'LEADERBOARD_CACHE_SIZE', 3)
+    seed({'alice': 6})
+    for page in range(1, 6):
+        board(client, page=page)
+    assert list(game_app._leaderboard_cache) == [(3, 20), (4, 20), (5, 20)]
+    board(client, page=3)
+    board(client, page=6)
+    assert list(game_app._leaderboard_cache) == [(5, 20), (3, 20), (6, 20)]
+
+
+def test_submit_score_refreshes_the_leaderboard(client, game_app, monkeypatch):
+    monkeypatch.setattr(game_app.random, 'randint', lambda low, high: 25)
+    assert board(client)['entries'] == []
+    client.get('/start_game')
+    client.post('/api/guess', json={'guess': 25})
+    assert client.post('/submit_score', json={}).status_code == 200
+    assert ranks(board(client)) == [(1, 'alice', 6)]
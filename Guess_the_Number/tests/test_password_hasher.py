@@ -0,0 +1,59 @@
+"""Which stored hashes PasswordHasher upgrades on login."""
+import pytest
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash
+
+from password_hasher import PasswordHasher
+
+
+def hasher(method=None, target_ms=1):
+    return PasswordHasher(workers=1, max_pending=2, method=method, target_ms=target_ms)
+
+
+def test_calibration_never_goes_below_werkzeug_default():
+    assert hasher().method == "scrypt:32768:8:1"
+
+
+def test_calibration_is_capped():
+    assert hasher(target_ms=10 ** 6).method == f"scrypt:{2 ** 17}:8:1"
+
+
+def test_calibrated_default_keeps_werkzeug_scrypt_hashes():
+    stored = generate_password_hash("secret")
+    assert stored.startswith("scrypt:32768:8:1$")
+    assert not hasher().needs_rehash(stored)
+
+
+@pytest.mark.parametrize('stored, upgrade', [
+    # PBKDF2 is not memory-hard, so every PBKDF2 hash moves to scrypt
+    (f"pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}", True),
+    ("pbkdf2:sha256:2000000", True),
+    ("scrypt:16384:8:1", True),
+    ("scrypt", False),
+    ("scrypt:65536:8:1", False),
+])
+def test_calibrated_default(stored, upgrade):
+    assert hasher().needs_rehash(f"{stored}$salt$hash") is upgrade
+
+
+def test_calibrated_default_hashes_with_scrypt():
+    pwhash = hasher().hash("secret")
+    assert pwhash.startswith("scrypt:32768:8:1$")
+    assert hasher().verify(pwhash, "secret")
+
+
+@pytest.mark.parametrize('method, stored, upgrade', [
+    # Pinned scrypt moves PBKDF2 users over and raises a lower N
+    ("scrypt:32768:8:1", "pbkdf2:sha256:1000000", True),
+    ("scrypt:32768:8:1", "scrypt:16384:8:1", True),
+    ("scrypt", "scrypt:32768:8:1", False),
+    # Pinned PBKDF2 never replaces a stronger scrypt hash
+    ("pbkdf2:sha256:2000000", "scrypt:32768:8:1", False),
+    ("pbkdf2:sha256:2000000", "pbkdf2:sha256:1000000", True),
+    ("pbkdf2", "pbkdf2:sha256:1000000", False),
+])
+def test_pinned_method(method, stored, upgrade):
+    assert hasher(method).needs_rehash(f"{stored}$salt$hash") is upgrade
+
+
+def test_unknown_stored_method_is_upgraded():
+    assert hasher().needs_rehash("md5$salt$hash")
@@ -0,0 +1,93 @@
+"""ScoreWriter against a real SQLite table, with one score SQLite cannot store."""
+import sqlite3
+import threading
+
+import pytest
+
+from score_writer import ScoreWriter
+
+TOO_BIG = 10 ** 30  # "Python int too large to convert to SQLite INTEGER"
+
+
+class Table:
+    def __init__(self):
+        self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self.conn.execute("CREATE TABLE score (username TEXT, score INTEGER)")
+        self.lock = threading.Lock()
+        self.down = False
+
+    def flush(self, items):
+        with self.lock, self.conn:
+            if self.down:
+                raise sqlite3.OperationalError("database is locked")
+            self.conn.executemany("INSERT INTO score VALUES (?, ?)", items)
+
+    def rows(self):
+        with self.lock:
+            return sorted(self.conn.execute("SELECT username, score FROM score"))
+
+
+@pytest.fixture
+def table():
+    return Table()
+
+
+def test_bad_score_does_not_wedge_async_writes(table):
+    writer = ScoreWriter(table.flush, batch_size=50, flush_interval=0.001, max_attempts=3)
+    writer.submit(('mallory', TOO_BIG))
+    for i in range(5):
+        writer.submit((f"player{i}", i))
+    writer.close()
+
+    assert table.rows() == [(f"player{i}", i) for i in range(5)]
+    assert writer.dropped == 1
+    assert writer._retry == []
+
+
+def test_bad_score_only_fails_its_own_group_commit(table):
+    writer = ScoreWriter(table.flush, batch_size=50, flush_interval=0.05)
+    start = threading.Barrier(4)
+    errors = {}
+
+    def submit(item):
+        start.wait()
+        try:
+            writer.submit(item, wait=True)
+        except Exception as e:
+            errors[item[0]] = e
+
+    items = [('mallory', TOO_BIG), ('alice', 3), ('bob', 5), ('carol', 0)]
+    threads = [threading.Thread(target=submit, args=(item,)) for item in items]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+
+    assert list(errors) == ['mallory'] and isinstance(errors['mallory'], OverflowError)
+    assert table.rows() == [('alice', 3), ('bob', 5), ('carol', 0)]
+
+
+def test_queued_scores_survive_a_brief_outage(table):
+    writer = ScoreWriter(table.flush, flush_interval=0.001)
+    table.down = True
+    writer.submit(('alice', 3))
+    writer.submit(('bob', 5))
+    writer._flush(writer._drain(block=False))
+    assert len(writer._retry) == 2
+
+    table.down = False
+    writer._flush([])
+    assert table.rows() == [('alice', 3), ('bob', 5)]
+    assert writer.dropped == 0
+
+
+def test_retry_list_is_capped(table):
+    writer = ScoreWriter(table.flush, flush_interval=0.001, max_retry=3)
+    table.down = True
+    for i in range(5):
+        writer.submit((f"player{i}", i))
+    writer.close()
+    assert writer.dropped == 5
+    table.down = False
+    assert table.rows() == []
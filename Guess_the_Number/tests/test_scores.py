@@ -0,0 +1,131 @@
+"""Scoring finished games through the app."""
+import threading
+
+import pytest
+
+from game_store import DatabaseGameStore
+
+
+@pytest.fixture
+def play(client, game_app, monkeypatch):
+    """Starts a game with target 25 and plays ``guesses`` through /api/guess."""
+    monkeypatch.setattr(game_app.random, 'randint', lambda low, high: 25)
+
+    def play(*guesses):
+        assert client.get('/start_game').status_code == 302
+        result = None
+        for guess in guesses:
+            result = client.post('/api/guess', json={'guess': guess}).get_json()
+        return result
+
+    return play
+
+
+def scores(game_app):
+    with game_app.app.app_context():
+        return sorted(row.score for row in game_app.HighScore.query)
+
+
+@pytest.mark.parametrize('mode', ['sync', 'group'])
+def test_scores_come_from_the_server_side_game(client, game_app, play, monkeypatch, mode):
+    monkeypatch.setitem(game_app.app.config, 'SCORE_WRITE_MODE', mode)
+    assert play(10, 30, 25) == {'message': 'Correct! You guessed the number!', 'attempts': 4,
+                                'game_over': True, 'target': 25}
+    assert client.post('/submit_score', json={'score': 10 ** 30}).status_code == 200
+    play(25)
+    assert client.post('/submit_score', json={}).status_code == 200
+
+    assert scores(game_app) == [4, 6]
+    with game_app.app.app_context():
+        assert game_app.db.session.get(game_app.BestScore, 'alice').score == 6
+
+
+def test_a_game_is_scored_once(client, game_app, play):
+    play(25)
+    assert client.post('/submit_score', json={}).status_code == 200
+    assert client.post('/submit_score', json={}).status_code == 400
+    assert scores(game_app) == [6]
+
+
+def test_lost_game_scores_zero(client, game_app, play):
+    assert play(*[1] * 7)['game_over']
+    assert client.post('/submit_score', json={}).status_code == 200
+    assert scores(game_app) == [0]
+
+
+@pytest.mark.parametrize('guesses', [(), (10,), (10, 'q')], ids=['new', 'unfinished', 'quit'])
+def test_only_finished_games_are_scored(client, game_app, play, guesses):
+    play(*guesses)
+    assert client.post('/submit_score', json={'score': 7}).status_code == 400
+    assert scores(game_app) == []
+
+
+def test_games_are_shared_through_the_database(client, game_app, play):
+    play(10)
+    # What another worker or serverless instance would see
+    with game_app.app.app_context():
+        other = DatabaseGameStore(game_app.Game.__table__, lambda: game_app.db.engine)
+        assert isinstance(game_app.games, DatabaseGameStore)
+        assert len(other) == 1
+        with client.session_transaction() as session:
+            state = other.get(session['game_id'])
+    assert (state.owner, state.target, state.attempts, state.game_over) == ('alice', 25, 6, False)
+
+
+@pytest.fixture
+def together(client, game_app, monkeypatch):
+    """Runs ``requests`` at once, each from its own copy of ``client``, with
+    every one of them reading the game before any of them writes it."""
+    def together(*requests):
+        read = threading.Barrier(len(requests), timeout=5)
+        get = game_app.games.get
+
+        def get_then_wait(game_id):
+            state = get(game_id)
+            read.wait()
+            return state
+
+        monkeypatch.setattr(game_app.games, 'get', get_then_wait)
+        results = [None] * len(requests)
+
+        def run(i, method, url, body):
+            other = game_app.app.test_client()
+            for name in ('session', 'access_token_cookie'):
+                other.set_cookie(name, client.get_cookie(name).value)
+            results[i] = getattr(other, method)(url, json=body)
+
+        threads = [threading.Thread(target=run, args=(i, *r)) for i, r in enumerate(requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        monkeypatch.setattr(game_app.games, 'get', get)
+        return results
+
+    return together
+
+
+def test_parallel_guesses_count_once(client, game_app, play, together):
+    play()
+    results = together(*[('post', '/api/guess', {'guess': g}) for g in (10, 20, 30, 40)])
+    assert sorted(r.status_code for r in results) == [200, 409, 409, 409]
+    assert all('message' not in r.get_json() for r in results if r.status_code == 409)
+    assert client.post('/api/guess', json={'guess': 25}).get_json()['attempts'] == 5
+
+
+def test_guess_racing_submit_cannot_rescore(client, game_app, play, together):
+    play(25)
+    guess, submit = together(('post', '/api/guess', {'guess': 25}), ('post', '/submit_score', {}))
+    assert submit.status_code == 200
+    assert guess.status_code == 200
+    assert client.post('/submit_score', json={}).status_code == 400
+    assert scores(game_app) == [6]
+
+
+def test_failed_submit_restores_the_game(client, game_app, play, monkeypatch):
+    play(25)
+    monkeypatch.setattr(game_app, 'record_best_score', lambda username, score: 1 / 0)
+    assert client.post('/submit_score', json={}).status_code == 500
+    monkeypatch.undo()
+    assert client.post('/submit_score', json={}).status_code == 200
+    assert scores(game_app) == [6]
@@ -0,0 +1,12 @@
+"""This app's copies of the modules in shared/ are up to date."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'shared'))
+
+import sync_shared
+
+
+def test_shared_modules_are_in_sync():
+    app = os.path.basename(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert sync_shared.stale([app]) == [], "edited a copy? move the change to shared/ and run shared/sync_shared.py"
@@ -0,0 +1,146 @@
+"""Time to first response for crime-stats-global, from a cold process.
+
+Every sample starts a fresh interpreter, so import and load costs are paid
+again each time; medians over ``--repeat`` runs are reported.
+
+* ``inprocess`` times ``import app`` and the first ``GET /`` through the
+  Flask test client, the way a serverless function sees them. It runs
+  with the prebuilt snapshot, without it (``DATA_SNAPSHOT=``), and
+  with only the CSV.
+* ``gunicorn`` times the span from spawning gunicorn to its first 200 on
+  ``/``, and that first request on its own. It runs once with
+  gunicorn.conf.py, which preloads and warms the master, and once without.
+
+``--ref`` also measures another git revision, via a temporary worktree,
+to compare before and after:
+
+    python benchmarks/cold_start_benchmark.py --repeat 5 --ref HEAD~1
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INPROCESS = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+status = app.app.test_client().get('/').status_code
+done = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'first_response_ms': (done - imported) * 1000,
+                  'total_ms': (done - started) * 1000, 'status': status, 'pandas_loaded': 'pandas' in sys.modules}))
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def run_inprocess(app_dir, env):
+    output = subprocess.run([sys.executable, '-c', INPROCESS], cwd=app_dir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def get(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        conn.request('GET', path)
+        return conn.getresponse().status
+    finally:
+        conn.close()
+
+
+def run_gunicorn(app_dir, env, preload, timeout=60):
+    port = free_port()
+    config = os.path.join(app_dir, 'gunicorn.conf.py') if preload else os.devnull
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', config, '--workers', '2', '--bind', f"127.0.0.1:{port}", 'app:app'],
+        cwd=app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + timeout
+        while time.perf_counter() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.005)
+        request_started = time.perf_counter()
+        status = get(port, '/')
+        done = time.perf_counter()
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        'spawn_to_first_200_ms': (done - started) * 1000,
+        'first_request_ms': (done - request_started) * 1000,
+        'status': status,
+    }
+
+
+def median_of(samples):
+    keys = [k for k, v in samples[0].items() if isinstance(v, float)]
+    result = {k: round(statistics.median(s[k] for s in samples), 1) for k in keys}
+    for k, v in samples[0].items():
+        if k not in keys:
+            result[k] = v
+    return result
+
+
+def measure(app_dir, repeat):
+    base_env = dict(os.environ)
+    csv_dir = tempfile.mkdtemp()
+    csv_path = os.path.join(csv_dir, 'crime.csv')
+    shutil.copy(os.path.join(app_dir, 'static', 'data', 'cleaned_global_crime_data.csv'), csv_path)
+
+    variants = {
+        'inprocess_snapshot': lambda: run_inprocess(app_dir, base_env),
+        'inprocess_no_snapshot': lambda: run_inprocess(app_dir, dict(base_env, DATA_SNAPSHOT='')),
+        'inprocess_csv_only': lambda: run_inprocess(app_dir, dict(base_env, DATA_PATH=csv_path)),
+        'gunicorn_preload': lambda: run_gunicorn(app_dir, base_env, preload=True),
+        'gunicorn_no_preload': lambda: run_gunicorn(app_dir, base_env, preload=False),
+    }
+    report = {}
+    for name, run in variants.items():
+        if name == 'gunicorn_preload' and not os.path.exists(os.path.join(app_dir, 'gunicorn.conf.py')):
+            continue
+        run()  # page cache and .pyc warm-up, not counted
+        report[name] = median_of([run() for _ in range(repeat)])
+    shutil.rmtree(csv_dir, ignore_errors=True)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--ref', help='also measure this git revision')
+    args = parser.parse_args()
+
+    report = {'current': measure(os.path.join(ROOT, 'crime-stats-global'), args.repeat)}
+    if args.ref:
+        worktree = tempfile.mkdtemp()
+        subprocess.run(['git', 'worktree', 'add', '--detach', worktree, args.ref], cwd=ROOT,
+                       check=True, capture_output=True)
+        try:
+            report[args.ref] = measure(os.path.join(worktree, 'crime-stats-global'), args.repeat)
+        finally:
+            subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=ROOT, check=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Wall time and peak RSS of the crime ETL, before and after the rewrite.
+
+Writes synthetic UNODC-style exports (all the usual columns, several
+million rows in total) to a temp directory, then runs the old sequential
+read + merge chain and the current ``generate_merged_crime_data`` in fresh
+subprocesses so each gets its own peak RSS.
+
+    python benchmarks/etl_benchmark.py --rows 2000000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'crime-stats-global'))
+
+import combine_crime_data  # noqa: E402
+
+
+def write_synthetic_sources(directory, rows_per_source, countries=400, seed=0):
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Country {i:03d}" for i in range(countries)])
+    sources = {}
+    for column in combine_crime_data.SOURCES:
+        country = names[rng.integers(0, countries, rows_per_source)]
+        df = pd.DataFrame({
+            'Iso3_code': np.char.add('C', rng.integers(0, countries, rows_per_source).astype(str)),
+            'Country': country,
+            'Region': 'Region',
+            'Subregion': 'Subregion',
+            'Indicator': column,
+            'Dimension': 'Total',
+            'Category': rng.choice(['Total', 'Male', 'Female'], rows_per_source),
+            'Sex': 'Total',
+            'Age': 'Total',
+            'Year': rng.integers(2000, 2025, rows_per_source),
+            'Unit of measurement': 'Counts',
+            'VALUE': rng.gamma(2.0, 500.0, rows_per_source).round(3),
+            'Source': 'CTS',
+        })
+        path = os.path.join(directory, f"{column}.csv")
+        df.to_csv(path, index=False)
+        sources[column] = path
+    return sources
+
+
+def legacy_clean_csv(filepath, new_value_column_name):
+    df = pd.read_csv(filepath)
+    df.columns = df.columns.str.strip()
+    df = df[['Country', 'Year', 'VALUE']].copy()
+    df['Year'] = pd.to_numeric(df['Year'], errors='coerce')
+    df['VALUE'] = pd.to_numeric(df['VALUE'], errors='coerce')
+    df.dropna(subset=['Country', 'Year', 'VALUE'], inplace=True)
+    df = df.groupby(['Country', 'Year'], as_index=False).agg({'VALUE': 'mean'})
+    df.columns = ['Country', 'Year', new_value_column_name]
+    return df
+
+
+def legacy_generate(sources, output_path):
+    frames = [legacy_clean_csv(path, column) for column, path in sources.items()]
+    merged_df = frames[0]
+    for df in frames[1:]:
+        merged_df = merged_df.merge(df, on=["Country", "Year"], how="outer")
+    merged_df.fillna(0, inplace=True)
+    merged_df.to_csv(output_path, index=False)
+
+
+def current_generate(sources, output_path):
+    combine_crime_data.generate_merged_crime_data(sources, output_path)
+
+
+def _run(target, sources, output_path, queue):
+    sys.stdout = open(os.devnull, 'w')
+    started = time.perf_counter()
+    target(sources, output_path)
+    elapsed = time.perf_counter() - started
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    queue.put({'wall_s': round(elapsed, 3), 'peak_rss_mb': round(max(own, children) / 1024, 1)})
+
+
+def measure(target, sources, output_path):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run, args=(target, sources, output_path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='rows per source file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        sources = write_synthetic_sources(directory, args.rows)
+        before_path = os.path.join(directory, 'before.csv')
+        after_path = os.path.join(directory, 'after.csv')
+        report = {
+            'rows_per_source': args.rows,
+            'sources': len(sources),
+            'before': measure(legacy_generate, sources, before_path),
+            'after': measure(current_generate, sources, after_path),
+        }
+        before = pd.read_csv(before_path).sort_values(['Country', 'Year']).reset_index(drop=True)
+        after = pd.read_csv(after_path).sort_values(['Country', 'Year']).reset_index(drop=True)
+        pd.testing.assert_frame_equal(before, after[before.columns], check_exact=False)
+        report['outputs_match'] = True
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Ingest rate, peak RSS and query latency of the crime-analysis store.
+
+Writes a synthetic incident CSV (a city-sized area with a few dense
+hotspots over uniform background, skewed categories, ``--years`` of
+timestamps in order) in chunks, then:
+
+* ingests it with ``DataService`` in a fresh subprocess, for its rows/s
+  and peak RSS,
+* appends ``--append-rows`` more lines and ingests again, which only reads
+  the new bytes,
+* times each analytics query uncached (first call after an ingest) and
+  cached, through the Flask test client.
+
+    python benchmarks/incident_benchmark.py --rows 20000000
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, 'crime-analysis')
+
+CATEGORIES = ['THEFT', 'BATTERY', 'CRIMINAL DAMAGE', 'ASSAULT', 'DECEPTIVE PRACTICE', 'OTHER OFFENSE',
+              'NARCOTICS', 'BURGLARY', 'MOTOR VEHICLE THEFT', 'ROBBERY', 'WEAPONS VIOLATION',
+              'CRIMINAL TRESPASS', 'OFFENSE INVOLVING CHILDREN', 'SEX OFFENSE', 'HOMICIDE']
+
+# South-west corner and size in degrees of the synthetic city
+AREA = (41.64, -87.94, 0.38, 0.42)
+
+QUERIES = {
+    'timeseries_month_all': '/api/timeseries?bucket=month',
+    'timeseries_week_year': '/api/timeseries?bucket=week&since={year}-01-01&until={year}-12-31',
+    'timeseries_hour_week': '/api/timeseries?bucket=hour&since={year}-06-01&until={year}-06-07&category=THEFT',
+    'categories_all': '/api/categories',
+    'categories_bbox_year': '/api/categories?since={year}-01-01&until={year}-12-31&bbox=41.85,-87.70,41.90,-87.60',
+    'hotspots_all': '/api/hotspots?limit=50',
+    'hotspots_range': '/api/hotspots?since={first}-03-15&until={year}-08-20&limit=50',
+    'hotspots_45_days': '/api/hotspots?since={year}-02-10&until={year}-03-26&category=BATTERY&limit=50',
+    'hotspots_zoom_10': '/api/hotspots?zoom=10&limit=50',
+    'incidents_page': '/api/incidents?category=HOMICIDE&limit=100',
+    'incidents_bbox': '/api/incidents?bbox=41.80,-87.70,41.81,-87.69&limit=100',
+}
+
+
+def write_synthetic_incidents(path, rows, years=10, seed=0, chunk_rows=250_000, mode='w', start_row=0,
+                              total_rows=None):
+    """Append ``rows`` incidents to ``path``; ``start_row``/``total_rows`` place them in time."""
+    rng = np.random.default_rng(seed + start_row)
+    total_rows = total_rows or rows
+    south, west, height, width = AREA
+    centers = rng.uniform([south, west], [south + height, west + width], size=(12, 2))
+    weights = 1 / np.arange(1, len(CATEGORIES) + 1) ** 1.2
+    weights /= weights.sum()
+    start = np.datetime64(f"{2025 - years}-01-01T00:00:00").astype(np.int64)
+    span = years * 365 * 86400
+    with open(path, mode) as f:
+        if mode == 'w':
+            f.write('occurred_at,category,latitude,longitude\n')
+        for first in range(start_row, start_row + rows, chunk_rows):
+            n = min(chunk_rows, start_row + rows - first)
+            ts = start + np.arange(first, first + n) * span // total_rows + rng.integers(0, 600, n)
+            hot = rng.random(n) < 0.6
+            spot = centers[rng.integers(0, len(centers), n)]
+            lat = np.where(hot, spot[:, 0] + rng.normal(0, 0.01, n), rng.uniform(south, south + height, n))
+            lon = np.where(hot, spot[:, 1] + rng.normal(0, 0.01, n), rng.uniform(west, west + width, n))
+            pd.DataFrame({
+                'occurred_at': np.datetime_as_string(ts.astype('datetime64[s]')),
+                'category': np.array(CATEGORIES)[rng.choice(len(CATEGORIES), n, p=weights)],
+                'latitude': lat.round(6),
+                'longitude': lon.round(6),
+            }).to_csv(f, header=False, index=False)
+    return path
+
+
+def run_ingest(csv_path, store_path, block_bytes):
+    """Ingest in a fresh interpreter, so its peak RSS is the ingest's own."""
+    script = (
+        "import json, sys\n"
+        f"sys.path.insert(0, {APP_DIR!r})\n"
+        "from services.data_service import DataService\n"
+        f"totals = DataService({csv_path!r}, {store_path!r}, block_bytes={block_bytes}).ingest()\n"
+        # VmHWM, unlike ru_maxrss, starts over at exec instead of keeping this process's peak
+        "totals['peak_rss_mb'] = round(next(int(line.split()[1]) for line in open('/proc/self/status')\n"
+        "                                   if line.startswith('VmHWM')) / 1024, 1)\n"
+        "print(json.dumps(totals))\n"
+    )
+    output = subprocess.run([sys.executable, '-c', script], cwd=APP_DIR, capture_output=True, text=True, check=True)
+    totals = json.loads(output.stdout.strip().splitlines()[-1])
+    totals['rows_per_second'] = round(totals['rows'] / max(totals['seconds'], 1e-9))
+    return totals
+
+
+def time_queries(csv_path, store_path, repeat):
+    os.environ.update(CRIME_DATA_PATH=csv_path, CRIME_STORE_PATH=store_path, INGEST_INTERVAL='0')
+    sys.path.insert(0, APP_DIR)
+    from app import create_app
+    from config import Config
+
+    app = create_app(Config)
+    client = app.test_client()
+    analytics = app.extensions['crime_analytics']
+    status = client.get('/api/status').get_json()
+    last_year = int(status['last_incident'][:4])
+    first_year = int(status['first_incident'][:4])
+
+    report = {}
+    for name, template in QUERIES.items():
+        path = template.format(year=last_year - 1, first=first_year + 1)
+        uncached = []
+        for _ in range(repeat):
+            analytics._cache.clear()
+            started = time.perf_counter()
+            response = client.get(path)
+            uncached.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, (path, response.get_json())
+        started = time.perf_counter()
+        client.get(path)
+        cached = (time.perf_counter() - started) * 1000
+        report[name] = {'path': path, 'uncached_ms': round(statistics.median(uncached), 1),
+                        'cached_ms': round(cached, 2)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--append-rows', type=int, default=50_000)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--block-mb', type=float, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--keep', action='store_true', help='keep the CSV and store')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='incidents-')
+    csv_path = os.path.join(workdir, 'crime.csv')
+    store_path = os.path.join(workdir, 'crime.db')
+    total = args.rows + args.append_rows
+    try:
+        started = time.perf_counter()
+        write_synthetic_incidents(csv_path, args.rows, args.years, total_rows=total)
+        print(f"📝 Wrote {args.rows:,} rows in {time.perf_counter() - started:.0f}s", file=sys.stderr)
+
+        block_bytes = int(args.block_mb * 1024 * 1024)
+        report = {
+            'rows': args.rows,
+            'csv_mb': round(os.path.getsize(csv_path) / 2 ** 20, 1),
+            'block_mb': args.block_mb,
+            'ingest': run_ingest(csv_path, store_path, block_bytes),
+        }
+        report['store_mb'] = round(sum(os.path.getsize(store_path + s) for s in ('', '-wal')
+                                       if os.path.exists(store_path + s)) / 2 ** 20, 1)
+
+        write_synthetic_incidents(csv_path, args.append_rows, args.years, mode='a', start_row=args.rows,
+                                  total_rows=total)
+        report['append'] = run_ingest(csv_path, store_path, block_bytes)
+        report['queries'] = time_queries(csv_path, store_path, args.repeat)
+        report['benchmark_peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    finally:
+        if args.keep:
+            print(f"📁 Kept {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Leaderboard latency vs score-history size for Guess_the_Number.
+
+Fills a temporary SQLite database with synthetic ``high_score`` rows for a
+fixed user population, then times the old ``GROUP BY username`` query and
+the current ``leaderboard_page()`` (with its in-process cache cleared, so
+every call hits the database) at each size.
+
+    python benchmarks/leaderboard_benchmark.py --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--users', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    db_path = os.path.join(directory, 'leaderboard.db')
+    os.environ['DATABASE_URI'] = f'sqlite:///{db_path}'
+    sys.path.insert(0, os.path.join(ROOT, 'Guess_the_Number'))
+    import app as game
+
+    rng = random.Random(0)
+    usernames = [f"user{i}" for i in range(args.users)]
+    report = {'users': args.users, 'results': []}
+    inserted = 0
+
+    with game.app.app_context():
+        game.init_db()
+        for size in sorted(args.sizes):
+            with sqlite3.connect(db_path) as conn:
+                rows = [(rng.choice(usernames), rng.randint(0, 7)) for _ in range(size - inserted)]
+                conn.executemany("INSERT INTO high_score (username, score) VALUES (?, ?)", rows)
+                # Same statement submit_score() issues per score, done in bulk
+                conn.execute(
+                    "INSERT INTO best_score (username, score) "
+                    "SELECT username, max(score) FROM high_score WHERE true GROUP BY username "
+                    "ON CONFLICT (username) DO UPDATE SET score = excluded.score WHERE excluded.score > best_score.score"
+                )
+            inserted = size
+
+            def legacy():
+                game.db.session.query(
+                    game.HighScore.username, game.db.func.max(game.HighScore.score).label('high_score')
+                ).group_by(game.HighScore.username).order_by(game.db.desc('high_score')).all()
+
+            def current():
+                game.invalidate_leaderboard_cache()
+                game.leaderboard_page(1, 20)
+                game.user_rank(usernames[0])
+
+            report['results'].append({
+                'score_rows': size,
+                'legacy_group_by_ms': timed(legacy, args.repeat),
+                'best_score_page_ms': timed(current, args.repeat),
+            })
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
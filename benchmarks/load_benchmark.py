@@ -0,0 +1,120 @@
+"""Cold-load time and per-worker memory: CSV vs the memory-mapped columnar copy.
+
+Builds a scaled synthetic crime dataset, writes it both as CSV and with
+``columnar.write_columnar``, then starts ``--workers`` fresh processes per
+format that load it concurrently (like gunicorn workers) and report load
+time plus the RSS/PSS they added. PSS splits shared pages between the
+processes mapping them, so it shows what each worker really costs.
+
+    python benchmarks/load_benchmark.py --countries 2000 --years 200 --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, 'crime-stats-global')
+
+METRICS = [
+    'corruption_and_economic_crime',
+    'intentional_homicide',
+    'violent_and_sexual_crime',
+    'firearms_trafficking',
+    'access_and_functioning_of_justice',
+]
+
+
+def write_synthetic_dataset(directory, countries, years, seed=0):
+    import numpy as np
+    import pandas as pd
+
+    sys.path.insert(0, APP_DIR)
+    from columnar import columnar_path, write_columnar
+
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Country': np.repeat([f"Country {i:05d}" for i in range(countries)], years),
+        'Year': np.tile(np.arange(2024 - years + 1, 2025), countries),
+    })
+    for metric in METRICS:
+        df[metric] = rng.gamma(2.0, 500.0, len(df))
+    csv_path = os.path.join(directory, 'crime.csv')
+    df.to_csv(csv_path, index=False)
+    write_columnar(df, columnar_path(csv_path))
+    return csv_path, len(df)
+
+
+def memory_kb():
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def _worker(fmt, csv_path, barrier, queue):
+    sys.path.insert(0, APP_DIR)
+    import numpy as np  # noqa: F401  (import cost is not part of the load)
+    from columnar import columnar_path, read_columnar
+    from data_store import read_dataset
+
+    before = memory_kb()
+    started = time.perf_counter()
+    if fmt == 'csv':
+        df = read_dataset(csv_path)
+    else:
+        df, _ = read_columnar(columnar_path(csv_path))
+    # Touch every metric so mapped pages are actually resident
+    float(df[METRICS].sum().sum())
+    elapsed = time.perf_counter() - started
+
+    barrier.wait()
+    after = memory_kb()
+    queue.put({
+        'load_s': elapsed,
+        'rss_mb': (after['Rss'] - before['Rss']) / 1024,
+        'pss_mb': (after['Pss'] - before['Pss']) / 1024,
+    })
+    barrier.wait()
+
+
+def measure(fmt, csv_path, workers):
+    barrier = multiprocessing.Barrier(workers)
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_worker, args=(fmt, csv_path, barrier, queue)) for _ in range(workers)]
+    for p in processes:
+        p.start()
+    results = [queue.get() for _ in processes]
+    for p in processes:
+        p.join()
+    return {
+        'load_ms_median': round(statistics.median(r['load_s'] for r in results) * 1000, 1),
+        'rss_mb_per_worker': round(statistics.mean(r['rss_mb'] for r in results), 1),
+        'pss_mb_per_worker': round(statistics.mean(r['pss_mb'] for r in results), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--countries', type=int, default=2000)
+    parser.add_argument('--years', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path, rows = write_synthetic_dataset(directory, args.countries, args.years)
+        report = {'rows': rows, 'workers': args.workers}
+        for fmt in ('csv', 'columnar'):
+            report[fmt] = measure(fmt, csv_path, args.workers)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,630 @@
+"""Gunicorn load test for the Flask apps against stubbed upstreams.
+
+Every app runs under gunicorn from its own directory. It uses a scaled
+synthetic dataset, and ``stub_upstreams`` stands in for api.worldbank.org,
+Google News and raw.githubusercontent.com. ``--concurrency`` keep-alive
+clients, each with its own cookie jar, loop over a weighted request mix.
+They run for ``--warmup`` seconds, then ``--duration`` seconds are measured.
+The JSON report gives:
+
+* throughput
+* p50/p95/p99 latency, overall and per route
+* status codes
+* the peak RSS/PSS of every gunicorn worker
+
+Each app is compared with its entry in ``load_test_baseline.json``. Record
+that entry with ``--save-baseline`` on the same machine and settings.
+A regression is any of:
+
+* throughput falls by more than ``--tolerance``
+* latency or worker memory rises by more than ``--tolerance``
+* the error rate goes up
+
+Regressions are listed in the report, and the run exits with status 1.
+
+    python benchmarks/load_test.py --apps crime-stats-global Guess_the_Number crime-analysis --workers 4 --duration 20
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import quote
+
+from incident_benchmark import CATEGORIES as INCIDENT_CATEGORIES
+from incident_benchmark import write_synthetic_incidents
+from load_benchmark import METRICS, write_synthetic_dataset
+from stub_upstreams import StubUpstreams
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'load_test_baseline.json')
+
+# Latency changes smaller than this are noise, whatever the ratio
+MIN_LATENCY_DELTA_MS = 1.0
+
+
+class Client:
+    """One keep-alive connection with its own cookie jar."""
+
+    def __init__(self, port, timeout=30):
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+        self.cookies = {}
+        self.samples = []
+        self.recording = False
+        self.state = {}
+
+    def request(self, label, method, path, payload=None):
+        headers = {'Accept-Encoding': 'gzip, br'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f"{k}={v}" for k, v in self.cookies.items())
+        body = None
+        if payload is not None:
+            body = json.dumps(payload).encode()
+            headers['Content-Type'] = 'application/json'
+
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            response, data, status = None, b'', 0
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if response is not None:
+            for cookie in response.headers.get_all('Set-Cookie') or []:
+                name, _, value = cookie.split(';', 1)[0].partition('=')
+                if value:
+                    self.cookies[name.strip()] = value
+                else:
+                    self.cookies.pop(name.strip(), None)
+        if self.recording:
+            self.samples.append((label, elapsed_ms, status))
+        return status, data
+
+    def close(self):
+        self.conn.close()
+
+
+class CrimeStatsScenario:
+    directory = 'crime-stats-global'
+    ready_path = '/api/cache-stats'
+    routes = {
+        'index': 8,
+        'stats': 8,
+        'map': 4,
+        'country': 16,
+        'api_series': 20,
+        'api_series_global': 6,
+        'api_map': 10,
+        'api_summary': 2,
+        'api_summary_country': 12,
+        'live': 8,
+        'news': 6,
+    }
+    live_countries = ['IN', 'US', 'BR', 'ZA', 'FR', 'JP']
+
+    def __init__(self, args, workdir):
+        import pandas as pd
+
+        csv_path, rows = write_synthetic_dataset(workdir, args.countries, args.years, seed=args.seed)
+        self.csv_path = csv_path
+        self.countries = [quote(c) for c in pd.read_csv(csv_path, usecols=['Country'])['Country'].unique()]
+        if args.data_source == 'csv':
+            from columnar import columnar_path
+            shutil.rmtree(columnar_path(csv_path))
+        # Remote: the app finds no local file and fetches the stub's copy
+        self.data_path = csv_path if args.data_source != 'remote' else os.path.join(workdir, 'remote', 'crime.csv')
+        self.info = {'countries': args.countries, 'years': args.years, 'rows': rows, 'data_source': args.data_source}
+
+    def env(self, stubs):
+        return dict(stubs.env(), DATA_PATH=self.data_path)
+
+    def setup(self, clients):
+        pass
+
+    def step(self, client, rng):
+        label = rng.choices(list(self.routes), weights=list(self.routes.values()))[0]
+        metric = rng.choice(METRICS)
+        if label == 'index':
+            path = '/'
+        elif label == 'stats':
+            path = '/stats'
+        elif label == 'map':
+            path = '/map'
+        elif label == 'country':
+            path = f"/country/{rng.choice(self.countries)}"
+        elif label == 'api_series':
+            path = f"/api/series?metric={metric}&country={rng.choice(self.countries)}"
+        elif label == 'api_series_global':
+            path = f"/api/series?metric={metric}"
+        elif label == 'api_map':
+            path = f"/api/map?metric={metric}&year={rng.randint(2019, 2024)}"
+        elif label == 'api_summary':
+            path = f"/api/summary?metric={metric}"
+        elif label == 'api_summary_country':
+            path = f"/api/summary/{rng.choice(self.countries)}"
+        elif label == 'live':
+            path = f"/live?country={rng.choice(self.live_countries)}"
+        else:
+            path = '/api/telangana-crime-news'
+        client.request(label, 'GET', path)
+
+
+class GuessTheNumberScenario:
+    directory = 'Guess_the_Number'
+    ready_path = '/login'
+    csv_path = None
+    routes = {'game': 6, 'leaderboard': 2, 'api_leaderboard': 3, 'login': 1}
+
+    def __init__(self, args, workdir):
+        self.workdir = workdir
+        self.db_path = os.path.join(workdir, 'scores.db')
+        self.users = args.users
+        self.score_rows = args.score_rows
+        self.seed = args.seed
+        self.info = {
+            'users': args.users,
+            'score_rows': args.score_rows,
+            'score_write_mode': os.getenv('SCORE_WRITE_MODE', 'sync'),
+        }
+
+    def env(self, stubs):
+        # Games live in the same database, the default store shared by workers
+        return {'DATABASE_URI': f"sqlite:///{self.db_path}"}
+
+    def setup(self, clients):
+        # Accounts go through /register so their hashes cost what real ones do
+        for i, client in enumerate(clients):
+            credentials = {'username': f"player{i}", 'password': 'load-test'}
+            client.request('register', 'POST', '/register', credentials)
+            status, _ = client.request('login', 'POST', '/login', credentials)
+            if status != 200:
+                raise RuntimeError(f"login for {credentials['username']} failed with {status}")
+            client.state['credentials'] = credentials
+        self._seed_scores()
+
+    def _seed_scores(self):
+        rng = random.Random(self.seed)
+        usernames = [f"user{i}" for i in range(self.users)]
+        rows = [(rng.choice(usernames), rng.randint(0, 7)) for _ in range(self.score_rows)]
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.executemany("INSERT INTO high_score (username, score) VALUES (?, ?)", rows)
+            conn.execute(
+                "INSERT INTO best_score (username, score) "
+                "SELECT username, max(score) FROM high_score WHERE true GROUP BY username "
+                "ON CONFLICT (username) DO UPDATE SET score = excluded.score WHERE excluded.score > best_score.score"
+            )
+
+    def step(self, client, rng):
+        label = rng.choices(list(self.routes), weights=list(self.routes.values()))[0]
+        if label == 'game':
+            self._play(client, rng)
+        elif label == 'login':
+            client.request('login', 'POST', '/login', client.state['credentials'])
+        else:
+            pages = max(1, self.users // 20)
+            page = 1 if rng.random() < 0.7 else rng.randint(1, pages)
+            path = '/leaderboard' if label == 'leaderboard' else '/api/leaderboard'
+            client.request(label, 'GET', f"{path}?page={page}")
+
+    def _play(self, client, rng):
+        status, _ = client.request('start_game', 'GET', '/start_game')
+        if status != 302:
+            return
+        low, high = 1, 50
+        result = {}
+        while not result.get('game_over'):
+            guess = rng.randint(low, high)
+            status, data = client.request('api_guess', 'POST', '/api/guess', {'guess': guess})
+            if status != 200:
+                return
+            result = json.loads(data)
+            if result['message'] == 'Too low!':
+                low = min(guess + 1, high)
+            elif result['message'] == 'Too high!':
+                high = max(guess - 1, low)
+        client.request('submit_score', 'POST', '/submit_score', {})
+
+
+class CrimeAnalysisScenario:
+    directory = 'crime-analysis'
+    ready_path = '/api/status'
+    csv_path = None
+    routes = {'timeseries': 10, 'timeseries_hour': 3, 'categories': 6, 'hotspots': 8, 'incidents': 6, 'status': 1}
+    years = 10
+
+    def __init__(self, args, workdir):
+        self.data_path = write_synthetic_incidents(os.path.join(workdir, 'crime.csv'), args.incidents, self.years,
+                                                   seed=args.seed)
+        self.store_path = os.path.join(workdir, 'crime.db')
+        # Ingested up front, as a deployment would, so the run measures queries
+        subprocess.run([sys.executable, '-m', 'services.data_service', '--data', self.data_path,
+                        '--store', self.store_path], cwd=os.path.join(ROOT, self.directory),
+                       check=True, stdout=subprocess.DEVNULL)
+        self.first_year = 2025 - self.years
+        self.info = {'incidents': args.incidents, 'years': self.years}
+
+    def env(self, stubs):
+        return {'CRIME_DATA_PATH': self.data_path, 'CRIME_STORE_PATH': self.store_path}
+
+    def setup(self, clients):
+        pass
+
+    def _range(self, rng, max_days):
+        since = date(self.first_year, 1, 1) + timedelta(days=rng.randrange(self.years * 365))
+        until = since + timedelta(days=rng.randint(1, max_days))
+        return f"since={since}&until={until}"
+
+    def _category(self, rng):
+        return f"&category={quote(rng.choice(INCIDENT_CATEGORIES[:8]))}" if rng.random() < 0.5 else ''
+
+    def step(self, client, rng):
+        label = rng.choices(list(self.routes), weights=list(self.routes.values()))[0]
+        if label == 'timeseries':
+            bucket = rng.choice(['day', 'week', 'month'])
+            path = f"/api/timeseries?bucket={bucket}&{self._range(rng, 730)}{self._category(rng)}"
+        elif label == 'timeseries_hour':
+            path = f"/api/timeseries?bucket=hour&{self._range(rng, 14)}{self._category(rng)}"
+        elif label == 'categories':
+            path = f"/api/categories?{self._range(rng, 365)}"
+        elif label == 'hotspots':
+            zoom = rng.choice([1, 5, 10])
+            path = f"/api/hotspots?{self._range(rng, 365)}{self._category(rng)}&zoom={zoom}&limit=50"
+        elif label == 'incidents':
+            path = f"/api/incidents?{self._range(rng, 90)}{self._category(rng)}&limit=50"
+        else:
+            path = '/api/status'
+        client.request(label, 'GET', path)
+
+
+APPS = {
+    'crime-stats-global': CrimeStatsScenario,
+    'Guess_the_Number': GuessTheNumberScenario,
+    'crime-analysis': CrimeAnalysisScenario,
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def worker_pids(master_pid):
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == master_pid:
+            pids.append(int(entry))
+    return pids
+
+
+def memory_kb(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+class MemorySampler(threading.Thread):
+    """Polls every gunicorn worker's RSS/PSS and keeps the peaks."""
+
+    def __init__(self, master_pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.master_pid = master_pid
+        self.interval = interval
+        self.workers = {}
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.sample()
+            self._done.wait(self.interval)
+
+    def sample(self):
+        for pid in worker_pids(self.master_pid):
+            try:
+                values = memory_kb(pid)
+            except OSError:
+                continue
+            peak = self.workers.setdefault(pid, {'Rss': 0, 'Pss': 0})
+            for key in ('Rss', 'Pss'):
+                peak[key] = max(peak[key], values.get(key, 0))
+
+    def finish(self):
+        self._done.set()
+        self.join()
+        self.sample()
+        return [
+            {'pid': pid, 'peak_rss_mb': round(v['Rss'] / 1024, 1), 'peak_pss_mb': round(v['Pss'] / 1024, 1)}
+            for pid, v in sorted(self.workers.items())
+        ]
+
+
+class GunicornServer:
+    def __init__(self, directory, env, args, log_path):
+        self.directory = os.path.join(ROOT, directory)
+        self.env = dict(os.environ, PYTHONUNBUFFERED='1', **env)
+        self.args = args
+        self.log_path = log_path
+        self.port = None
+        self.process = None
+
+    def start(self):
+        self.port = free_port()
+        command = [
+            sys.executable, '-m', 'gunicorn',
+            '--workers', str(self.args.workers),
+            '--worker-class', self.args.worker_class,
+            '--threads', str(self.args.threads),
+            '--bind', f"127.0.0.1:{self.port}",
+        ]
+        if self.args.preload:
+            command.append('--preload')
+        command.append('app:app')
+        with open(self.log_path, 'w') as log:
+            self.process = subprocess.Popen(command, cwd=self.directory, env=self.env,
+                                            stdout=log, stderr=subprocess.STDOUT)
+
+    def wait_ready(self, path, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with {self.process.returncode}:\n{self.log_tail()}")
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+                conn.request('GET', path)
+                status = conn.getresponse().status
+                conn.close()
+                if status < 500:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"gunicorn not ready after {timeout}s:\n{self.log_tail()}")
+
+    def log_tail(self, lines=30):
+        with open(self.log_path) as f:
+            return ''.join(f.readlines()[-lines:])
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def drive(scenario, clients, warmup, duration, seed):
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    def run(i, client):
+        rng = random.Random(seed + i)
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                break
+            client.recording = now >= measure_from
+            scenario.step(client, rng)
+
+    threads = [threading.Thread(target=run, args=(i, c)) for i, c in enumerate(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return [sample for client in clients for sample in client.samples]
+
+
+def latency_summary(values):
+    values = sorted(values)
+    if not values:
+        return {}
+
+    def pick(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))], 2)
+
+    return {
+        'p50': pick(0.50),
+        'p95': pick(0.95),
+        'p99': pick(0.99),
+        'mean': round(sum(values) / len(values), 2),
+        'max': round(values[-1], 2),
+    }
+
+
+def summarize(samples, duration):
+    by_route = {}
+    status_codes = {}
+    for label, elapsed_ms, status in samples:
+        by_route.setdefault(label, []).append((elapsed_ms, status))
+        status_codes[str(status)] = status_codes.get(str(status), 0) + 1
+
+    def errors(rows):
+        return sum(1 for _, status in rows if not 0 < status < 400)
+
+    routes = {
+        label: {
+            'requests': len(rows),
+            'errors': errors(rows),
+            'latency_ms': latency_summary([ms for ms, _ in rows]),
+        }
+        for label, rows in sorted(by_route.items())
+    }
+    all_rows = [(ms, status) for _, ms, status in samples]
+    return {
+        'requests': len(all_rows),
+        'errors': errors(all_rows),
+        'throughput_rps': round(len(all_rows) / duration, 1),
+        'latency_ms': latency_summary([ms for ms, _ in all_rows]),
+        'status_codes': dict(sorted(status_codes.items())),
+        'routes': routes,
+    }
+
+
+def run_app(name, args):
+    workdir = tempfile.mkdtemp(prefix=f"load-{name}-")
+    scenario = APPS[name](args, workdir)
+    stubs = StubUpstreams(scenario.csv_path, args.stub_latency_ms / 1000).start()
+    server = GunicornServer(scenario.directory, scenario.env(stubs), args, os.path.join(workdir, 'gunicorn.log'))
+    clients = []
+    try:
+        server.start()
+        server.wait_ready(scenario.ready_path)
+        clients = [Client(server.port) for _ in range(args.concurrency)]
+        scenario.setup(clients)
+        sampler = MemorySampler(server.process.pid)
+        sampler.start()
+        samples = drive(scenario, clients, args.warmup, args.duration, args.seed)
+        workers = sampler.finish()
+    except Exception:
+        if server.process is not None:
+            print(server.log_tail(), file=sys.stderr)
+        raise
+    finally:
+        for client in clients:
+            client.close()
+        if server.process is not None:
+            server.stop()
+        stubs.stop()
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {'config': run_config(args), 'scale': scenario.info}
+    result.update(summarize(samples, args.duration))
+    result['workers'] = workers
+    result['peak_worker_rss_mb'] = max((w['peak_rss_mb'] for w in workers), default=0)
+    result['peak_worker_pss_mb'] = max((w['peak_pss_mb'] for w in workers), default=0)
+    result['upstream_calls'] = dict(stubs.calls)
+    return result
+
+
+def run_config(args):
+    return {
+        'workers': args.workers,
+        'worker_class': args.worker_class,
+        'threads': args.threads,
+        'preload': args.preload,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'stub_latency_ms': args.stub_latency_ms,
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+    }
+
+
+def compare(name, current, base, tolerance):
+    """Regressions of ``current`` against the baseline entry ``base``."""
+    if base['config'] != current['config'] or base['scale'] != current['scale']:
+        return [{'app': name, 'check': 'baseline', 'detail': 'recorded with a different config or scale, not compared'}]
+
+    regressions = []
+
+    def check(metric, old, new, higher_is_worse=True, min_delta=0.0):
+        if old is None or new is None:
+            return
+        change = (new - old) if higher_is_worse else (old - new)
+        if change > old * tolerance and change > min_delta:
+            regressions.append({'app': name, 'check': metric, 'baseline': old, 'current': new})
+
+    check('throughput_rps', base['throughput_rps'], current['throughput_rps'], higher_is_worse=False)
+    for q in ('p50', 'p95', 'p99'):
+        check(f"latency_ms.{q}", base['latency_ms'].get(q), current['latency_ms'].get(q),
+              min_delta=MIN_LATENCY_DELTA_MS)
+    for label, route in current['routes'].items():
+        old = base['routes'].get(label)
+        if old is not None:
+            check(f"routes.{label}.p95", old['latency_ms'].get('p95'), route['latency_ms'].get('p95'),
+                  min_delta=MIN_LATENCY_DELTA_MS)
+    check('peak_worker_rss_mb', base['peak_worker_rss_mb'], current['peak_worker_rss_mb'])
+
+    old_rate = base['errors'] / max(base['requests'], 1)
+    new_rate = current['errors'] / max(current['requests'], 1)
+    if new_rate > old_rate + 0.001:
+        regressions.append({'app': name, 'check': 'error_rate',
+                            'baseline': round(old_rate, 4), 'current': round(new_rate, 4)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--apps', nargs='+', choices=list(APPS), default=list(APPS))
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--worker-class', default='sync')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker')
+    parser.add_argument('--preload', action='store_true', help='start gunicorn with --preload')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stub-latency-ms', type=float, default=50)
+    parser.add_argument('--countries', type=int, default=500)
+    parser.add_argument('--years', type=int, default=30)
+    parser.add_argument('--data-source', choices=['remote', 'csv', 'columnar'], default='remote')
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--score-rows', type=int, default=200_000)
+    parser.add_argument('--incidents', type=int, default=1_000_000)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--output', help='also write the report here')
+    parser.add_argument('--keep', action='store_true', help='keep the temporary data and gunicorn logs')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(ROOT, 'crime-stats-global'))
+    report = {'apps': {}, 'regressions': []}
+    for name in args.apps:
+        print(f"▶ {name}", file=sys.stderr)
+        report['apps'][name] = run_app(name, args)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for name, current in report['apps'].items():
+            base = baseline['apps'].get(name)
+            if base is not None:
+                report['regressions'].extend(compare(name, current, base, args.tolerance))
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    if args.save_baseline:
+        baseline = baseline or {'apps': {}}
+        baseline['apps'].update(report['apps'])
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+            f.write('\n')
+        print(f"💾 Saved baseline for {', '.join(report['apps'])} to {args.baseline}", file=sys.stderr)
+    elif any(r['check'] != 'baseline' for r in report['regressions']):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Concurrent /submit_score throughput for each SCORE_WRITE_MODE.
+
+Every mode runs in a fresh process against its own SQLite database:
+``--threads`` logged-in clients post ``--scores`` scores each, then the
+writer is closed and the ``high_score`` row count is checked against the
+number of acknowledged submissions, so a lost score fails the run. The app
+only scores a finished game, so one is put in the game store before each
+submission, outside the request but inside the timed loop.
+
+    python benchmarks/score_ingest_benchmark.py --threads 16 --scores 200
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ['sync', 'group', 'async']
+
+
+def run_mode(threads, scores):
+    sys.path.insert(0, os.path.join(ROOT, 'Guess_the_Number'))
+    import app as game
+    from game_store import GameState, new_game_id
+
+    clients = []
+    for i in range(threads):
+        client = game.app.test_client()
+        client.post('/register', json={'username': f'user{i}', 'password': 'secret'})
+        client.post('/login', json={'username': f'user{i}', 'password': 'secret'})
+        clients.append(client)
+
+    acknowledged = [0] * threads
+
+    def finish_game(client, username, attempts):
+        game_id = new_game_id()
+        with game.app.app_context():
+            game.games.restore(game_id, GameState(username, 1, attempts, game_over=True))
+        with client.session_transaction() as session:
+            session['game_id'] = game_id
+
+    def player(i):
+        for n in range(scores):
+            finish_game(clients[i], f'user{i}', n % 8)
+            response = clients[i].post('/submit_score', json={})
+            if response.status_code == 200:
+                acknowledged[i] += 1
+
+    workers = [threading.Thread(target=player, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    game.score_writer.close()
+
+    with game.app.app_context():
+        stored = game.HighScore.query.count()
+    return {
+        'submitted': sum(acknowledged),
+        'stored': stored,
+        'seconds': round(elapsed, 3),
+        'scores_per_s': round(sum(acknowledged) / elapsed, 1),
+        'batches': game.score_writer.batches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--scores', type=int, default=200)
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.threads, args.scores)))
+        return
+
+    report = {'threads': args.threads, 'scores_per_thread': args.scores}
+    for mode in MODES:
+        directory = tempfile.mkdtemp()
+        env = dict(os.environ, SCORE_WRITE_MODE=mode, DATABASE_URI=f"sqlite:///{directory}/scores.db")
+        output = subprocess.run(
+            [sys.executable, __file__, '--mode', mode, '--threads', str(args.threads), '--scores', str(args.scores)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result['lost'] = result['submitted'] - result['stored']
+        report[mode] = result
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
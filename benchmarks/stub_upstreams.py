@@ -0,0 +1,175 @@
+"""Local stand-ins for the upstream services the apps call.
+
+One threaded HTTP server answers for all three hosts:
+
+* ``/v2/country/<code>/indicator/<id>`` - World Bank indicator JSON
+* ``/rss/search`` - a Google News RSS search feed
+* ``/raw/<name>.csv`` - the crime CSV normally fetched from raw.githubusercontent.com
+
+The RSS and CSV responses carry an ETag and answer conditional GETs with 304,
+like the real hosts. ``latency`` adds a fixed delay to every response, and
+hosts named in ``failing`` ('worldbank', 'rss', 'csv') answer 503 instead.
+``env()`` gives the environment variables that point the apps at the server.
+
+    python benchmarks/stub_upstreams.py --port 8900 --csv crime.csv --latency-ms 50
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+
+def worldbank_payload(country_code):
+    rng = random.Random(country_code)
+    records = [
+        {"date": str(year), "value": round(rng.uniform(0.5, 30.0), 3), "country": {"id": country_code}}
+        for year in range(2024, 1999, -1)
+    ]
+    meta = {"page": 1, "pages": 1, "per_page": 100, "total": len(records)}
+    return json.dumps([meta, records]).encode()
+
+
+def rss_payload(query, items=20):
+    published = formatdate(usegmt=True)
+    entries = "".join(
+        f"<item><title>{escape(query)} report {i}</title>"
+        f"<link>https://news.example.com/{i}</link>"
+        f"<pubDate>{published}</pubDate>"
+        f"<source url=\"https://news.example.com\">Stub News</source></item>"
+        for i in range(items)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>{escape(query)}</title>{entries}</channel></rss>"
+    ).encode()
+
+
+class StubUpstreams:
+    def __init__(self, csv_path=None, latency=0.0, host='127.0.0.1', port=0):
+        self.csv_path = csv_path
+        self.latency = latency
+        self.calls = {'worldbank': 0, 'rss': 0, 'csv': 0, 'not_modified': 0}
+        self.failing = set()
+        self._lock = threading.Lock()
+        self._csv = None
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        return {
+            'WORLDBANK_API': f"{self.url}/v2",
+            'GOOGLE_NEWS_RSS': f"{self.url}/rss/search",
+            'DATA_URL': f"{self.url}/raw/cleaned_global_crime_data.csv",
+        }
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, name):
+        with self._lock:
+            self.calls[name] += 1
+
+    def _csv_body(self):
+        if self._csv is None:
+            with open(self.csv_path, 'rb') as f:
+                self._csv = f.read()
+        return self._csv
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                parts = urlsplit(self.path)
+                path = parts.path.strip('/').split('/')
+                if path[:2] == ['v2', 'country'] and len(path) >= 3:
+                    if not self._failed('worldbank'):
+                        self._send(worldbank_payload(path[2].upper()), 'application/json')
+                elif parts.path == '/rss/search':
+                    if not self._failed('rss'):
+                        query = parse_qs(parts.query).get('q', ['crime'])[0]
+                        self._send(rss_payload(query), 'application/rss+xml', conditional=True)
+                elif path[0] == 'raw' and parts.path.endswith('.csv') and stub.csv_path:
+                    if not self._failed('csv'):
+                        self._send(stub._csv_body(), 'text/csv', conditional=True)
+                else:
+                    self._send(b'not found', 'text/plain', status=404)
+
+            def _failed(self, name):
+                stub._count(name)
+                if name in stub.failing:
+                    self._send(b'upstream unavailable', 'text/plain', status=503)
+                    return True
+                return False
+
+            def _send(self, body, content_type, status=200, conditional=False):
+                headers = {}
+                if conditional:
+                    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                    headers['ETag'] = etag
+                    if self.headers.get('If-None-Match') == etag:
+                        stub._count('not_modified')
+                        status, body = 304, b''
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--csv', help='CSV served under /raw/')
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubUpstreams(args.csv, args.latency_ms / 1000, port=args.port)
+    for name, value in stub.env().items():
+        print(f"export {name}={value}")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
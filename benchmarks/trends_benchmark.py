@@ -0,0 +1,110 @@
+"""TrendEngine build time vs a per-country pandas loop over the same series.
+
+Builds a synthetic country x year frame (gamma-distributed metrics, a few
+percent of values missing), then times:
+
+* ``TrendEngine`` over every country and metric, as the ``trends`` builder
+  runs it on each dataset version,
+* the straightforward alternative: per country and metric, pandas
+  ``rolling``/``pct_change`` plus ``np.polyfit``, which is what computing
+  the same figures in a request handler would look like,
+
+and checks the two agree on every slope. The full comparison, every figure
+the engine serves against this loop, is
+crime-stats-global/tests/test_trends.py.
+
+    python benchmarks/trends_benchmark.py --countries 2000 --years 30
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, 'crime-stats-global')
+
+METRICS = [
+    'corruption_and_economic_crime',
+    'intentional_homicide',
+    'violent_and_sexual_crime',
+    'firearms_trafficking',
+    'access_and_functioning_of_justice',
+]
+
+
+def synthetic_frame(countries, years, missing=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Country': np.repeat([f"Country {i:05d}" for i in range(countries)], years),
+        'Year': np.tile(np.arange(2024 - years + 1, 2025), countries),
+    })
+    drift = rng.normal(0, 0.05, countries).repeat(years) * np.tile(np.arange(years), countries)
+    for metric in METRICS:
+        values = rng.gamma(2.0, 500.0, len(df)) * np.exp(drift)
+        values[rng.random(len(df)) < missing] = np.nan
+        df[metric] = values
+    return df
+
+
+def per_country_loop(df, window=3, horizon=3):
+    slopes = {}
+    for country, rows in df.groupby('Country'):
+        rows = rows.set_index('Year').sort_index()
+        rows = rows.reindex(range(rows.index.min(), rows.index.max() + 1))
+        for metric in METRICS:
+            series = rows[metric]
+            series.rolling(window).mean()
+            series.pct_change(fill_method=None)
+            observed = series.dropna()
+            if len(observed) >= 2:
+                slope, intercept = np.polyfit(observed.index, observed.to_numpy(), 1)
+                np.maximum(intercept + slope * (series.index[-1] + np.arange(1, horizon + 1)), 0)
+                slopes[country, metric] = slope
+    return slopes
+
+
+def timed(fn, repeat):
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return result, round(statistics.median(samples), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--countries', type=int, default=2000)
+    parser.add_argument('--years', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, APP_DIR)
+    from trends import TrendEngine
+
+    df = synthetic_frame(args.countries, args.years)
+    engine, engine_ms = timed(lambda: TrendEngine(df, METRICS), args.repeat)
+    slopes, loop_ms = timed(lambda: per_country_loop(df), max(1, args.repeat // 5))
+
+    worst = max(
+        abs(engine.slope[engine.metrics.index(metric), engine.countries.index(country)] - slope) / max(abs(slope), 1)
+        for (country, metric), slope in slopes.items()
+    )
+    print(json.dumps({
+        'countries': args.countries,
+        'years': args.years,
+        'series': args.countries * len(METRICS),
+        'trend_engine_ms': engine_ms,
+        'per_country_loop_ms': loop_ms,
+        'speedup': round(loop_ms / engine_ms, 1),
+        'max_slope_relative_error': float(f"{worst:.2e}"),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+from flask import Flask
+
+from config import Config
+from routes.api_routes import api
+from routes.page_routes import pages
+from services.analytics_services import AnalyticsService
+from services.data_service import DataService
+
+
+def create_app(config=Config):
+    app = Flask(__name__)
+    app.config.from_object(config)
+
+    data = DataService(
+        app.config['DATA_PATH'],
+        app.config['STORE_PATH'],
+        grid_degrees=app.config['GRID_DEGREES'],
+        block_bytes=app.config['INGEST_BLOCK_BYTES'],
+        max_results=app.config['MAX_RESULTS'],
+    )
+    app.extensions['crime_data'] = data
+    app.extensions['crime_analytics'] = AnalyticsService(data)
+
+    app.register_blueprint(pages)
+    app.register_blueprint(api)
+
+    @app.before_request
+    def watch_data():
+        # Started on the first request, so each gunicorn worker gets its own
+        # thread after the fork
+        data.watch(app.config['INGEST_INTERVAL'])
+
+    return app
+
+
+app = create_app()
+
+if __name__ == "__main__":
+    app.run(debug=True)
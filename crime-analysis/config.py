@@ -0,0 +1,27 @@
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Config:
+    # Incident CSV, one incident per line (see models/crime.py for columns)
+    DATA_PATH = os.getenv('CRIME_DATA_PATH', os.path.join(BASE_DIR, 'data', 'crime.csv'))
+    # SQLite store the CSV is ingested into; rebuilt if deleted
+    STORE_PATH = os.getenv('CRIME_STORE_PATH', os.path.join(BASE_DIR, 'instance', 'crime.db'))
+
+    # Bytes of CSV parsed per chunk, which bounds ingest memory whatever the
+    # file size: about 20x this on top of SQLite's 64MB page cache. Larger
+    # blocks do not ingest any faster.
+    INGEST_BLOCK_BYTES = int(os.getenv('INGEST_BLOCK_BYTES', 4 * 1024 * 1024))
+
+    # Seconds between checks for lines appended to DATA_PATH while serving;
+    # 0 turns it off. Run `python -m services.data_service` for a first
+    # load of a large file rather than leaving it to a web worker.
+    INGEST_INTERVAL = float(os.getenv('INGEST_INTERVAL', 60))
+
+    # Edge of a hotspot grid cell in degrees; 0.01 is about 1.1 km north-south.
+    # Changing it rebuilds the store on the next ingest.
+    GRID_DEGREES = float(os.getenv('GRID_DEGREES', 0.01))
+
+    # Upper bound on rows returned by any list endpoint
+    MAX_RESULTS = int(os.getenv('MAX_RESULTS', 1000))
@@ -0,0 +1,103 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Accepted header names for each field, matched case-insensitively. Only
+# time and category are required; rows without usable coordinates are kept
+# but have no grid cell, so they are left out of hotspots.
+COLUMN_ALIASES = {
+    'occurred_at': ['occurred_at', 'datetime', 'date', 'timestamp', 'time'],
+    'category': ['category', 'primary_type', 'crime_type', 'offense', 'type'],
+    'latitude': ['latitude', 'lat'],
+    'longitude': ['longitude', 'lon', 'lng'],
+}
+REQUIRED_FIELDS = ('occurred_at', 'category')
+
+NO_CELL = -1
+
+
+def resolve_columns(header):
+    """Map each field to the CSV column that holds it."""
+    lookup = {name.strip().lower(): name for name in header}
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        match = next((lookup[a] for a in aliases if a in lookup), None)
+        if match is not None:
+            columns[field] = match
+    missing = [f for f in REQUIRED_FIELDS if f not in columns]
+    if missing:
+        raise ValueError(f"crime.csv has no column for {', '.join(missing)} (header: {', '.join(header)})")
+    return columns
+
+
+class Grid:
+    """Fixed lat/lon grid; a cell id is ``row * cols + col``."""
+
+    def __init__(self, degrees):
+        self.degrees = degrees
+        self.cols = int(round(360 / degrees))
+
+    def cells(self, lat, lon):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        valid = (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        with np.errstate(invalid='ignore'):
+            rows = np.floor((lat + 90) / self.degrees)
+            cols = np.minimum(np.floor((lon + 180) / self.degrees), self.cols - 1)
+        cells = rows * self.cols + cols
+        return np.where(valid, cells, NO_CELL).astype(np.int64)
+
+    def bounds(self, cell, factor=1):
+        """(south, west, north, east) of ``cell`` in a grid ``factor`` times coarser.
+
+        Coarse cells keep the fine grid's numbering: ``(row // factor) * cols
+        + col // factor``.
+        """
+        row, col = divmod(int(cell), self.cols)
+        size = self.degrees * factor
+        south, west = row * size - 90, col * size - 180
+        return round(south, 6), round(west, 6), round(south + size, 6), round(west + size, 6)
+
+    def cell_range(self, south, west, north, east):
+        """Row and column ranges covering a bounding box."""
+        # Same arithmetic as cells(), so a box edge falls in the same cell as a point on it
+        rows = (math.floor((south + 90) / self.degrees), math.floor((north + 90) / self.degrees))
+        cols = (math.floor((west + 180) / self.degrees), math.floor((east + 180) / self.degrees))
+        return rows, cols
+
+
+def normalize(chunk, columns, grid):
+    """Parse one raw chunk into (ts, category, lat, lon, cell, month) columns.
+
+    ``ts`` is seconds since the epoch and ``category`` a Categorical of the
+    stripped names. Rows whose time does not parse or whose category is
+    blank are dropped; their count is returned alongside.
+    """
+    # Times with an offset are converted to UTC, naive ones taken as they are
+    ts = pd.to_datetime(chunk[columns['occurred_at']], errors='coerce', utc=True).dt.tz_localize(None)
+
+    # Strip each distinct name once rather than every row; blank and
+    # missing names end up as code -1
+    codes, names = pd.factorize(chunk[columns['category']])
+    merged, names = pd.factorize(pd.Index(names, dtype=object).str.strip())
+    merged = np.where(names.take(merged) == '', -1, merged) if len(names) else merged
+    codes = np.append(merged, -1)[codes]
+    keep = ts.notna().to_numpy() & (codes >= 0)
+
+    if 'latitude' in columns and 'longitude' in columns:
+        lat = pd.to_numeric(chunk[columns['latitude']], errors='coerce').to_numpy(np.float64)[keep]
+        lon = pd.to_numeric(chunk[columns['longitude']], errors='coerce').to_numpy(np.float64)[keep]
+    else:
+        lat = lon = np.full(int(keep.sum()), np.nan)
+
+    ts = ts[keep]
+    out = pd.DataFrame({
+        'ts': ts.to_numpy('datetime64[s]').astype(np.int64),
+        'category': pd.Categorical.from_codes(codes[keep], names),
+        'lat': lat,
+        'lon': lon,
+        'cell': grid.cells(lat, lon),
+        'month': (ts.dt.year * 12 + ts.dt.month - 1).to_numpy(np.int64),
+    })
+    return out, int((~keep).sum())
@@ -0,0 +1,102 @@
+import sqlite3
+from contextlib import contextmanager
+
+# incident holds every ingested row; the *_counts tables are rollups kept up
+# to date chunk by chunk during ingest, so analytics scan incidents only for
+# partial months. Times are seconds since the epoch: hour = ts / 3600,
+# day = ts / 86400, month = year * 12 + month - 1 and year = month / 12.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS category (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS incident (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    cell INTEGER NOT NULL,
+    lat REAL,
+    lon REAL
+);
+CREATE INDEX IF NOT EXISTS ix_incident_ts ON incident (ts);
+CREATE INDEX IF NOT EXISTS ix_incident_category_ts ON incident (category_id, ts);
+CREATE INDEX IF NOT EXISTS ix_incident_cell_ts ON incident (cell, ts);
+
+CREATE TABLE IF NOT EXISTS hour_counts (
+    hour INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (hour, category_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS day_counts (
+    day INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (day, category_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS cell_month_counts (
+    month INTEGER NOT NULL,
+    cell INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (month, cell, category_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS cell_year_counts (
+    year INTEGER NOT NULL,
+    cell INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (year, cell, category_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS ingest_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    source TEXT NOT NULL,
+    header TEXT NOT NULL,
+    grid_degrees REAL NOT NULL,
+    offset INTEGER NOT NULL,
+    head_sha1 TEXT NOT NULL,
+    tail_sha1 TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    skipped INTEGER NOT NULL,
+    min_ts INTEGER,
+    max_ts INTEGER,
+    updated_at REAL NOT NULL
+);
+"""
+
+TABLES = ['incident', 'category', 'hour_counts', 'day_counts', 'cell_month_counts', 'cell_year_counts', 'ingest_state']
+
+
+def connect(path):
+    # isolation_level=None: transactions are opened explicitly with BEGIN
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # 64MB page cache: index and rollup pages stay hot between chunk commits
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+@contextmanager
+def transaction(conn):
+    # IMMEDIATE takes the write lock up front, so two writers never both
+    # read the same ingest offset
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def clear(conn):
+    # Runs inside the caller's transaction
+    for table in TABLES:
+        conn.execute(f"DELETE FROM {table}")
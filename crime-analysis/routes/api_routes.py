@@ -0,0 +1,126 @@
+from datetime import date
+
+from flask import Blueprint, current_app, jsonify, request
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+
+def data_service():
+    return current_app.extensions['crime_data']
+
+
+def analytics():
+    return current_app.extensions['crime_analytics']
+
+
+@api.errorhandler(ValueError)
+def invalid_query(e):
+    return jsonify({"error": str(e)}), 400
+
+
+def day_arg(name, end=False):
+    """A YYYY-MM-DD parameter as days since the epoch; an end date is inclusive."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        day = (date.fromisoformat(value) - date(1970, 1, 1)).days
+    except ValueError:
+        raise ValueError(f"{name} must be a date like 2024-01-31, got {value!r}")
+    return day + 1 if end else day
+
+
+def int_arg(name, default, low, high):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}")
+    if not low <= number <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return number
+
+
+def bbox_arg():
+    """``bbox=south,west,north,east`` in degrees."""
+    value = request.args.get('bbox')
+    if not value:
+        return None
+    try:
+        south, west, north, east = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError("bbox must be south,west,north,east")
+    if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+        raise ValueError("bbox must be south,west,north,east within -90..90 and -180..180")
+    return south, west, north, east
+
+
+def categories_arg():
+    value = request.args.get('category')
+    return tuple(sorted({name.strip() for name in value.split(',') if name.strip()})) if value else None
+
+
+def range_args():
+    since, until = day_arg('since'), day_arg('until', end=True)
+    if since is not None and until is not None and since >= until:
+        raise ValueError("since must not be after until")
+    return since, until
+
+
+@api.route('/status')
+def status():
+    return jsonify(data_service().status())
+
+
+@api.route('/timeseries')
+def timeseries():
+    since, until = range_args()
+    result = analytics().timeseries(request.args.get('bucket', 'day'), since, until, categories_arg())
+    return jsonify(result)
+
+
+@api.route('/hotspots')
+def hotspots():
+    since, until = range_args()
+    result = analytics().hotspots(
+        since, until, categories_arg(), bbox_arg(),
+        zoom=int_arg('zoom', 1, 1, 1000),
+        limit=int_arg('limit', 100, 1, current_app.config['MAX_RESULTS']),
+    )
+    return jsonify(result)
+
+
+@api.route('/categories')
+def categories():
+    since, until = range_args()
+    return jsonify(analytics().categories(since, until, bbox_arg()))
+
+
+@api.route('/incidents')
+def incidents():
+    since, until = range_args()
+    names = categories_arg()
+    if names and len(names) > 1:
+        raise ValueError("incidents take a single category")
+    category_id = analytics().category_ids(names)[0] if names else None
+
+    before = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            ts, id_ = cursor.split(':')
+            before = (int(ts), int(id_))
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+
+    items, next_cursor = data_service().incidents(
+        since=None if since is None else since * 86400,
+        until=None if until is None else until * 86400,
+        category_id=category_id,
+        bbox=bbox_arg(),
+        before=before,
+        limit=int_arg('limit', 100, 1, current_app.config['MAX_RESULTS']),
+    )
+    return jsonify({"count": len(items), "incidents": items, "next_cursor": next_cursor})
@@ -0,0 +1,247 @@
+"""Counts over the ingested incidents, answered from the rollup tables.
+
+Time series and category totals read ``day_counts``/``hour_counts``, whose
+size grows with the number of days rather than of incidents. Hotspots read
+``cell_year_counts`` and ``cell_month_counts`` for whole years and months
+and only scan incidents, through the ``ts`` index, for the partial months
+at either end of a range. A bounding box is exact, as for
+``/api/incidents``: cells wholly inside it come from the rollups, and the
+cells along its edges are counted from incidents by position. Results are
+cached per store version, so repeated queries between ingests cost one
+lookup.
+
+Ranges are whole days: ``since`` inclusive and ``until`` exclusive, as days
+since the epoch.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from models.crime import NO_CELL
+
+EPOCH = date(1970, 1, 1)
+
+# Bucket -> (rollup table, SQL expression labelling a row's bucket)
+BUCKETS = {
+    'hour': ('hour_counts', "strftime('%Y-%m-%dT%H:00', hour * 3600, 'unixepoch')"),
+    'day': ('day_counts', "date(day * 86400, 'unixepoch')"),
+    'week': ('day_counts', "date(day * 86400, 'unixepoch', 'weekday 0', '-6 days')"),
+    'month': ('day_counts', "strftime('%Y-%m', day * 86400, 'unixepoch')"),
+}
+
+# Hour buckets read one rollup row per hour and category
+MAX_HOUR_RANGE_DAYS = 31
+
+
+def _month(day):
+    d = EPOCH + timedelta(days=day)
+    return d.year * 12 + d.month - 1
+
+
+def _first_day(month):
+    return (date(month // 12, month % 12 + 1, 1) - EPOCH).days
+
+
+class AnalyticsService:
+
+    def __init__(self, data, cache_size=256):
+        self.data = data
+        self.grid = data.grid
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_version = None
+        self._lock = threading.Lock()
+
+    def _cached(self, key, compute):
+        version = self.data.version()
+        with self._lock:
+            if version != self._cache_version:
+                self._cache.clear()
+                self._cache_version = version
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        result = compute()
+        with self._lock:
+            if version == self._cache_version:
+                self._cache[key] = result
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    def category_ids(self, names):
+        """Ids for category names; raises ValueError on an unknown one."""
+        if not names:
+            return None
+        known = self.data.categories()
+        unknown = [name for name in names if name not in known]
+        if unknown:
+            raise ValueError(f"Unknown category: {', '.join(unknown)}")
+        return tuple(sorted(known[name] for name in names))
+
+    def timeseries(self, bucket='day', since=None, until=None, categories=None):
+        if bucket not in BUCKETS:
+            raise ValueError(f"Unknown bucket: {bucket} (use {', '.join(BUCKETS)})")
+        if bucket == 'hour' and (since is None or until is None or until - since > MAX_HOUR_RANGE_DAYS):
+            raise ValueError(f"Hour buckets need a range of at most {MAX_HOUR_RANGE_DAYS} days")
+        ids = self.category_ids(categories)
+        return self._cached(('timeseries', bucket, since, until, ids),
+                            lambda: self._timeseries(bucket, since, until, ids))
+
+    def _timeseries(self, bucket, since, until, ids):
+        table, label = BUCKETS[bucket]
+        column, scale = ('hour', 24) if table == 'hour_counts' else ('day', 1)
+        where, params = self._range_filter(column, since, until, scale)
+        if ids:
+            where.append(f"category_id IN ({', '.join('?' * len(ids))})")
+            params += ids
+        rows = self.data.connection().execute(
+            f"SELECT {label} AS period, SUM(n) FROM {table} "
+            f"{'WHERE ' + ' AND '.join(where) if where else ''} GROUP BY period ORDER BY period",
+            params,
+        ).fetchall()
+        return {
+            'bucket': bucket,
+            'total': sum(n for _, n in rows),
+            'series': [{'period': period, 'count': n} for period, n in rows],
+        }
+
+    def categories(self, since=None, until=None, bbox=None):
+        return self._cached(('categories', since, until, bbox), lambda: self._categories(since, until, bbox))
+
+    def _categories(self, since, until, bbox):
+        conn = self.data.connection()
+        if bbox is None:
+            where, params = self._range_filter('day', since, until)
+            sql = (f"SELECT category_id, SUM(n) FROM day_counts "
+                   f"{'WHERE ' + ' AND '.join(where) if where else ''} GROUP BY category_id")
+        else:
+            cells, params = self._cell_counts(since, until, None, bbox)
+            sql = f"SELECT category_id, SUM(n) FROM ({cells}) GROUP BY category_id"
+        names = {id_: name for name, id_ in self.data.categories().items()}
+        rows = sorted(conn.execute(sql, params).fetchall(), key=lambda row: -row[1])
+        total = sum(n for _, n in rows)
+        return {
+            'total': total,
+            'categories': [
+                {'category': names[id_], 'count': n, 'share': round(n / total, 4)}
+                for id_, n in rows
+            ],
+        }
+
+    def hotspots(self, since=None, until=None, categories=None, bbox=None, zoom=1, limit=100):
+        """Busiest grid cells, ``zoom`` times coarser than the stored grid."""
+        if zoom < 1:
+            raise ValueError("zoom must be at least 1")
+        ids = self.category_ids(categories)
+        return self._cached(('hotspots', since, until, ids, bbox, zoom, limit),
+                            lambda: self._hotspots(since, until, ids, bbox, zoom, limit))
+
+    def _hotspots(self, since, until, ids, bbox, zoom, limit):
+        cols = self.grid.cols
+        cells, params = self._cell_counts(since, until, ids, bbox)
+        rows = self.data.connection().execute(
+            f"SELECT ((cell / {cols}) / ?) * {cols} + (cell % {cols}) / ? AS coarse, SUM(n) AS total "
+            f"FROM ({cells}) GROUP BY coarse ORDER BY total DESC, coarse LIMIT ?",
+            [zoom, zoom] + params + [limit],
+        ).fetchall()
+        hotspots = []
+        for cell, n in rows:
+            south, west, north, east = self.grid.bounds(cell, zoom)
+            hotspots.append({
+                'cell': cell,
+                'count': n,
+                'bounds': [south, west, north, east],
+                'center': [round((south + north) / 2, 6), round((west + east) / 2, 6)],
+            })
+        return {'cell_degrees': round(self.grid.degrees * zoom, 6), 'hotspots': hotspots}
+
+    def _range_filter(self, column, since, until, scale=1):
+        where, params = [], []
+        if since is not None:
+            where.append(f"{column} >= ?")
+            params.append(since * scale)
+        if until is not None:
+            where.append(f"{column} < ?")
+            params.append(until * scale)
+        return where, params
+
+    def _cell_counts(self, since, until, ids, bbox):
+        """SQL yielding (cell, category_id, n) for located incidents in range.
+
+        Whole years come from ``cell_year_counts``, whole months around them
+        from ``cell_month_counts``, and only the days before the first and
+        after the last whole month are counted from incidents. With a
+        ``bbox``, that covers the cells strictly inside its edge cells; the
+        edge cells, which it may only partly cover, are counted from
+        incidents by latitude and longitude.
+        """
+        first = None if since is None else _month(since) + (_first_day(_month(since)) != since)
+        last = None if until is None else _month(until)
+        filters, filter_params = [], []
+        if ids:
+            filters.append(f"category_id IN ({', '.join('?' * len(ids))})")
+            filter_params += ids
+
+        parts, params = [], []
+        if bbox is not None:
+            south, west, north, east = bbox
+            (row0, row1), (col0, col1) = self.grid.cell_range(*bbox)
+            where, where_params = self._range_filter('ts', since, until, 86400)
+            parts.append("SELECT cell, category_id, COUNT(*) AS n FROM incident WHERE "
+                         + ' AND '.join(where + [self._edge_cells(row0, row1, col0, col1),
+                                                 "lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?"] + filters)
+                         + " GROUP BY cell, category_id")
+            params.extend(where_params + [south, north, west, east] + filter_params)
+            # Points in a cell past the edge ones lie strictly inside the box
+            cols = self.grid.cols
+            filters.append(f"cell / {cols} BETWEEN ? AND ? AND cell % {cols} BETWEEN ? AND ?")
+            filter_params += [row0 + 1, row1 - 1, col0 + 1, col1 - 1]
+
+        def add_rollup(table, column, low, high):
+            if low is not None and high is not None and low >= high:
+                return
+            where, where_params = self._range_filter(column, low, high)
+            parts.append(f"SELECT cell, category_id, n FROM {table} WHERE " + ' AND '.join(where + filters or ['1']))
+            params.extend(where_params + filter_params)
+
+        def add_incidents(low, high):
+            if low >= high:
+                return
+            parts.append("SELECT cell, category_id, COUNT(*) AS n FROM incident WHERE ts >= ? AND ts < ? "
+                         f"AND cell != {NO_CELL} {''.join(' AND ' + f for f in filters)} GROUP BY cell, category_id")
+            params.extend([low * 86400, high * 86400] + filter_params)
+
+        if first is not None and last is not None and first >= last:
+            # Inside a single month, or spanning two without a whole one
+            add_incidents(since, until)
+            return " UNION ALL ".join(parts), params
+
+        # Whole years within the whole months, then the months either side
+        first_year = None if first is None else -(-first // 12)
+        last_year = None if last is None else last // 12
+        if first_year is not None and last_year is not None and first_year >= last_year:
+            add_rollup('cell_month_counts', 'month', first, last)
+        else:
+            add_rollup('cell_year_counts', 'year', first_year, last_year)
+            if first is not None:
+                add_rollup('cell_month_counts', 'month', first, first_year * 12)
+            if last is not None:
+                add_rollup('cell_month_counts', 'month', last_year * 12, last)
+        if first is not None:
+            add_incidents(since, _first_day(first))
+        if last is not None:
+            add_incidents(_first_day(last), until)
+        return " UNION ALL ".join(parts), params
+
+    def _edge_cells(self, row0, row1, col0, col1):
+        """SQL condition matching the cells along the edges of a cell range."""
+        cols = self.grid.cols
+        # Boxes of modest size list their edge cells, so each is one seek on
+        # the (cell, ts) index rather than a scan of the whole range
+        if (row1 - row0) + (col1 - col0) < 512:
+            cells = {row * cols + col for row in {row0, row1} for col in range(col0, col1 + 1)}
+            cells |= {row * cols + col for row in range(row0 + 1, row1) for col in (col0, col1)}
+            return f"cell IN ({', '.join(map(str, sorted(cells)))})"
+        return (f"cell / {cols} BETWEEN {row0} AND {row1} AND cell % {cols} BETWEEN {col0} AND {col1} "
+                f"AND (cell / {cols} IN ({row0}, {row1}) OR cell % {cols} IN ({col0}, {col1}))")
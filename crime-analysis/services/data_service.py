@@ -0,0 +1,364 @@
+"""Chunked, resumable ingest of crime.csv into the SQLite store.
+
+The CSV is read in blocks of ``block_bytes``, each cut at its last newline
+and parsed on its own, so memory stays flat however large the file is.
+Every block is one transaction that inserts its incidents, adds its counts
+to the rollup tables and moves the saved byte offset past it. An
+interrupted ingest therefore resumes at the first unsaved block, and lines
+appended to the file later are picked up from where the last run stopped.
+The store is rebuilt from scratch if the file was rewritten instead: a
+different header or grid size, a file shorter than the saved offset, or a
+different first or last 4KB before it. Edits in the middle of the
+ingested part are not noticed; delete the store to force a rebuild.
+
+Lines must not contain newlines inside quoted fields. A last line without a
+trailing newline is left until it gets one, since it may still be being
+written.
+
+    python -m services.data_service
+"""
+import csv
+import hashlib
+import os
+import threading
+import time
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from models.crime import NO_CELL, Grid, normalize, resolve_columns
+from models.models import clear, connect, transaction
+
+# Bytes at the start of the file and just before the saved offset that are
+# compared to tell an append from a rewrite
+SAMPLE_BYTES = 4096
+
+STATE_FIELDS = ('source', 'header', 'grid_degrees', 'offset', 'head_sha1', 'tail_sha1', 'rows', 'skipped',
+                'min_ts', 'max_ts', 'updated_at')
+
+# Rollup table -> its key columns; counts are added to whatever is stored
+ROLLUPS = {
+    'hour_counts': ('hour', 'category_id'),
+    'day_counts': ('day', 'category_id'),
+    'cell_month_counts': ('month', 'cell', 'category_id'),
+    'cell_year_counts': ('year', 'cell', 'category_id'),
+}
+
+
+def _upsert(table, keys):
+    return (
+        f"INSERT INTO {table} ({', '.join(keys)}, n) VALUES ({', '.join('?' * (len(keys) + 1))}) "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET n = n + excluded.n"
+    )
+
+
+def _rows(frame):
+    # Plain Python values, which sqlite3 binds; numpy scalars it does not
+    return zip(*(frame[column].tolist() for column in frame.columns))
+
+
+class DataService:
+    """Owns the store: ingest, ingest status and incident drill-down."""
+
+    def __init__(self, data_path, store_path, grid_degrees=0.01, block_bytes=4 * 1024 * 1024,
+                 max_results=1000):
+        self.data_path = data_path
+        self.store_path = store_path
+        self.grid = Grid(grid_degrees)
+        self.block_bytes = block_bytes
+        self.max_results = max_results
+        self._local = threading.local()
+        self._ingest_lock = threading.Lock()
+        self._watcher_pid = None
+
+    def connection(self):
+        # One connection per thread, opened again in each forked worker
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.store_path)), exist_ok=True)
+            local.conn = connect(self.store_path)
+            local.pid = os.getpid()
+        return local.conn
+
+    def state(self, conn=None):
+        conn = conn or self.connection()
+        row = conn.execute(f"SELECT {', '.join(STATE_FIELDS)} FROM ingest_state WHERE id = 1").fetchone()
+        return dict(zip(STATE_FIELDS, row)) if row else None
+
+    def version(self):
+        """Changes whenever an ingest commits; cached results are keyed by it."""
+        row = self.connection().execute("SELECT offset, updated_at FROM ingest_state WHERE id = 1").fetchone()
+        return tuple(row) if row else None
+
+    def status(self):
+        state = self.state() or {}
+        try:
+            size = os.path.getsize(self.data_path)
+        except OSError:
+            size = None
+        offset = state.get('offset')
+        return {
+            'data_path': self.data_path,
+            'file_bytes': size,
+            'ingested_bytes': offset,
+            'pending_bytes': None if size is None else max(size - (offset or 0), 0),
+            'rows': state.get('rows', 0),
+            'skipped': state.get('skipped', 0),
+            'first_incident': self._iso(state.get('min_ts')),
+            'last_incident': self._iso(state.get('max_ts')),
+            'grid_degrees': self.grid.degrees,
+            'updated_at': state.get('updated_at'),
+            'ingesting': self._ingest_lock.locked(),
+        }
+
+    def categories(self):
+        return dict(self.connection().execute("SELECT name, id FROM category"))
+
+    def ingest(self, progress=None):
+        """Ingest everything after the saved offset.
+
+        Returns ``{'blocks', 'rows', 'skipped', 'seconds'}``, or None when
+        this process is already ingesting. ``progress(totals, offset,
+        size)`` is called after each block.
+        """
+        if not self._ingest_lock.acquire(blocking=False):
+            return None
+        try:
+            return self._ingest(progress)
+        finally:
+            self._ingest_lock.release()
+
+    def _ingest(self, progress):
+        conn = self.connection()
+        started = time.perf_counter()
+        totals = {'blocks': 0, 'rows': 0, 'skipped': 0}
+
+        with open(self.data_path, 'rb') as f:
+            header_line = f.readline()
+            header_text = header_line.decode('utf-8-sig').strip()
+            if not header_text:
+                return dict(totals, seconds=0.0)
+            header = next(csv.reader([header_text]))
+            columns = resolve_columns(header)
+            size = os.fstat(f.fileno()).st_size
+
+            # Decided under the write lock, so two processes never both rebuild
+            with transaction(conn):
+                state = self.state(conn)
+                if state is None or not self._continues(f, state, header_text, size):
+                    if state is not None:
+                        print(f"♻️ {self.data_path} was rewritten, rebuilding {self.store_path}")
+                    clear(conn)
+                    conn.execute(
+                        f"INSERT INTO ingest_state ({', '.join(STATE_FIELDS)}) VALUES ({', '.join('?' * len(STATE_FIELDS))})",
+                        (os.path.abspath(self.data_path), header_text, self.grid.degrees, len(header_line),
+                         hashlib.sha1(header_line[:SAMPLE_BYTES]).hexdigest(),
+                         hashlib.sha1(header_line[-SAMPLE_BYTES:]).hexdigest(), 0, 0, None, None, time.time()),
+                    )
+                start = self.state(conn)['offset']
+
+            head, tail = self._head(f, start), self._tail(f, start)
+            f.seek(start)
+            pending = b''
+            while True:
+                data = f.read(self.block_bytes)
+                if not data:
+                    break
+                block = pending + data
+                cut = block.rfind(b'\n') + 1
+                pending = block[cut:]
+                if cut == 0:
+                    continue
+                block = block[:cut]
+                head = (head + block)[:SAMPLE_BYTES] if len(head) < SAMPLE_BYTES else head
+                tail = (tail + block)[-SAMPLE_BYTES:]
+                fingerprint = hashlib.sha1(head).hexdigest(), hashlib.sha1(tail).hexdigest()
+                counts = self._ingest_block(conn, block, header, columns, start, start + cut, fingerprint)
+                if counts is None:
+                    # Another process ingested this block first and carries on from here
+                    break
+                start += cut
+                totals['blocks'] += 1
+                totals['rows'] += counts[0]
+                totals['skipped'] += counts[1]
+                if progress:
+                    progress(totals, start, max(size, start))
+
+        return dict(totals, seconds=round(time.perf_counter() - started, 3))
+
+    def _continues(self, f, state, header_text, size):
+        if (state['source'], state['header'], state['grid_degrees']) != \
+                (os.path.abspath(self.data_path), header_text, self.grid.degrees):
+            return False
+        if size < state['offset']:
+            return False
+        offset = state['offset']
+        return (hashlib.sha1(self._head(f, offset)).hexdigest(), hashlib.sha1(self._tail(f, offset)).hexdigest()) \
+            == (state['head_sha1'], state['tail_sha1'])
+
+    def _head(self, f, offset):
+        f.seek(0)
+        return f.read(min(offset, SAMPLE_BYTES))
+
+    def _tail(self, f, offset):
+        f.seek(max(offset - SAMPLE_BYTES, 0))
+        return f.read(offset - max(offset - SAMPLE_BYTES, 0))
+
+    def _ingest_block(self, conn, block, header, columns, start, end, fingerprint):
+        # Cheap early out before parsing when another process got here first
+        if self._offset(conn) != start:
+            return None
+
+        text_columns = {columns['occurred_at']: str, columns['category']: str}
+        chunk = pd.read_csv(
+            BytesIO(block), header=None, names=header, usecols=list(columns.values()),
+            dtype=text_columns, on_bad_lines='skip', encoding_errors='replace',
+        )
+        frame, _ = normalize(chunk, columns, self.grid)
+        del chunk
+        # Lines the parser rejected count too, not only rows normalize() dropped
+        skipped = block.count(b'\n') - len(frame)
+
+        with transaction(conn):
+            state = self.state(conn)
+            if state['offset'] != start:
+                return None
+
+            names = frame['category'].cat.categories
+            ids = self._category_ids(conn, names)
+            lookup = np.array([ids[name] for name in names], dtype=np.int64)
+            frame['category_id'] = lookup[frame['category'].cat.codes.to_numpy()]
+            frame['hour'] = frame['ts'] // 3600
+            frame['day'] = frame['ts'] // 86400
+            frame['year'] = frame['month'] // 12
+
+            conn.executemany(
+                "INSERT INTO incident (ts, category_id, cell, lat, lon) VALUES (?, ?, ?, ?, ?)",
+                _rows(frame[['ts', 'category_id', 'cell', 'lat', 'lon']]),
+            )
+            located = frame[frame['cell'] != NO_CELL]
+            for table, keys in ROLLUPS.items():
+                source = located if 'cell' in keys else frame
+                counts = source.groupby(list(keys)).size().rename('n').reset_index()
+                conn.executemany(_upsert(table, keys), _rows(counts))
+
+            min_ts, max_ts = state['min_ts'], state['max_ts']
+            if len(frame):
+                low, high = int(frame['ts'].min()), int(frame['ts'].max())
+                min_ts = low if min_ts is None else min(min_ts, low)
+                max_ts = high if max_ts is None else max(max_ts, high)
+            conn.execute(
+                "UPDATE ingest_state SET offset = ?, head_sha1 = ?, tail_sha1 = ?, rows = rows + ?, "
+                "skipped = skipped + ?, min_ts = ?, max_ts = ?, updated_at = ? WHERE id = 1",
+                (end, *fingerprint, len(frame), skipped, min_ts, max_ts, time.time()),
+            )
+        return len(frame), skipped
+
+    def _offset(self, conn):
+        row = conn.execute("SELECT offset FROM ingest_state WHERE id = 1").fetchone()
+        return row[0] if row else None
+
+    def _category_ids(self, conn, names):
+        known = dict(conn.execute("SELECT name, id FROM category"))
+        new = [(name,) for name in names if name not in known]
+        if new:
+            conn.executemany("INSERT INTO category (name) VALUES (?)", new)
+            known = dict(conn.execute("SELECT name, id FROM category"))
+        return known
+
+    def watch(self, interval):
+        """Ingest new lines every ``interval`` seconds from a background thread.
+
+        Started once per process, so each forked worker gets its own; the
+        offset check in every block keeps them from ingesting a block twice.
+        """
+        if interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        self._watcher_pid = os.getpid()
+        threading.Thread(target=self._watch, args=(interval,), name='crime-ingest', daemon=True).start()
+
+    def _watch(self, interval):
+        while True:
+            try:
+                if os.path.exists(self.data_path):
+                    totals = self.ingest()
+                    if totals and totals['rows']:
+                        print(f"📥 Ingested {totals['rows']:,} incident(s) in {totals['seconds']}s")
+            except Exception as e:
+                print(f"⚠️ Ingest failed, retrying in {interval}s: {e}")
+            time.sleep(interval)
+
+    def incidents(self, since=None, until=None, category_id=None, bbox=None, before=None, limit=100):
+        """Incidents newest first, ``limit`` at a time.
+
+        ``since``/``until`` are epoch seconds (until exclusive), ``bbox`` is
+        (south, west, north, east) and ``before`` is the ``(ts, id)`` cursor
+        returned with the previous page.
+        """
+        where, params = [], []
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            params.append(until)
+        if category_id is not None:
+            where.append("category_id = ?")
+            params.append(category_id)
+        if bbox is not None:
+            south, west, north, east = bbox
+            where.append("lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?")
+            params += [south, north, west, east]
+            (row0, row1), (col0, col1) = self.grid.cell_range(*bbox)
+            # Small boxes narrow by cell first, which the (cell, ts) index serves
+            if row1 - row0 < 64:
+                ranges = [(row * self.grid.cols + col0, row * self.grid.cols + col1) for row in range(row0, row1 + 1)]
+                where.append("(" + " OR ".join("cell BETWEEN ? AND ?" for _ in ranges) + ")")
+                params += [bound for pair in ranges for bound in pair]
+        if before is not None:
+            where.append("(ts, incident.id) < (?, ?)")
+            params += list(before)
+
+        limit = max(1, min(limit, self.max_results))
+        rows = self.connection().execute(
+            "SELECT incident.id, ts, category.name, lat, lon FROM incident "
+            "JOIN category ON category.id = incident.category_id "
+            f"{'WHERE ' + ' AND '.join(where) if where else ''} "
+            "ORDER BY ts DESC, incident.id DESC LIMIT ?",
+            params + [limit],
+        ).fetchall()
+
+        items = [
+            {'id': id_, 'occurred_at': self._iso(ts), 'category': name, 'latitude': lat, 'longitude': lon}
+            for id_, ts, name, lat, lon in rows
+        ]
+        cursor = f"{rows[-1][1]}:{rows[-1][0]}" if len(rows) == limit else None
+        return items, cursor
+
+    @staticmethod
+    def _iso(ts):
+        if ts is None:
+            return None
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(ts))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Ingest crime.csv into the store")
+    parser.add_argument('--data', default=Config.DATA_PATH)
+    parser.add_argument('--store', default=Config.STORE_PATH)
+    args = parser.parse_args()
+
+    service = DataService(args.data, args.store, Config.GRID_DEGREES, Config.INGEST_BLOCK_BYTES)
+    started = time.perf_counter()
+
+    def report(totals, offset, size):
+        elapsed = time.perf_counter() - started
+        print(f"📥 {offset / size:6.1%}  {totals['rows']:,} rows  {totals['rows'] / elapsed:,.0f} rows/s")
+
+    totals = service.ingest(report)
+    print(f"✅ Ingested {totals['rows']:,} incident(s), skipped {totals['skipped']:,}, in {totals['seconds']}s")
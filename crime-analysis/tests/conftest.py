@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+# The app's packages import by bare name, as they do when run from
+# crime-analysis/ under gunicorn or flask
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(APP_DIR), 'benchmarks'))
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The app over three years of synthetic incidents from benchmarks/."""
+    from app import create_app
+    from config import Config
+    from incident_benchmark import write_synthetic_incidents
+
+    directory = tmp_path_factory.mktemp('crime-analysis')
+
+    class TestConfig(Config):
+        DATA_PATH = write_synthetic_incidents(str(directory / 'crime.csv'), 200_000, years=3)
+        STORE_PATH = str(directory / 'crime.db')
+        INGEST_INTERVAL = 0
+
+    app = create_app(TestConfig)
+    app.extensions['crime_data'].ingest()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,51 @@
+"""Bounding boxes count the same incidents in every endpoint."""
+from datetime import date
+
+import pytest
+
+BOXES = {
+    'benchmark': (41.85, -87.70, 41.90, -87.60),
+    'one_cell': (41.8501, -87.6999, 41.8599, -87.6901),
+    # Tall enough for the edge cells to be matched arithmetically, not listed
+    'tall': (39.0, -87.80, 45.0, -87.75),
+}
+RANGES = {
+    'all': (None, None),
+    'year': ('2023-01-01', '2023-12-31'),
+    'partial_months': ('2022-03-15', '2023-08-20'),
+    'one_month': ('2023-02-10', '2023-02-20'),
+}
+
+
+def epoch_seconds(day, end=False):
+    return None if day is None else ((date.fromisoformat(day) - date(1970, 1, 1)).days + end) * 86400
+
+
+def in_box(app, bbox, since, until):
+    """What /api/incidents would page through for the same query."""
+    south, west, north, east = bbox
+    sql = "SELECT COUNT(*) FROM incident WHERE lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?"
+    params = [south, north, west, east]
+    if since is not None:
+        sql += " AND ts >= ? AND ts < ?"
+        params += [epoch_seconds(since), epoch_seconds(until, end=True)]
+    return app.extensions['crime_data'].connection().execute(sql, params).fetchone()[0]
+
+
+@pytest.mark.parametrize('box', BOXES)
+@pytest.mark.parametrize('period', RANGES)
+def test_categories_and_hotspots_count_exactly_the_box(app, client, box, period):
+    bbox, (since, until) = BOXES[box], RANGES[period]
+    query = f"bbox={','.join(map(str, bbox))}" + (f"&since={since}&until={until}" if since else '')
+    expected = in_box(app, bbox, since, until)
+    assert expected > 0
+
+    assert client.get(f"/api/categories?{query}").get_json()['total'] == expected
+    hotspots = client.get(f"/api/hotspots?{query}&limit=1000").get_json()['hotspots']
+    assert len(hotspots) < 1000
+    assert sum(spot['count'] for spot in hotspots) == expected
+
+
+def test_without_bbox_categories_count_everything(app, client):
+    total = app.extensions['crime_data'].connection().execute("SELECT COUNT(*) FROM incident").fetchone()[0]
+    assert client.get('/api/categories').get_json()['total'] == total
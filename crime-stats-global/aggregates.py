@@ -0,0 +1,99 @@
+import numpy as np
+
+
+class AggregateCube:
+    """Year x country sums for every metric, materialized once per dataset.
+
+    Each metric is stored as a float32 ``(years, countries)`` grid with NaN
+    where a country has no value for a year, plus a per-year total across all
+    countries. The sums themselves come from the same pandas groupbys the
+    routes used to run per request, so lookups match them value for value.
+    """
+
+    def __init__(self, df, metrics):
+        self.metrics = [m for m in metrics if m in df.columns]
+
+        df = df.dropna(subset=['Country', 'Year'])
+        countries = sorted(str(c) for c in df['Country'].unique())
+        years = np.sort(df['Year'].unique())
+
+        self.countries = countries
+        self.years = years.astype(np.int16)
+        self._country_index = {c: i for i, c in enumerate(countries)}
+
+        shape = (len(self.years), len(self.countries))
+        cells = df.groupby(['Year', 'Country'], observed=True)
+        keys = cells.size()
+        year_codes = np.searchsorted(self.years, keys.index.get_level_values('Year'))
+        country_codes = np.array([self._country_index[str(c)] for c in keys.index.get_level_values('Country')], dtype=np.intp)
+
+        self.has_row = np.zeros(shape, dtype=bool)
+        self.has_row[year_codes, country_codes] = True
+
+        cell_sums = cells[self.metrics].sum(min_count=1)
+        year_totals = df.groupby('Year')[self.metrics].sum().reindex(self.years, fill_value=0)
+
+        self.grids = {}
+        self.year_totals = {}
+        for metric in self.metrics:
+            grid = np.full(shape, np.nan, dtype=np.float32)
+            grid[year_codes, country_codes] = cell_sums[metric].to_numpy(dtype=np.float32)
+            self.grids[metric] = grid
+            self.year_totals[metric] = year_totals[metric].to_numpy(dtype=np.float32)
+
+        row_totals = df[self.metrics].sum(axis=1).groupby([df['Year'], df['Country']], observed=True).sum()
+        self.total_grid = np.zeros(shape, dtype=np.float32)
+        self.total_grid[year_codes, country_codes] = row_totals.to_numpy(dtype=np.float32)
+
+    def year_mask(self, start=None, end=None):
+        mask = np.ones(len(self.years), dtype=bool)
+        if start is not None:
+            mask &= self.years >= start
+        if end is not None:
+            mask &= self.years <= end
+        return mask
+
+    def country_list(self, start=None, end=None):
+        present = self.has_row[self.year_mask(start, end)].any(axis=0)
+        return [c for c, p in zip(self.countries, present) if p]
+
+    def series(self, metric, country=None, start=None, end=None):
+        """Yearly values of ``metric`` for one country, or summed over all."""
+        mask = self.year_mask(start, end)
+        if country is None:
+            values = self.year_totals[metric]
+        else:
+            index = self._country_index.get(country)
+            if index is None:
+                return {'years': [], 'values': []}
+            values = self.grids[metric][:, index]
+            mask &= ~np.isnan(values)
+        return {'years': self.years[mask].tolist(), 'values': _floats(values[mask])}
+
+    def by_country(self, metric, year):
+        rows = np.flatnonzero(self.years == year)
+        if len(rows) == 0:
+            return {}
+        row = rows[0]
+        values = np.nan_to_num(self.grids[metric][row])
+        return {
+            country: value
+            for country, value, present in zip(self.countries, _floats(values), self.has_row[row])
+            if present
+        }
+
+    def top_countries(self, n=20, start=None, end=None):
+        mask = self.year_mask(start, end)
+        present = self.has_row[mask].any(axis=0)
+        totals = self.total_grid[mask].sum(axis=0, dtype=np.float64).astype(np.float32)
+        order = [i for i in np.argsort(-totals, kind='stable') if present[i]][:n]
+        return [{'Country': self.countries[i], 'total_crime': value} for i, value in zip(order, _floats(totals[order]))]
+
+
+def _floats(values):
+    """float32 values as the shortest floats that read back as the same float32.
+
+    ``tolist()`` widens them to float64 first, which turns 2063.4 into
+    2063.39990234375 in every JSON response.
+    """
+    return [float(str(v)) for v in np.asarray(values, dtype=np.float32)]
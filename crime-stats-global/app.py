@@ -1,14 +1,30 @@
-from flask import Flask, render_template, request, redirect, url_for,jsonify
-import pandas as pd
-from urllib.parse import unquote 
-import json
+from flask import Flask, Response, render_template, request, redirect, url_for,jsonify
+from urllib.parse import unquote, urlsplit
 from io import StringIO
 from datetime import datetime
-import os , requests 
-import feedparser
-from combine_crime_data import get_crime_summary
+import os , tempfile
+import orjson
+from data_store import DatasetStore
+from http_cache import ResponseCache
+from ttl_cache import SWRCache
+from news_feed import FeedRefresher
+from metrics import Registry, instrument
+from profiler import RequestProfiler
+from snapshot import snapshot_path
+# pandas, numpy, requests and feedparser are imported where first used, so
+# importing this module stays cheap for serverless cold starts; see warm()
+# for loading everything up front in a gunicorn master.
 app = Flask(__name__)
 
+# Prometheus metrics on /metrics; METRICS_DIR merges every gunicorn worker
+metrics = Registry(os.getenv('METRICS_DIR'))
+# Sampling profiler for single requests, off unless PROFILE_TOKEN is set
+profiler = RequestProfiler(
+    token=os.getenv('PROFILE_TOKEN'),
+    directory=os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'crime-stats-profiles')),
+)
+instrument(app, metrics, profiler)
+
 DISPLAY_LABELS = {
     'corruption_and_economic_crime': 'Corruption and Economic Crime',
     'intentional_homicide': 'Intentional Homicide',
@@ -18,22 +34,66 @@ DISPLAY_LABELS = {
 }
 
 # Local path for development
-DATA_PATH = 'crime-stats-global/static/data/cleaned_global_crime_data.csv'
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.getenv('DATA_PATH', os.path.join(BASE_DIR, 'static', 'data', 'cleaned_global_crime_data.csv'))
 
 # Raw GitHub URL for production (replace with your actual repo URL)
-DATA_URL = 'https://raw.githubusercontent.com/TanisshaDash/flask-projects/refs/heads/main/crime-stats-global/static/data/cleaned_global_crime_data.csv'
+DATA_URL = os.getenv('DATA_URL', 'https://raw.githubusercontent.com/TanisshaDash/flask-projects/refs/heads/main/crime-stats-global/static/data/cleaned_global_crime_data.csv')
+
+# Prebuilt aggregates shipped with the columnar copy (python snapshot.py);
+# an empty DATA_SNAPSHOT always builds them at startup instead
+DATA_SNAPSHOT = os.getenv('DATA_SNAPSHOT', snapshot_path(DATA_PATH))
+
+YEAR_RANGE = (2019, 2024)
+
+def build_cube(df):
+    from aggregates import AggregateCube
+    return AggregateCube(df, DISPLAY_LABELS.keys())
+
+def build_summary(df):
+    from summary import SummaryEngine
+    return SummaryEngine(df, DISPLAY_LABELS.keys())
+
+def build_trends(df):
+    from trends import TrendEngine
+    return TrendEngine(df, DISPLAY_LABELS.keys())
+
+# Parsed once per worker; reloaded when the file's mtime or the URL's ETag changes
+store = DatasetStore(DATA_PATH, DATA_URL, builders={
+    'cube': build_cube,
+    'summary': build_summary,
+    'trends': build_trends,
+}, timer=metrics.timed, snapshot=DATA_SNAPSHOT or None)
+
+# Rendered pages and API bodies, invalidated by dataset version
+response_cache = ResponseCache(
+    version=lambda: store.version,
+    last_modified=lambda: store.get().loaded_at,
+)
 
 def load_data():
-    if os.path.exists(DATA_PATH):
-        return pd.read_csv(DATA_PATH)
-    else:
-        print(f"📡 Fetching CSV from {DATA_URL}")
-        df = pd.read_csv(DATA_URL)
-        return df
+    return store.view()
+
+def get_cube():
+    return store.derived('cube')
+
+def warm():
+    """Import and load everything up front instead of on first requests.
+
+    gunicorn.conf.py runs this in the master before forking, so workers
+    start with the dataset and aggregates already built and share them.
+    """
+    import feedparser, requests  # noqa: F401
+    store.get()
+
+def json_response(payload, status=200):
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
 
 def fetch_and_clean_csv(url):
+    import pandas as pd
+
     print(f"🔗 Fetching data from {url}")
-    response = requests.get(url)
+    response = get_http().get(url, timeout=HTTP_TIMEOUT)
     if response.status_code != 200:
         raise Exception("Failed to fetch CSV file.")
     csv_data = StringIO(response.text)
@@ -42,18 +102,39 @@ def fetch_and_clean_csv(url):
     df = df[df['Year'].between(2019, 2024)]
     return df
 
-def get_live_homicide(country_code):
-    url = f"https://api.worldbank.org/v2/country/{country_code}/indicator/VC.IHR.PSRC.P5?format=json&per_page=100"
-    response = requests.get(url)
+WORLDBANK_API = os.getenv('WORLDBANK_API', 'https://api.worldbank.org/v2')
 
-    if response.status_code != 200:
-        return {"years": [], "values": []}
+HTTP_TIMEOUT = (3.05, 10)  # (connect, read)
+
+upstream_seconds = metrics.histogram(
+    'upstream_request_duration_seconds', 'Upstream HTTP time to response headers.', ['host'])
+
+def observe_upstream(response, *args, **kwargs):
+    upstream_seconds.observe(response.elapsed.total_seconds(), host=urlsplit(response.url).hostname)
+
+_http = None
+
+def get_http():
+    # One keep-alive session shared by all upstream calls, created on first use
+    global _http
+    if _http is None:
+        import requests
+        session = requests.Session()
+        session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        session.hooks['response'].append(observe_upstream)
+        _http = session
+    return _http
+
+def fetch_live_homicide(country_code):
+    url = f"{WORLDBANK_API}/country/{country_code}/indicator/VC.IHR.PSRC.P5?format=json&per_page=100"
+    response = get_http().get(url, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
 
     data = response.json()
     if not data or len(data) < 2:
         return {"years": [], "values": []}
 
-    records = data[1]
+    records = data[1] or []
     years, values = [], []
     for entry in records:
         year = entry.get("date")
@@ -66,6 +147,34 @@ def get_live_homicide(country_code):
 
     return {"years": years[::-1], "values": values[::-1]}  # Oldest to newest
 
+# The indicator is published about once a year: serve it for 6h, then keep
+# serving the old copy for up to a day while it refreshes in the background.
+# Failures are cached as an empty series for a minute.
+live_homicide_cache = SWRCache(
+    fetch_live_homicide,
+    ttl=6 * 3600,
+    stale_ttl=24 * 3600,
+    error_ttl=60,
+    fallback=lambda country_code: {"years": [], "values": []},
+)
+
+def get_live_homicide(country_code):
+    return live_homicide_cache.get(country_code)
+
+metrics.callback('cache_requests_total', 'Cache lookups by cache and result.', ['cache', 'result'], lambda: {
+    ('response', 'hit'): response_cache.hits,
+    ('response', 'miss'): response_cache.misses,
+    ('live_homicide', 'hit'): live_homicide_cache.hits,
+    ('live_homicide', 'stale'): live_homicide_cache.stale_hits,
+    ('live_homicide', 'miss'): live_homicide_cache.misses,
+})
+metrics.callback('response_cache_not_modified_total', 'Cached responses answered with 304.', [],
+                 lambda: {(): response_cache.not_modified})
+
+# Google News RSS feeds, refreshed in the background every 10 minutes
+news = FeedRefresher(get_http, interval=600, timeout=HTTP_TIMEOUT)
+news.register("Telangana", "Telangana crime police Hyderabad")
+
 @app.route('/live')
 def live_stats():
     selected_country = request.args.get('country', 'IN').upper()
@@ -93,43 +202,37 @@ def live_stats():
 
 
 @app.route('/')
+@response_cache.cached
 def index():
-    df = load_data()
-    df = df[df['Year'].between(2019, 2024)]
-
-    countries = sorted(df['Country'].dropna().unique())
-    df['total_crime'] = df[list(DISPLAY_LABELS.keys())].sum(axis=1)
-    country_totals = df.groupby('Country')['total_crime'].sum().sort_values(ascending=False).head(20).reset_index()
-    top_10 = country_totals.to_dict(orient='records')
+    cube = get_cube()
+    countries = cube.country_list(*YEAR_RANGE)
+    top_10 = cube.top_countries(20, *YEAR_RANGE)
 
     return render_template('index.html', countries=countries, top_10=top_10)
 
 @app.route('/stats')
+@response_cache.cached
 def stats():
-    df = load_data()
-    df = df[df['Year'].between(2019, 2024)]
+    cube = get_cube()
 
+    # Only chart metadata goes into the page; the series are fetched from
+    # /api/series as each chart scrolls into view.
     charts = {}
     for internal_col, display_name in DISPLAY_LABELS.items():
-        if internal_col in df.columns:
-            grouped = df.groupby("Year")[internal_col].sum().reset_index()
-
-            charts[display_name] = {
-                'years': grouped['Year'].tolist(),
-                'values': grouped[internal_col].tolist(),
-                'id': internal_col  # used for canvas/chart ID
-            }
+        if internal_col in cube.metrics:
+            charts[display_name] = {'id': internal_col}  # used for canvas/chart ID
 
-    timestamp = datetime.now().strftime("%d %B %Y, %I:%M %p")
-    return render_template("stats.html", charts=charts, charts_json=charts,
-                           timestamp=timestamp, country=None)
+    # The page is cached per dataset version, so it is "as of" that version's
+    # load (also its Last-Modified) rather than of whichever request rendered it
+    timestamp = datetime.fromtimestamp(store.get().loaded_at).strftime("%d %B %Y, %I:%M %p")
+    return render_template("stats.html", charts=charts, timestamp=timestamp,
+                           country=None, year_range=YEAR_RANGE, version=store.version)
 
 @app.route('/map')
+@response_cache.cached
 def crime_map():
-    df = load_data()
-    df = df[df['Year'] == 2023]
-    country_values = df.groupby("Country")["intentional_homicide"].sum().to_dict()
-    return render_template("map.html", crime_data=json.dumps(country_values))
+    map_url = url_for('map_data', metric='intentional_homicide', year=2023, v=store.version)
+    return render_template("map.html", map_url=map_url)
 
 @app.route('/country')
 def country_redirect():
@@ -137,61 +240,149 @@ def country_redirect():
     return redirect(url_for('country_stats', country=country))
 
 @app.route('/country/<country>')
+@response_cache.cached
 def country_stats(country):
-    df = load_data()
+    cube = get_cube()
 
     # Decode country name from URL
     country_name = unquote(country)
-
-    # Ensure Year is integer
-    df['Year'] = df['Year'].astype(int)
-
-    # Filter for that country and year range
-    df = df[(df['Country'] == country_name) & (df['Year'].between(2019, 2024))]
+    trends = store.derived('trends').country(country_name) or {}
 
     chart_data = {}
     for internal_col, display_name in DISPLAY_LABELS.items():
-        if internal_col in df.columns:
-            yearly = df[['Year', internal_col]].dropna().groupby('Year').sum().reset_index()
-            values = yearly[internal_col].tolist()
-
+        if internal_col in cube.metrics:
             # Add all categories directly
-            chart_data[display_name] = {
-                "years": yearly['Year'].tolist(),
-                "values": values
-            }
+            chart_data[display_name] = {'id': internal_col, 'trend': trend_headline(trends.get(internal_col))}
     return render_template(
         'stats.html',
         charts=chart_data,
-        charts_json=chart_data,
-        country=country_name
-    )
-@app.route('/api/telangana-crime-news')
-def telangana_crime_news():
-    RSS_URL = (
-        "https://news.google.com/rss/search?"
-        "q=Telangana+crime+police+Hyderabad&"
-        "hl=en-IN&gl=IN&ceid=IN:en"
+        country=country_name,
+        year_range=YEAR_RANGE,
+        version=store.version
     )
 
-    feed = feedparser.parse(RSS_URL)
-    articles = []
-
-    for entry in feed.entries[:10]:
-        articles.append({
-            "title": entry.title,
-            "url": entry.link,
-            "published_at": entry.published if hasattr(entry, "published") else "",
-            "source": entry.source.title if hasattr(entry, "source") else "Google News"
-        })
-
-    return jsonify({
-        "region": "Telangana",
-        "count": len(articles),
-        "articles": articles,
-        "fetched_at": datetime.now().strftime("%d %B %Y, %I:%M %p")
+def trend_headline(trend):
+    # Only the figures the page prints; the chart fetches the yearly
+    # overlays from /api/trends/<country> along with its series
+    if trend is None:
+        return None
+    return {
+        'slope': trend['slope'],
+        'slope_pct': trend['slope_pct'],
+        'r2': trend['r2'],
+        'forecast_year': trend['forecast_years'][0],
+        'forecast': trend['forecast'][0],
+        'anomalies': trend['anomalies'],
+    }
+
+@app.route('/api/series')
+@response_cache.cached
+def series_data():
+    cube = get_cube()
+    metric = request.args.get('metric')
+    metrics = metric.split(',') if metric else cube.metrics
+    unknown = [m for m in metrics if m not in cube.metrics]
+    if unknown:
+        return json_response({"error": f"Unknown metric: {', '.join(unknown)}"}, 400)
+
+    country = request.args.get('country') or None
+    start = request.args.get('from', YEAR_RANGE[0], type=int)
+    end = request.args.get('to', YEAR_RANGE[1], type=int)
+    fields = request.args.get('fields')
+    fields = fields.split(',') if fields else None
+
+    series = {}
+    for m in metrics:
+        data = dict(cube.series(m, country, start, end), label=DISPLAY_LABELS.get(m, m))
+        if fields:
+            data = {k: v for k, v in data.items() if k in fields}
+        series[m] = data
+
+    return json_response({
+        "version": store.version,
+        "country": country,
+        "from": start,
+        "to": end,
+        "series": series
+    })
+
+@app.route('/api/map')
+@response_cache.cached
+def map_data():
+    cube = get_cube()
+    metric = request.args.get('metric', 'intentional_homicide')
+    if metric not in cube.metrics:
+        return json_response({"error": f"Unknown metric: {metric}"}, 400)
+    year = request.args.get('year', 2023, type=int)
+    return json_response({
+        "version": store.version,
+        "metric": metric,
+        "year": year,
+        "values": cube.by_country(metric, year)
     })
 
+@app.route('/api/summary')
+@response_cache.cached
+def summary_bulk():
+    metric = request.args.get('metric', 'intentional_homicide')
+    summaries = store.derived('summary').bulk(metric)
+    if summaries is None:
+        return jsonify({"error": f"Unknown metric: {metric}"}), 400
+    return jsonify({"metric": metric, "count": len(summaries), "summaries": summaries})
+
+@app.route('/api/summary/<country>')
+@response_cache.cached
+def summary_country(country):
+    engine = store.derived('summary')
+    country_name = unquote(country)
+    metric = request.args.get('metric')
+    if metric is None:
+        result = engine.country(country_name)
+    elif metric not in engine.metrics:
+        return jsonify({"error": f"Unknown metric: {metric}"}), 400
+    else:
+        result = engine.summary(country_name, metric)
+    if result is None:
+        return jsonify({"error": f"No data for {country_name}"}), 404
+    return jsonify(result)
+
+@app.route('/api/trends')
+@response_cache.cached
+def trends_bulk():
+    metric = request.args.get('metric', 'intentional_homicide')
+    trends = store.derived('trends').bulk(metric)
+    if trends is None:
+        return json_response({"error": f"Unknown metric: {metric}"}, 400)
+    return json_response({"metric": metric, "count": len(trends), "trends": trends})
+
+@app.route('/api/trends/<country>')
+@response_cache.cached
+def trends_country(country):
+    engine = store.derived('trends')
+    country_name = unquote(country)
+    metric = request.args.get('metric')
+    if metric is not None and metric not in engine.metrics:
+        return json_response({"error": f"Unknown metric: {metric}"}, 400)
+    result = engine.country(country_name, metric)
+    if result is None:
+        return json_response({"error": f"No data for {country_name}"}, 404)
+    return json_response(result)
+
+@app.route('/api/cache-stats')
+def cache_stats():
+    return jsonify(response_cache.stats())
+
+@app.route('/api/telangana-crime-news')
+def telangana_crime_news():
+    return jsonify(news.payload("Telangana"))
+
+@app.route('/api/crime-news/<region>')
+def crime_news(region):
+    payload = news.payload(region)
+    if payload is None:
+        return jsonify({"error": f"Unknown region: {region}"}), 404
+    return jsonify(payload)
+
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,100 @@
+"""Columnar on-disk copy of the crime dataset as memory-mapped .npy files.
+
+Layout of ``<name>.cols/``::
+
+    meta.json                 rows, column order/dtypes, country names
+    <column>.<version>.npy    one array per column (Country as int16 codes)
+
+Workers ``np.load(..., mmap_mode='r')`` the arrays, so the pages live once
+in the OS page cache and are shared by every process instead of each one
+holding its own parsed copy. Column files are versioned and ``meta.json``
+is replaced last, so readers never see a half-written dataset. numpy and
+pandas are only imported by the read/write functions, so checking the
+version at startup costs one JSON read.
+
+    python columnar.py static/data/cleaned_global_crime_data.csv
+"""
+import hashlib
+import json
+import os
+import sys
+
+
+def columnar_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".cols"
+
+
+def write_columnar(df, directory, before_publish=None):
+    """Write ``df`` as a new version; ``before_publish(version)`` runs just before it goes live."""
+    import numpy as np
+    import pandas as pd
+
+    os.makedirs(directory, exist_ok=True)
+    countries = sorted(str(c) for c in df['Country'].dropna().unique())
+    codes = pd.Categorical(df['Country'].astype(str), categories=countries).codes.astype(np.int16)
+
+    arrays = {'Country': codes, 'Year': df['Year'].to_numpy(dtype=np.int16)}
+    for column in df.columns:
+        if column not in arrays:
+            arrays[column] = df[column].to_numpy(dtype=np.float32)
+
+    digest = hashlib.sha1()
+    for array in arrays.values():
+        digest.update(array.tobytes())
+    version = digest.hexdigest()[:12]
+
+    columns = []
+    for column in df.columns:
+        filename = f"{column}.{version}.npy"
+        np.save(os.path.join(directory, filename), arrays[column])
+        columns.append({'name': column, 'dtype': str(arrays[column].dtype), 'file': filename})
+
+    if before_publish is not None:
+        before_publish(version)
+    meta = {'version': version, 'rows': len(df), 'columns': columns, 'countries': countries}
+    tmp_path = os.path.join(directory, "meta.json.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(directory, "meta.json"))
+
+    # Old column files can go: open mmaps keep their pages until unmapped
+    current = {c['file'] for c in columns}
+    for filename in os.listdir(directory):
+        if filename.endswith('.npy') and filename not in current:
+            os.remove(os.path.join(directory, filename))
+    return version
+
+
+def columnar_version(directory):
+    try:
+        with open(os.path.join(directory, "meta.json")) as f:
+            return json.load(f)['version']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def read_columnar(directory):
+    import numpy as np
+    import pandas as pd
+
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+
+    data = {}
+    for column in meta['columns']:
+        # Plain ndarray view over the mapping, so results of operations on
+        # it are ordinary arrays rather than np.memmap
+        array = np.load(os.path.join(directory, column['file']), mmap_mode='r').view(np.ndarray)
+        if column['name'] == 'Country':
+            data['Country'] = pd.Categorical.from_codes(array, categories=meta['countries'])
+        else:
+            data[column['name']] = pd.Series(array, copy=False)
+    return pd.DataFrame(data, copy=False), meta['version']
+
+
+if __name__ == "__main__":
+    from data_store import read_dataset
+
+    for csv_path in sys.argv[1:]:
+        version = write_columnar(read_dataset(csv_path), columnar_path(csv_path))
+        print(f"✅ Wrote {columnar_path(csv_path)} (version {version})")
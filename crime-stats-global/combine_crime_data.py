@@ -1,83 +1,278 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 
-def clean_csv(filepath, new_value_column_name):
+from columnar import columnar_path, columnar_version, write_columnar
+
+# UNODC exports, keyed by the column each one becomes in the merged file
+SOURCES = {
+    "corruption_and_economic_crime": "data_cts_corruption_and_economic_crime 6.csv",
+    "intentional_homicide": "data_cts_intentional_homicide.csv",
+    "firearms_trafficking": "data_iafq_firearms_trafficking.csv",
+    "access_and_functioning_of_justice": "data_cts_access_and_functioning_of_justice 1.csv",
+    "violent_and_sexual_crime": "data_cts_violent_and_sexual_crime.csv",
+}
+# Written where the app reads its data (same DATA_PATH override), so the CSV,
+# columnar copy and delta an update leaves are picked up by running workers
+OUTPUT_PATH = os.getenv('DATA_PATH', "static/data/cleaned_global_crime_data.csv")
+# Cleaned copy of each source plus the manifest used for incremental rebuilds
+CACHE_DIR = "static/data/.etl_cache"
+
+REQUIRED_COLUMNS = ['Country', 'Year', 'VALUE']
+CHUNK_SIZE = 500_000
+
+
+def _reduce_chunk(df):
+    df.columns = df.columns.str.strip()
+    df['Year'] = pd.to_numeric(df['Year'], errors='coerce')
+    df['VALUE'] = pd.to_numeric(df['VALUE'], errors='coerce')
+    df = df.dropna(subset=REQUIRED_COLUMNS)
+    return df.groupby(['Country', 'Year'])['VALUE'].agg(['sum', 'count'])
+
+
+def clean_csv(filepath, new_value_column_name, chunksize=CHUNK_SIZE):
     print(f"\n📄 Reading: {filepath}")
     try:
-        df = pd.read_csv(filepath)
+        # Only the three columns we keep are parsed; big exports are streamed
+        # in chunks and folded into running (sum, count) pairs per key.
+        reader = pd.read_csv(
+            filepath,
+            usecols=lambda col: col.strip() in REQUIRED_COLUMNS,
+            chunksize=chunksize,
+        )
+        partial = None
+        for chunk in reader:
+            if not all(col in chunk.columns.str.strip() for col in REQUIRED_COLUMNS):
+                print(f"❌ Required columns missing in {filepath}")
+                return pd.DataFrame()
+            reduced = _reduce_chunk(chunk)
+            partial = reduced if partial is None else pd.concat([partial, reduced]).groupby(level=[0, 1]).sum()
     except Exception as e:
         print(f"❌ Error reading {filepath}: {e}")
         return pd.DataFrame()
 
-    df.columns = df.columns.str.strip()
-    print("🧩 Columns:", list(df.columns))
+    if partial is None:
+        return pd.DataFrame(columns=['Country', 'Year', new_value_column_name])
 
-    required_cols = ['Country', 'Year', 'VALUE']
-    if not all(col in df.columns for col in required_cols):
-        print(f"❌ Required columns missing in {filepath}")
-        return pd.DataFrame()
+    # Reduce duplicates by taking the average
+    df = (partial['sum'] / partial['count']).rename(new_value_column_name).reset_index()
+    return df
 
-    # Clean and reduce
-    df = df[['Country', 'Year', 'VALUE']].copy()
-    df['Year'] = pd.to_numeric(df['Year'], errors='coerce')
-    df['VALUE'] = pd.to_numeric(df['VALUE'], errors='coerce')
-    df.dropna(subset=['Country', 'Year', 'VALUE'], inplace=True)
 
-    # Group and reduce duplicates by taking average
-    df = df.groupby(['Country', 'Year'], as_index=False).agg({ 'VALUE': 'mean' })
-    df.columns = ['Country', 'Year', new_value_column_name]
+class SourceError(Exception):
+    """A source file is missing or has no usable rows; nothing is published."""
 
-    return df
 
-def generate_merged_crime_data():
-    corruption_df = clean_csv("data_cts_corruption_and_economic_crime 6.csv", "corruption_and_economic_crime")
-    homicide_df = clean_csv("data_cts_intentional_homicide.csv", "intentional_homicide")
-    firearms_df = clean_csv("data_iafq_firearms_trafficking.csv", "firearms_trafficking")
-    justice_df = clean_csv("data_cts_access_and_functioning_of_justice 1.csv", "access_and_functioning_of_justice")
-    sexualcrime_df = clean_csv("data_cts_violent_and_sexual_crime.csv", "violent_and_sexual_crime")
+def _clean_source(item):
+    column, filepath = item
+    df = clean_csv(filepath, column)
+    if df.empty:
+        # Merging it anyway would publish the whole metric as zeros
+        raise SourceError(f"No usable rows for {column} in {filepath}")
+    df['Year'] = df['Year'].astype(int)
+    return column, df
 
-    merged_df = corruption_df \
-        .merge(homicide_df, on=["Country", "Year"], how="outer") \
-        .merge(firearms_df, on=["Country", "Year"], how="outer") \
-        .merge(justice_df, on=["Country", "Year"], how="outer") \
-        .merge(sexualcrime_df, on=["Country", "Year"], how="outer")
 
-    merged_df.fillna(0, inplace=True)
+def _clean_all(sources, workers=None):
+    workers = workers or min(len(sources), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(_clean_source, sources.items()))
 
-    merged_df.to_csv("static/data/global_crime_data.csv", index=False)
-    print("✅ Merged data saved to static/data/global_crime_data.csv")
 
-    import pandas as pd
+def _merge(cleaned, columns):
+    # One keyed concat + unstack is an outer join on (Country, Year) across
+    # every source, however many there are.
+    cleaned = {column: df for column, df in cleaned.items() if not df.empty}
+    if not cleaned:
+        return pd.DataFrame(columns=['Country', 'Year'] + list(columns))
+    long_df = pd.concat(
+        [df.set_index(['Country', 'Year'])[column] for column, df in cleaned.items()],
+        keys=list(cleaned),
+        names=['metric'],
+    )
+    merged_df = long_df.unstack('metric').reindex(columns=list(columns)).fillna(0)
+    merged_df = merged_df.reset_index()
+    merged_df['Year'] = merged_df['Year'].astype(int)
+    merged_df.columns.name = None
+    return merged_df
 
-DATA_PATH = "static/data/cleaned_global_crime_data.csv"
 
-def get_crime_summary(country):
-    df = pd.read_csv(DATA_PATH)
+def file_sha256(path):
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
-    df = df[df["country"] == country]
 
-    if df.empty:
+def row_fingerprints(df, column):
+    """One 64-bit hash per cleaned row, covering its key and value."""
+    return pd.util.hash_pandas_object(df.set_index(['Country', 'Year'])[column], index=True)
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_bytes(path, content):
+    def write(tmp_path):
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+    _write_atomic(path, write)
+
+
+def _write_json(path, obj):
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(obj, f)
+    _write_atomic(path, write)
+
+
+def _delta_path(output_path):
+    return os.path.splitext(output_path)[0] + ".delta.json"
+
+
+def _save_state(cache_dir, sources, cleaned, output_path):
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = _load_manifest(cache_dir) or {"sources": {}}
+    manifest["columns"] = list(sources)
+    for column, df in cleaned.items():
+        df.to_csv(os.path.join(cache_dir, f"{column}.csv"), index=False)
+        manifest["sources"][column] = {
+            "path": sources[column],
+            "sha256": file_sha256(sources[column]),
+            "rows": len(df),
+            "fingerprint": format(int(row_fingerprints(df, column).sum()) & (2**64 - 1), '016x'),
+        }
+    manifest["output_sha256"] = file_sha256(output_path)
+    _write_json(os.path.join(cache_dir, "manifest.json"), manifest)
+
+
+def _load_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "manifest.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
         return None
 
-    avg_rate = round(df["value"].mean(), 2)
 
-    df_sorted = df.sort_values("year")
-    trend = "increasing" if df_sorted["value"].iloc[-1] > df_sorted["value"].iloc[0] else "decreasing"
+# pandas' default float parser can be off by one ulp; re-read cached and merged
+# values must come back bit for bit, or patched rows drift from a full rebuild
+READ_EXACT = dict(float_precision='round_trip')
+
+
+def _load_cached(cache_dir, column):
+    path = os.path.join(cache_dir, f"{column}.csv")
+    return pd.read_csv(path, dtype={'Country': object, 'Year': int}, **READ_EXACT)
+
+
+def generate_merged_crime_data(sources=SOURCES, output_path=OUTPUT_PATH, workers=None, cache_dir=CACHE_DIR):
+    cleaned = _clean_all(sources, workers)
+    merged_df = _merge(cleaned, sources)
+    if merged_df.empty:
+        print("❌ No usable source data, nothing written")
+        return merged_df
+
+    # A full rebuild has no delta, so any previous one must not be replayed
+    if os.path.exists(_delta_path(output_path)):
+        os.remove(_delta_path(output_path))
+    _write_atomic(output_path, lambda p: merged_df.to_csv(p, index=False))
+    write_columnar(merged_df, columnar_path(output_path))
+    _save_state(cache_dir, sources, cleaned, output_path)
+    print(f"✅ Merged data saved to {output_path}")
+    return merged_df
+
+
+def update_merged_crime_data(sources=SOURCES, output_path=OUTPUT_PATH, workers=None, cache_dir=CACHE_DIR):
+    """Re-clean only the sources whose contents changed and patch their rows.
+
+    Falls back to ``generate_merged_crime_data`` when there is no usable
+    manifest. Next to the output it leaves a ``.delta.json`` with the
+    upserted and deleted (Country, Year) rows, which a running app can apply
+    in place of re-reading the whole file. It names the CSV hashes and the
+    columnar versions it goes from and to, so it is only applied on top of
+    exactly the data it was computed against.
+    """
+    manifest = _load_manifest(cache_dir)
+    output_sha = file_sha256(output_path)
+    if (
+        manifest is None
+        or manifest.get("columns") != list(sources)
+        or output_sha is None
+        or manifest.get("output_sha256") != output_sha
+        or not all(os.path.exists(os.path.join(cache_dir, f"{c}.csv")) for c in sources)
+    ):
+        print("🔁 No usable manifest, running a full rebuild")
+        return generate_merged_crime_data(sources, output_path, workers, cache_dir)
+
+    changed = {c: p for c, p in sources.items() if manifest["sources"][c]["sha256"] != file_sha256(p)}
+    if not changed:
+        print("✅ All sources unchanged, nothing to do")
+        return None
+
+    cleaned = {c: _load_cached(cache_dir, c) for c in sources}
+    affected = set()
+    for column, df in _clean_all(changed, workers).items():
+        old = row_fingerprints(cleaned[column], column)
+        new = row_fingerprints(df, column)
+        affected |= set(old.index[~old.isin(new)]) | set(new.index[~new.isin(old)])
+        cleaned[column] = df
+    print(f"🧩 {len(changed)} source(s) changed, {len(affected)} (Country, Year) row(s) affected")
+
+    if affected:
+        keys = pd.MultiIndex.from_tuples(sorted(affected), names=['Country', 'Year'])
+        rows = _merge({c: df[df.set_index(['Country', 'Year']).index.isin(keys)] for c, df in cleaned.items()}, sources)
+        deleted = keys.difference(rows.set_index(['Country', 'Year']).index)
+
+        merged_df = pd.read_csv(output_path, dtype={'Country': object}, **READ_EXACT)
+        merged_df = merged_df[~merged_df.set_index(['Country', 'Year']).index.isin(keys)]
+        merged_df = pd.concat([merged_df, rows]).sort_values(['Country', 'Year']).reset_index(drop=True)
+
+        content = merged_df.to_csv(index=False).encode()
+        delta = {
+            "base_sha256": output_sha,
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "base_columnar": columnar_version(columnar_path(output_path)),
+            "upserts": rows.to_dict(orient='records'),
+            "deletes": [[country, int(year)] for country, year in deleted],
+        }
+
+        def publish(version):
+            # The delta lands before the CSV and the columnar copy's new
+            # version go live, so a reader that sees either one always finds
+            # the matching delta next to it.
+            delta["columnar"] = version
+            _write_json(_delta_path(output_path), delta)
+            _write_bytes(output_path, content)
+
+        write_columnar(merged_df, columnar_path(output_path), before_publish=publish)
+        print(f"✅ Patched {len(rows)} row(s), removed {len(deleted)} in {output_path}")
+
+    _save_state(cache_dir, sources, {c: cleaned[c] for c in changed}, output_path)
+    return cleaned
+
+DATA_PATH = OUTPUT_PATH
+SUMMARY_METRICS = list(SOURCES)
 
-    if avg_rate < 2:
-        risk = "Low"
-    elif avg_rate < 5:
-        risk = "Medium"
-    else:
-        risk = "High"
+_summary_engine = None
 
-    return {
-        "country": country,
-        "average_rate": avg_rate,
-        "trend": trend,
-        "risk_level": risk
-    }
+def get_crime_summary(country, metric="intentional_homicide"):
+    # The CSV is read and indexed once; every later call is a lookup
+    global _summary_engine
+    if _summary_engine is None:
+        from data_store import read_dataset
+        from summary import SummaryEngine
+        _summary_engine = SummaryEngine(read_dataset(DATA_PATH), SUMMARY_METRICS)
+    return _summary_engine.summary(country, metric)
 
 
 # Make sure to run this script again after making the change to generate the new CSV.
 if __name__ == "__main__":
-    generate_merged_crime_data()
+    update_merged_crime_data()
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from io import BytesIO
+
+from columnar import columnar_path, columnar_version, read_columnar
+from snapshot import read_snapshot, write_snapshot
+
+# Country is low-cardinality, years fit in int16 and every other column is
+# a per-country metric where float32 precision is plenty.
+DTYPES = defaultdict(lambda: "float32", Country="category", Year="int16")
+
+
+def _pandas():
+    # Imported on first load rather than with the app, to keep startup fast
+    import pandas as pd
+
+    # With copy-on-write, filtered frames and shallow copies handed to routes
+    # never write through to the shared dataset held by the store.
+    pd.set_option("mode.copy_on_write", True)
+    return pd
+
+
+def read_dataset(source):
+    df = _pandas().read_csv(source, dtype=DTYPES)
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def delta_path(path):
+    return os.path.splitext(path)[0] + ".delta.json"
+
+
+def apply_delta(df, delta):
+    """Replace/remove the (Country, Year) rows named in an ETL delta."""
+    pd = _pandas()
+    upserts = pd.DataFrame(delta["upserts"], columns=df.columns)
+    touched = pd.MultiIndex.from_tuples(
+        list(zip(upserts['Country'], upserts['Year'])) + [tuple(key) for key in delta["deletes"]]
+    )
+    current = pd.MultiIndex.from_arrays([df['Country'].astype(str), df['Year'].astype(int)])
+    kept = df[~current.isin(touched)].astype({'Country': str})
+    out = pd.concat([kept, upserts], ignore_index=True)
+    out = out.astype({column: DTYPES[column] for column in out.columns})
+    return out.sort_values(['Country', 'Year']).reset_index(drop=True)
+
+
+def read_columnar_frame(directory):
+    _pandas()
+    return read_columnar(directory)[0]
+
+
+class Dataset:
+    """One loaded version. Without ``df``, ``loader()`` reads it on first access."""
+
+    def __init__(self, df, version, derived=None, loader=None):
+        self._df = df
+        self._loader = loader
+        self.version = version
+        self.derived = derived or {}
+        self.loaded_at = time.time()
+
+    @property
+    def df(self):
+        if self._df is None and self._loader is not None:
+            self._df = self._loader()
+        return self._df
+
+
+class DatasetStore:
+    """Loads the crime data once per process and reloads it when it changes.
+
+    A memory-mapped columnar copy (see ``columnar.py``) is preferred and
+    checked by its content version; the local CSV is checked by mtime; the remote fallback is revalidated
+    with a conditional GET on its ETag. Checks happen at most once every
+    ``check_interval`` seconds, so most requests are a plain attribute read.
+    When the ETL left a ``.delta.json`` going from exactly the version held
+    in memory (columnar version or CSV hash) to the one now on disk, the
+    delta is applied to the frame in memory instead of reading it all again.
+
+    ``builders`` maps a name to a callable taking the frame; each one runs once
+    per loaded version and its result is kept in ``Dataset.derived``.
+    ``snapshot`` is the path of prebuilt builder results (see ``snapshot.py``),
+    used instead of running the builders while it matches the columnar copy.
+    ``timer(phase)``, when given, returns a context manager wrapped around
+    each check for a new version ("data_load") and each builder ("aggregation").
+    """
+
+    def __init__(self, path, url, builders=None, check_interval=30.0, timeout=10, timer=None, snapshot=None):
+        self.path = path
+        self.url = url
+        self.builders = dict(builders or {})
+        self.snapshot = snapshot
+        self.timer = timer or (lambda phase: nullcontext())
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._dataset = None
+        self._source_tag = None
+        self._etag = None
+        self._content_sha = None
+        self._checked_at = 0.0
+        self._session = None
+        self._session_pid = None
+
+    def get(self):
+        dataset = self._dataset
+        if dataset is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return dataset
+
+        with self._lock:
+            if self._dataset is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._dataset
+            try:
+                with self.timer("data_load"):
+                    loaded = self._load()
+                if loaded is not None:
+                    self._swap(*loaded)
+            except Exception as e:
+                if self._dataset is None:
+                    raise
+                print(f"⚠️ Dataset refresh failed, keeping version {self._dataset.version}: {e}")
+            self._checked_at = time.monotonic()
+            return self._dataset
+
+    def view(self):
+        # Shallow copy: shares the column buffers, but any column the caller
+        # adds or replaces stays local to its copy.
+        return self.get().df.copy(deep=False)
+
+    def derived(self, name):
+        return self.get().derived[name]
+
+    @property
+    def version(self):
+        return self.get().version
+
+    def _load(self):
+        columnar_dir = columnar_path(self.path)
+        version = columnar_version(columnar_dir)
+        if version is not None:
+            tag = f"cols:{version}"
+            if tag == self._source_tag:
+                return
+            derived = read_snapshot(self.snapshot, tag, self.builders) if self.snapshot else None
+            if derived is not None:
+                return None, tag, derived, lambda: read_columnar_frame(columnar_dir)
+            df = self._read_delta(lambda delta: self._source_tag == f"cols:{delta.get('base_columnar')}"
+                                  and delta.get("columnar") == version)
+            if df is None:
+                df = read_columnar_frame(columnar_dir)
+        elif os.path.exists(self.path):
+            tag = f"file:{os.stat(self.path).st_mtime_ns}"
+            if tag == self._source_tag:
+                return
+            df = self._read_delta(lambda delta: delta.get("base_sha256") == self._content_sha)
+            if df is None:
+                with open(self.path, 'rb') as f:
+                    content = f.read()
+                self._content_sha = hashlib.sha256(content).hexdigest()
+                df = read_dataset(BytesIO(content))
+        else:
+            headers = {"If-None-Match": self._etag} if self._etag else {}
+            response = self._http().get(self.url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                return
+            response.raise_for_status()
+            print(f"📡 Fetched CSV from {self.url}")
+            self._etag = response.headers.get("ETag")
+            tag = f"url:{self._etag or hashlib.sha1(response.content).hexdigest()}"
+            if tag == self._source_tag:
+                return
+            df = read_dataset(BytesIO(response.content))
+
+        return df, tag
+
+    def _read_delta(self, applies):
+        """The frame in memory with the ETL's delta applied, if ``applies(delta)``."""
+        # A frame never read (loaded from a snapshot) may have had its column
+        # files replaced by now, so only one already in memory is patched
+        if self._dataset is None or self._dataset._df is None:
+            return None
+        try:
+            with open(delta_path(self.path)) as f:
+                delta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not applies(delta):
+            return None
+        df = apply_delta(self._dataset.df, delta)
+        self._content_sha = delta["sha256"]
+        print(f"🧩 Applied delta: {len(delta['upserts'])} upserted, {len(delta['deletes'])} deleted row(s)")
+        return df
+
+    def _http(self):
+        # Created on first remote fetch, and again in each forked worker
+        if self._session is None or self._session_pid != os.getpid():
+            import requests
+
+            self._session = requests.Session()
+            self._session_pid = os.getpid()
+        return self._session
+
+    def _swap(self, df, tag, derived=None, loader=None):
+        version = hashlib.sha1(tag.encode()).hexdigest()[:12]
+        if derived is None:
+            derived = {}
+            for name, build in self.builders.items():
+                with self.timer("aggregation"):
+                    derived[name] = build(df)
+            print(f"✅ Loaded crime dataset version {version} ({len(df)} rows)")
+        else:
+            print(f"✅ Loaded crime dataset version {version} from snapshot")
+        self._dataset = Dataset(df, version, derived, loader)
+        self._source_tag = tag
+
+    def write_snapshot(self):
+        """Pickle the current builder results to ``snapshot``; returns its path."""
+        self.get()
+        if not self._source_tag.startswith("cols:"):
+            raise ValueError("Snapshots are tied to the columnar copy; run columnar.py first")
+        write_snapshot(self.snapshot, self._source_tag, self._dataset.derived)
+        return self.snapshot
@@ -0,0 +1,23 @@
+# Import the app and load the dataset once in the master, before workers
+# are forked: they start warm and share those pages copy-on-write instead
+# of each importing pandas and parsing the data on its first request.
+preload_app = True
+
+
+def when_ready(server):
+    import gc
+
+    from app import warm
+
+    warm()
+    # Keep the collector away from everything loaded so far; touching those
+    # objects would copy their pages into every worker
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import news
+
+    # The refresh thread cannot survive the fork, so each worker starts its
+    # own here; requests then never wait on Google News for a first fetch
+    news.start()
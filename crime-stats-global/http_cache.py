@@ -0,0 +1,136 @@
+import functools
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import Response, make_response, request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is always available
+    brotli = None
+
+
+class _Entry:
+    __slots__ = ("body", "encoded", "etag", "mimetype", "last_modified")
+
+    def __init__(self, body, encoded, etag, mimetype, last_modified):
+        self.body = body
+        self.encoded = encoded
+        self.etag = etag
+        self.mimetype = mimetype
+        self.last_modified = last_modified
+
+
+class ResponseCache:
+    """LRU of rendered responses keyed by (endpoint, args, dataset version).
+
+    Bodies are stored with a strong ETag and pre-compressed (brotli when the
+    ``brotli`` package is installed, gzip always), so a hit costs neither a
+    render nor a compression, and a matching ``If-None-Match`` or
+    ``If-Modified-Since`` gets an empty 304. URLs pinned to the current
+    version with ``?v=<version>`` never change, so they are marked immutable.
+    """
+
+    def __init__(self, version, last_modified=None, max_entries=256, min_compress_size=512):
+        self.version = version
+        self.last_modified = last_modified
+        self.max_entries = max_entries
+        self.min_compress_size = min_compress_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.bytes_saved = 0
+
+    def cached(self, view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            version = self.version()
+            key = (
+                request.endpoint,
+                tuple(sorted(request.args.items(multi=True))),
+                tuple(sorted(kwargs.items())),
+                version,
+            )
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                entry = self._build(response)
+                with self._lock:
+                    self.misses += 1
+                    self._entries[key] = entry
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+
+            return self._respond(entry, immutable=request.args.get('v') == version)
+        return wrapper
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "bytes_sent": self.bytes_sent,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    def _build(self, response):
+        body = response.get_data()
+        encoded = {}
+        if len(body) >= self.min_compress_size and response.mimetype.startswith(('text/', 'application/json')):
+            if brotli is not None:
+                encoded['br'] = brotli.compress(body, quality=5)
+            encoded['gzip'] = gzip.compress(body, compresslevel=6)
+        last_modified = None
+        if self.last_modified is not None:
+            last_modified = datetime.fromtimestamp(int(self.last_modified()), tz=timezone.utc)
+        etag = hashlib.sha1(body).hexdigest()[:20]
+        return _Entry(body, encoded, etag, response.mimetype, last_modified)
+
+    def _respond(self, entry, immutable=False):
+        accepted = request.accept_encodings
+        encoding = next((e for e in ('br', 'gzip') if e in entry.encoded and accepted[e]), None)
+        body = entry.encoded[encoding] if encoding else entry.body
+
+        response = Response(body, mimetype=entry.mimetype)
+        # Each encoding is a different byte sequence, so it gets its own strong tag
+        response.set_etag(f"{entry.etag}-{encoding}" if encoding else entry.etag)
+        response.last_modified = entry.last_modified
+        if immutable:
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response = response.make_conditional(request)
+
+        # A HEAD response carries no body, so it neither sends nor saves bytes
+        has_body = request.method != 'HEAD'
+        sent = len(body) if has_body and response.status_code == 200 else 0
+        with self._lock:
+            if response.status_code == 304:
+                self.not_modified += 1
+            if has_body:
+                self.bytes_sent += sent
+                self.bytes_saved += len(entry.body) - sent
+        return response
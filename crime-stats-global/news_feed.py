@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlencode
+
+GOOGLE_NEWS_RSS = os.getenv('GOOGLE_NEWS_RSS', 'https://news.google.com/rss/search')
+
+
+class NewsFeed:
+    def __init__(self, region, query, hl='en-IN', gl='IN', ceid='IN:en', limit=10):
+        self.region = region
+        self.query = query
+        self.url = f"{GOOGLE_NEWS_RSS}?{urlencode({'q': query, 'hl': hl, 'gl': gl, 'ceid': ceid})}"
+        self.limit = limit
+        self.etag = None
+        self.last_modified = None
+        self.payload = {"region": region, "count": 0, "articles": [], "fetched_at": ""}
+        # Set once the first refresh has finished, whether or not it worked
+        self.fetched = threading.Event()
+
+    def refresh(self, session, timeout):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+
+        response = session.get(self.url, headers=headers, timeout=timeout)
+        fetched_at = datetime.now().strftime("%d %B %Y, %I:%M %p")
+        if response.status_code == 304:
+            self.payload = dict(self.payload, fetched_at=fetched_at)
+            return
+        response.raise_for_status()
+
+        # Imported here: only the refresh thread parses feeds
+        import feedparser
+
+        feed = feedparser.parse(response.content)
+        articles = []
+        for entry in feed.entries[:self.limit]:
+            articles.append({
+                "title": entry.title,
+                "url": entry.link,
+                "published_at": entry.published if hasattr(entry, "published") else "",
+                "source": entry.source.title if hasattr(entry, "source") else "Google News"
+            })
+
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+        # Swap in a new dict so readers never see a half-built payload
+        self.payload = {
+            "region": self.region,
+            "count": len(articles),
+            "articles": articles,
+            "fetched_at": fetched_at
+        }
+
+
+class FeedRefresher:
+    """Keeps registered RSS feeds parsed in memory.
+
+    A daemon thread per worker re-fetches every feed each ``interval``
+    seconds with conditional GETs; requests only ever read the last payload.
+    Under gunicorn ``start()`` runs in each worker right after the fork, so
+    the first fetch is under way before any request and no request waits on
+    the upstream. Elsewhere the thread starts on first use, and until a
+    feed's first fetch is done requests for it wait up to ``first_wait``
+    seconds rather than getting an empty payload: on a serverless cold start
+    the thread only runs while a request is open, so this is what gets news
+    onto the first page at all.
+    ``get_session()`` returns the HTTP session to fetch with; it is only
+    called from that thread.
+    """
+
+    def __init__(self, get_session, interval=600, timeout=(3.05, 10), first_wait=5.0):
+        self.get_session = get_session
+        self.interval = interval
+        self.timeout = timeout
+        self.first_wait = first_wait
+        self.feeds = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._wait_first = False
+
+    def register(self, region, query, **params):
+        self.feeds[region] = NewsFeed(region, query, **params)
+        self._wake.set()
+        return self.feeds[region]
+
+    def start(self):
+        """Start this process's refresh thread ahead of any request."""
+        self._ensure_started(lazy=False)
+
+    def payload(self, region):
+        self._ensure_started(lazy=True)
+        feed = self.feeds.get(region)
+        if feed is None:
+            return None
+        if self._wait_first and not feed.fetched.is_set():
+            feed.fetched.wait(self.first_wait)
+        return feed.payload
+
+    def refresh_all(self):
+        for feed in list(self.feeds.values()):
+            try:
+                feed.refresh(self.get_session(), self.timeout)
+            except Exception as e:
+                print(f"⚠️ Failed to refresh {feed.region} news: {e}")
+            finally:
+                feed.fetched.set()
+
+    def _ensure_started(self, lazy):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._wait_first = lazy
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            started = time.monotonic()
+            self.refresh_all()
+            self._wake.wait(max(0, self.interval - (time.monotonic() - started)))
@@ -0,0 +1,72 @@
+"""Prebuilt ``DatasetStore`` builder results for the shipped dataset.
+
+A cold start would otherwise have to import pandas, map the columnar copy
+and run every builder before it could answer its first request. This script
+runs the builders once at build time and pickles what they return next to
+the data as ``<name>.snapshot.pkl``. The store loads the snapshot in place
+of the builders only when all of these hold:
+
+* the columnar copy is still at the version the snapshot was built from,
+* the builder names are the same,
+* the source of every module whose classes are in the pickle is unchanged.
+
+Otherwise the snapshot is stale and is ignored. The frame itself is only
+read if a route asks for it. Rerun after the ETL or after changing a
+builder:
+
+    python snapshot.py
+"""
+import hashlib
+import importlib.util
+import os
+import pickle
+
+
+def snapshot_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".snapshot.pkl"
+
+
+def _module_digest(name):
+    spec = importlib.util.find_spec(name)
+    if spec is None or not spec.origin or not os.path.isfile(spec.origin):
+        return None
+    with open(spec.origin, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def write_snapshot(path, tag, derived):
+    modules = sorted({type(value).__module__ for value in derived.values()})
+    header = {
+        'tag': tag,
+        'builders': sorted(derived),
+        'modules': {name: _module_digest(name) for name in modules},
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        # Header first, so a stale snapshot is rejected before the rest is unpickled
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(derived, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path, tag, builders):
+    """The pickled builder results, or None when missing or stale."""
+    try:
+        with open(path, 'rb') as f:
+            header = pickle.load(f)
+            if header.get('tag') != tag or header.get('builders') != sorted(builders):
+                return None
+            if any(_module_digest(name) != digest for name, digest in header['modules'].items()):
+                return None
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"⚠️ Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    from app import store
+
+    path = store.write_snapshot()
+    print(f"✅ Wrote {path} for dataset version {store.version}")
@@ -59,10 +59,17 @@ document.addEventListener('DOMContentLoaded', function() {
   }
   
   // Load live homicide data
-  loadLiveHomicideData();
+  if (document.getElementById('homicideChart')) {
+    loadLiveHomicideData();
+  }
   
   // Load Telangana crime news
-  loadTelanganaNews();
+  if (document.getElementById('news-list')) {
+    loadTelanganaNews();
+  }
+
+  // Crime stats charts load their series only once scrolled into view
+  initLazyCharts();
 });
 
 // ============================================
@@ -192,6 +199,135 @@ function createHomicideChart(years, values) {
   });
 }
 
+// ============================================
+// LAZY CRIME STATS CHARTS - /api/series
+// ============================================
+function initLazyCharts() {
+  const container = document.getElementById('charts-container');
+  if (!container) return;
+
+  const sections = container.querySelectorAll('.chart-section[data-metric]');
+  const load = section => {
+    if (section.dataset.loaded) return;
+    section.dataset.loaded = 'true';
+    loadSeriesChart(container.dataset, section);
+  };
+
+  if (!('IntersectionObserver' in window)) {
+    sections.forEach(load);
+    return;
+  }
+
+  const observer = new IntersectionObserver(entries => {
+    entries.forEach(entry => {
+      if (entry.isIntersecting) {
+        observer.unobserve(entry.target);
+        load(entry.target);
+      }
+    });
+  }, { rootMargin: '200px' });
+  sections.forEach(section => observer.observe(section));
+}
+
+async function loadSeriesChart(options, section) {
+  const params = new URLSearchParams({
+    metric: section.dataset.metric,
+    from: options.from,
+    to: options.to,
+    fields: 'years,values',
+    v: options.version
+  });
+  if (options.country) params.set('country', options.country);
+
+  try {
+    const [data, trend] = await Promise.all([
+      fetch(`${options.seriesUrl}?${params}`).then(response => response.json()),
+      section.dataset.hasTrend ? loadTrend(options, section.dataset.metric) : null
+    ]);
+    const series = data.series[section.dataset.metric] || {};
+    createSeriesChart(section.querySelector('canvas'), section.dataset.chartIndex, series, trend);
+  } catch (error) {
+    console.error('Error fetching series:', error);
+  }
+}
+
+// The overlays are optional: without them the chart still shows the series
+async function loadTrend(options, metric) {
+  const params = new URLSearchParams({ metric: metric, v: options.version });
+  try {
+    const response = await fetch(`${options.trendsUrl}?${params}`);
+    return response.ok ? await response.json() : null;
+  } catch (error) {
+    console.error('Error fetching trend:', error);
+    return null;
+  }
+}
+
+function createSeriesChart(canvas, label, series, trend) {
+  if (!canvas) return;
+  const years = series.years || [];
+  const datasets = [{
+    label: label,
+    data: series.values || [],
+    backgroundColor: 'rgba(54, 162, 235, 0.3)',
+    borderColor: 'rgba(54, 162, 235, 1)',
+    borderWidth: 2,
+    pointRadius: 4,
+    fill: false
+  }];
+  let labels = years;
+
+  // Country pages fetch the server-side trend: rolling mean, forecast and
+  // anomaly years are drawn over the yearly values
+  if (trend) {
+    const byYear = (trendYears, values) => {
+      const lookup = new Map(trendYears.map((year, i) => [year, values[i]]));
+      return year => lookup.has(year) ? lookup.get(year) : null;
+    };
+    labels = years.concat(trend.forecast_years.filter(year => !years.includes(year)));
+    const anomalous = new Set(trend.anomaly_years);
+    datasets[0].data = labels.map(byYear(years, series.values || []));
+    datasets[0].pointRadius = labels.map(year => anomalous.has(year) ? 7 : 4);
+    datasets[0].pointBackgroundColor = labels.map(year => anomalous.has(year) ? 'rgba(255, 99, 132, 1)' : 'rgba(54, 162, 235, 0.3)');
+
+    datasets.push({
+      label: '3-year average',
+      data: labels.map(byYear(trend.years, trend.rolling_mean)),
+      borderColor: 'rgba(255, 206, 86, 1)',
+      borderWidth: 2,
+      pointRadius: 0,
+      fill: false
+    });
+    if (trend.forecast.some(value => value !== null)) {
+      // Starts at the last observed value so the dashed line joins the series
+      const forecast = byYear(trend.forecast_years, trend.forecast);
+      datasets.push({
+        label: 'Forecast',
+        data: labels.map(year => year === trend.latest_year ? trend.latest_value : forecast(year)),
+        borderColor: 'rgba(75, 192, 192, 1)',
+        borderDash: [6, 4],
+        borderWidth: 2,
+        pointRadius: 3,
+        fill: false
+      });
+    }
+  }
+
+  new Chart(canvas.getContext('2d'), {
+    type: 'line',
+    data: { labels: labels, datasets: datasets },
+    options: {
+      responsive: true,
+      spanGaps: true,
+      plugins: { legend: { labels: { color: '#e0e0e0' } } },
+      scales: {
+        y: { beginAtZero: true, title: { display: true, text: 'Crime Count', color: '#e0e0e0' }, ticks: { color: '#e0e0e0' } },
+        x: { title: { display: true, text: 'Year', color: '#e0e0e0' }, ticks: { color: '#e0e0e0' } }
+      }
+    }
+  });
+}
+
 // Update chart theme when toggled
 function updateChartTheme() {
   if (!homicideChart) return;
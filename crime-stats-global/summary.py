@@ -0,0 +1,91 @@
+import numpy as np
+
+# The cleaned file holds counts rather than per-100k rates, so the old fixed
+# 2/5 cut-offs would flag nearly every country; risk is instead bucketed by
+# tercile of the per-country averages of each metric.
+
+
+class SummaryEngine:
+    """Average, trend and risk level for every country and metric.
+
+    Rows are sorted by (Country, Year) once, so each country owns a
+    contiguous row range; all statistics are then computed for every country
+    and metric at once with ``reduceat`` over those ranges.
+    """
+
+    def __init__(self, df, metrics):
+        self.metrics = [m for m in metrics if m in df.columns]
+
+        df = df.dropna(subset=['Country', 'Year'])
+        df = df.assign(Country=df['Country'].astype(str)).sort_values(['Country', 'Year'], kind='stable')
+        countries = df['Country'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, countries[1:] != countries[:-1]]) if len(df) else np.array([], dtype=int)
+        ends = np.r_[starts[1:], len(df)]
+
+        self.countries = countries[starts].tolist()
+        self.row_ranges = {c: (int(s), int(e)) for c, s, e in zip(self.countries, starts, ends)}
+        self._country_index = {c: i for i, c in enumerate(self.countries)}
+
+        self._bulk = {m: [] for m in self.metrics}
+        if not len(df):
+            return
+
+        values = df[self.metrics].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(values)
+        rows = np.arange(len(df))[:, None]
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+        counts = np.add.reduceat(valid.astype(np.int64), starts, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            averages = np.round(sums / counts, 2)
+
+        first = np.minimum.reduceat(np.where(valid, rows, len(df)), starts, axis=0)
+        last = np.maximum.reduceat(np.where(valid, rows, -1), starts, axis=0)
+        has_value = counts > 0
+        first_values = np.take_along_axis(values, np.where(has_value, first, 0), axis=0)
+        last_values = np.take_along_axis(values, np.where(has_value, last, 0), axis=0)
+        trends = np.where(last_values > first_values, 'increasing',
+                          np.where(last_values < first_values, 'decreasing', 'stable'))
+
+        risks = np.empty(averages.shape, dtype=object)
+        for j, metric in enumerate(self.metrics):
+            column = averages[:, j]
+            if has_value[:, j].any():
+                low, high = np.nanpercentile(column, [100 / 3, 200 / 3])
+            else:
+                low = high = 0
+            risks[:, j] = np.where(column < low, 'Low', np.where(column < high, 'Medium', 'High'))
+
+        self.averages = averages
+        self.trends = trends
+        self.risks = risks
+        self.has_value = has_value
+        self._bulk = {
+            metric: [s for s in (self._summary(i, j) for i in range(len(self.countries))) if s is not None]
+            for j, metric in enumerate(self.metrics)
+        }
+
+    def _summary(self, i, j):
+        if not self.has_value[i, j]:
+            return None
+        return {
+            "country": self.countries[i],
+            "metric": self.metrics[j],
+            "average_rate": float(self.averages[i, j]),
+            "trend": str(self.trends[i, j]),
+            "risk_level": self.risks[i, j],
+        }
+
+    def summary(self, country, metric):
+        i = self._country_index.get(country)
+        if i is None or metric not in self.metrics:
+            return None
+        return self._summary(i, self.metrics.index(metric))
+
+    def country(self, country):
+        i = self._country_index.get(country)
+        if i is None:
+            return None
+        return {metric: self._summary(i, j) for j, metric in enumerate(self.metrics)}
+
+    def bulk(self, metric):
+        return self._bulk.get(metric)
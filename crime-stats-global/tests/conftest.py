@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# The app's modules import each other by bare name, as they do when run from
+# crime-stats-global/ under gunicorn or flask
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(APP_DIR), 'benchmarks'))
+
+
+@pytest.fixture
+def data_path():
+    """The cleaned dataset shipped with the app."""
+    return os.path.join(APP_DIR, 'static', 'data', 'cleaned_global_crime_data.csv')
+
+
+@pytest.fixture
+def upstreams():
+    """The local World Bank / Google News / CSV stand-ins from benchmarks/."""
+    from stub_upstreams import StubUpstreams
+
+    with StubUpstreams() as stub:
+        yield stub
@@ -0,0 +1,138 @@
+"""AggregateCube against the pandas code the routes ran per request before it.
+
+The ``old_*`` functions are the bodies of ``/``, ``/stats``, ``/map`` and
+``/country/<country>`` from before the cube, run on a float64 frame; the cube
+is built from the float32 frame the store loads, so values agree to float32
+precision.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import AggregateCube
+from data_store import read_dataset
+
+METRICS = [
+    'corruption_and_economic_crime',
+    'intentional_homicide',
+    'violent_and_sexual_crime',
+    'firearms_trafficking',
+    'access_and_functioning_of_justice',
+]
+YEARS = (2019, 2024)
+
+
+def old_index(df):
+    df = df[df['Year'].between(*YEARS)].copy()
+    countries = sorted(df['Country'].dropna().unique())
+    df['total_crime'] = df[METRICS].sum(axis=1)
+    top = df.groupby('Country')['total_crime'].sum().sort_values(ascending=False).head(20).reset_index()
+    return countries, top.to_dict(orient='records')
+
+
+def old_stats(df):
+    df = df[df['Year'].between(*YEARS)]
+    charts = {}
+    for metric in METRICS:
+        grouped = df.groupby('Year')[metric].sum().reset_index()
+        charts[metric] = {'years': grouped['Year'].tolist(), 'values': grouped[metric].tolist()}
+    return charts
+
+
+def old_map(df, metric='intentional_homicide', year=2023):
+    return df[df['Year'] == year].groupby('Country')[metric].sum().to_dict()
+
+
+def old_country(df, country):
+    df = df[(df['Country'] == country) & (df['Year'].astype(int).between(*YEARS))]
+    charts = {}
+    for metric in METRICS:
+        yearly = df[['Year', metric]].dropna().groupby('Year').sum().reset_index()
+        charts[metric] = {'years': yearly['Year'].tolist(), 'values': yearly[metric].tolist()}
+    return charts
+
+
+def synthetic_frame(seed=0):
+    """Gaps, NaNs and repeated (Country, Year) rows, which the shipped file lacks."""
+    rng = np.random.default_rng(seed)
+    rows = 3000
+    df = pd.DataFrame({
+        'Country': rng.choice([f"Country {i:03d}" for i in range(120)], rows),
+        'Year': rng.integers(2016, 2026, rows),
+    })
+    for metric in METRICS:
+        values = rng.gamma(2.0, 500.0, rows)
+        values[rng.random(rows) < 0.1] = np.nan
+        df[metric] = values
+    return df
+
+
+@pytest.fixture(params=['shipped', 'synthetic'])
+def frames(request, tmp_path, data_path):
+    if request.param == 'shipped':
+        df64 = pd.read_csv(data_path)
+        df64.columns = df64.columns.str.strip()
+        return df64, read_dataset(data_path)
+    df64 = synthetic_frame()
+    path = tmp_path / 'crime.csv'
+    df64.to_csv(path, index=False)
+    return pd.read_csv(path), read_dataset(path)
+
+
+def assert_close(actual, expected):
+    np.testing.assert_allclose(np.asarray(actual, dtype=np.float64), np.asarray(expected, dtype=np.float64),
+                               rtol=1e-6)
+
+
+def test_index(frames):
+    df64, df32 = frames
+    cube = AggregateCube(df32, METRICS)
+    countries, top = old_index(df64)
+
+    assert cube.country_list(*YEARS) == countries
+    cube_top = cube.top_countries(20, *YEARS)
+    assert [row['Country'] for row in cube_top] == [row['Country'] for row in top]
+    assert_close([row['total_crime'] for row in cube_top], [row['total_crime'] for row in top])
+
+
+def test_stats(frames):
+    df64, df32 = frames
+    cube = AggregateCube(df32, METRICS)
+    for metric, chart in old_stats(df64).items():
+        series = cube.series(metric, None, *YEARS)
+        assert series['years'] == chart['years']
+        assert_close(series['values'], chart['values'])
+
+
+def test_map(frames):
+    df64, df32 = frames
+    cube = AggregateCube(df32, METRICS)
+    expected = old_map(df64)
+    values = cube.by_country('intentional_homicide', 2023)
+    assert sorted(values) == sorted(expected)
+    assert_close([values[c] for c in sorted(values)], [expected[c] for c in sorted(values)])
+
+
+def test_country(frames):
+    df64, df32 = frames
+    cube = AggregateCube(df32, METRICS)
+    for country in cube.countries:
+        for metric, chart in old_country(df64, country).items():
+            series = cube.series(metric, country, *YEARS)
+            assert series['years'] == chart['years'], (country, metric)
+            assert_close(series['values'], chart['values'])
+
+
+def test_unknown_country(data_path):
+    cube = AggregateCube(read_dataset(data_path), METRICS)
+    assert cube.series('intentional_homicide', 'Atlantis', *YEARS) == {'years': [], 'values': []}
+
+
+def test_values_are_plain_float32(data_path):
+    cube = AggregateCube(read_dataset(data_path), METRICS)
+    values = (cube.series('intentional_homicide', 'Albania', *YEARS)['values']
+              + list(cube.by_country('intentional_homicide', 2023).values())
+              + [row['total_crime'] for row in cube.top_countries(20, *YEARS)])
+    for value in values:
+        # Same float32, written with no more digits than it holds
+        assert repr(value) == str(np.float32(value))
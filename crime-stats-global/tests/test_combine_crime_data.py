@@ -0,0 +1,137 @@
+"""Incremental ETL updates against a full rebuild, and their pickup by DatasetStore."""
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from columnar import columnar_path, columnar_version, read_columnar
+from combine_crime_data import SourceError, _delta_path, generate_merged_crime_data, update_merged_crime_data
+from data_store import DatasetStore, apply_delta, read_dataset
+from etl_benchmark import write_synthetic_sources
+
+
+@pytest.fixture
+def sources(tmp_path):
+    sources = write_synthetic_sources(str(tmp_path), 4000, countries=60)
+    # A country only one source reports, so dropping it there deletes its rows
+    homicide = pd.read_csv(sources['intentional_homicide'])
+    extra = homicide.head(3).assign(Country='Atlantis', Year=[2001, 2002, 2003])
+    pd.concat([homicide, extra]).to_csv(sources['intentional_homicide'], index=False)
+    return sources
+
+
+def build(tmp_path, name, sources, update=False):
+    directory = tmp_path / name
+    directory.mkdir(exist_ok=True)
+    output = str(directory / 'global_crime_data.csv')
+    run = update_merged_crime_data if update else generate_merged_crime_data
+    run(sources, output, workers=1, cache_dir=str(directory / 'cache'))
+    return output
+
+
+def edit_source(path, seed=1):
+    rng = np.random.default_rng(seed)
+    df = pd.read_csv(path)
+    changed = rng.random(len(df)) < 0.05
+    df.loc[changed, 'VALUE'] = rng.gamma(2.0, 500.0, changed.sum()).round(3)
+    df = df[df['Country'] != 'Atlantis']
+    new = df.head(2).assign(Country='Lemuria', Year=[2010, 2011])
+    pd.concat([df, new]).to_csv(path, index=False)
+
+
+def test_incremental_update_matches_full_rebuild(tmp_path, sources):
+    incremental = build(tmp_path, 'incremental', sources)
+    previous = read_dataset(incremental)
+
+    edit_source(sources['intentional_homicide'])
+    build(tmp_path, 'incremental', sources, update=True)
+    full = build(tmp_path, 'full', sources)
+
+    with open(incremental, 'rb') as a, open(full, 'rb') as b:
+        assert a.read() == b.read()
+    pd.testing.assert_frame_equal(read_columnar(columnar_path(incremental))[0],
+                                  read_columnar(columnar_path(full))[0])
+
+    with open(_delta_path(incremental)) as f:
+        delta = json.load(f)
+    assert [country for country, year in delta['deletes']] == ['Atlantis'] * 3
+    assert {'Lemuria'} <= {row['Country'] for row in delta['upserts']}
+    pd.testing.assert_frame_equal(apply_delta(previous, delta), read_dataset(full))
+
+
+def test_unchanged_sources_are_a_no_op(tmp_path, sources):
+    output = build(tmp_path, 'out', sources)
+    with open(output, 'rb') as f:
+        before = f.read()
+    assert update_merged_crime_data(sources, output, workers=1, cache_dir=str(tmp_path / 'out' / 'cache')) is None
+    with open(output, 'rb') as f:
+        assert f.read() == before
+    assert not os.path.exists(_delta_path(output))
+
+
+def test_full_rebuild_drops_stale_delta(tmp_path, sources):
+    output = build(tmp_path, 'out', sources)
+    edit_source(sources['intentional_homicide'])
+    build(tmp_path, 'out', sources, update=True)
+    assert os.path.exists(_delta_path(output))
+    build(tmp_path, 'out', sources)
+    assert not os.path.exists(_delta_path(output))
+
+
+@pytest.mark.parametrize('columnar', [True, False], ids=['columnar', 'csv'])
+def test_store_applies_delta_instead_of_reloading(tmp_path, sources, capsys, columnar):
+    output = build(tmp_path, 'out', sources)
+    if not columnar:
+        shutil.rmtree(columnar_path(output))
+    store = DatasetStore(output, url=None, builders={'rows': len}, check_interval=0)
+    store.get()
+
+    edit_source(sources['intentional_homicide'])
+    build(tmp_path, 'out', sources, update=True)
+    if not columnar:
+        shutil.rmtree(columnar_path(output))
+    capsys.readouterr()
+    dataset = store.get()
+
+    assert '🧩 Applied delta' in capsys.readouterr().out
+    expected = read_columnar(columnar_path(build(tmp_path, 'full', sources)))[0]
+    pd.testing.assert_frame_equal(dataset.df, expected)
+    assert dataset.derived['rows'] == len(expected)
+
+
+def test_store_ignores_delta_for_another_version(tmp_path, sources, capsys):
+    output = build(tmp_path, 'out', sources)
+    edit_source(sources['intentional_homicide'])
+    build(tmp_path, 'out', sources, update=True)
+
+    # A store that starts after the update has nothing the delta applies to
+    store = DatasetStore(output, url=None, check_interval=0)
+    dataset = store.get()
+    assert '🧩 Applied delta' not in capsys.readouterr().out
+    pd.testing.assert_frame_equal(dataset.df, read_columnar(columnar_path(output))[0])
+    assert store._source_tag == f"cols:{columnar_version(columnar_path(output))}"
+
+
+def snapshot_outputs(output):
+    columnar = columnar_path(output)
+    paths = [output, _delta_path(output)] + [os.path.join(columnar, name) for name in sorted(os.listdir(columnar))]
+    return {path: open(path, 'rb').read() for path in paths if os.path.exists(path)}
+
+
+@pytest.mark.parametrize('update', [False, True], ids=['full', 'incremental'])
+@pytest.mark.parametrize('breakage', ['missing', 'empty'])
+def test_unusable_source_publishes_nothing(tmp_path, sources, update, breakage):
+    output = build(tmp_path, 'out', sources)
+    before = snapshot_outputs(output)
+
+    path = sources['firearms_trafficking']
+    if breakage == 'missing':
+        os.remove(path)
+    else:
+        pd.read_csv(path).head(0).to_csv(path, index=False)
+    with pytest.raises(SourceError, match='firearms_trafficking'):
+        build(tmp_path, 'out', sources, update=update)
+    assert snapshot_outputs(output) == before
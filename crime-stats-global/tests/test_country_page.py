@@ -0,0 +1,29 @@
+"""The country page prints the trend fit; its chart overlays are fetched."""
+import re
+
+import pytest
+
+import app as crime_app
+
+
+@pytest.fixture
+def client():
+    return crime_app.app.test_client()
+
+
+def test_page_carries_only_the_printed_trend_figures(client):
+    html = client.get('/country/Albania').get_data(as_text=True)
+    assert 'rolling_mean' not in html and 'yoy_changes' not in html
+    assert len(re.findall(r'<p class="trend">📈 Trend: [+-]\d', html)) == 5
+    assert 'data-trends-url="/api/trends/Albania"' in html
+    assert len(html.encode()) < 6500
+
+
+def test_trend_url_serves_the_chart_overlays(client):
+    html = client.get('/country/Albania').get_data(as_text=True)
+    url = re.search(r'data-trends-url="([^"]+)"', html).group(1)
+    metric = re.search(r'data-metric="([^"]+)"\s+data-has-trend', html).group(1)
+    trend = client.get(f"{url}?metric={metric}").get_json()
+    assert {'years', 'rolling_mean', 'forecast_years', 'forecast', 'anomaly_years',
+            'latest_year', 'latest_value'} <= set(trend)
+    assert len(trend['years']) == len(trend['rolling_mean'])
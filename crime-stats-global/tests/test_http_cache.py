@@ -0,0 +1,156 @@
+"""ResponseCache on a throwaway Flask app, with a version the tests can bump."""
+import gzip
+
+import pytest
+from flask import Flask, abort
+
+from http_cache import ResponseCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BODY = '{"values": [%s]}' % ', '.join(str(i) for i in range(400))
+LOADED_AT = 1_700_000_000
+
+
+class Site:
+    def __init__(self):
+        self.version = 'v1'
+        self.renders = 0
+        self.cache = ResponseCache(version=lambda: self.version, last_modified=lambda: LOADED_AT,
+                                   max_entries=3)
+        self.app = Flask(__name__)
+
+        @self.app.route('/data')
+        @self.cache.cached
+        def data():
+            self.renders += 1
+            return self.app.response_class(BODY, mimetype='application/json')
+
+        @self.app.route('/item/<int:n>')
+        @self.cache.cached
+        def item(n):
+            self.renders += 1
+            if n > 100:
+                abort(404)
+            if n == 0:
+                return {"error": "bad item"}, 400
+            return {"item": n}
+
+        self.client = self.app.test_client()
+
+
+@pytest.fixture
+def site():
+    return Site()
+
+
+ENCODINGS = [
+    pytest.param(None, id='identity'),
+    pytest.param('gzip', id='gzip'),
+    pytest.param('br', id='br', marks=pytest.mark.skipif(brotli is None, reason='brotli not installed')),
+]
+
+
+def decode(response):
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        return gzip.decompress(response.data).decode()
+    if encoding == 'br':
+        return brotli.decompress(response.data).decode()
+    return response.get_data(as_text=True)
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_etag_revalidates_per_encoding(site, encoding):
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    first = site.client.get('/data', headers=headers)
+    assert first.status_code == 200
+    assert first.headers.get('Content-Encoding') == encoding
+    assert decode(first) == BODY
+    assert 'Accept-Encoding' in first.headers['Vary']
+    etag = first.headers['ETag']
+    assert etag.endswith(f'-{encoding}"') if encoding else '-' not in etag
+
+    again = site.client.get('/data', headers={**headers, 'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert site.renders == 1
+
+    # Another encoding's tag names different bytes, so it must not match
+    other = 'identity' if encoding else 'gzip'
+    mismatch = site.client.get('/data', headers={'Accept-Encoding': other, 'If-None-Match': etag})
+    assert mismatch.status_code == 200
+    assert decode(mismatch) == BODY
+    assert site.renders == 1
+    assert site.cache.stats()['not_modified'] == 1
+
+
+def test_if_modified_since(site):
+    first = site.client.get('/data')
+    assert first.last_modified.timestamp() == LOADED_AT
+    current = site.client.get('/data', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert current.status_code == 304
+    stale = site.client.get('/data', headers={'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'})
+    assert stale.status_code == 200
+    assert site.renders == 1
+
+
+def test_new_version_renders_again(site):
+    etag = site.client.get('/data').headers['ETag']
+    site.version = 'v2'
+    assert site.client.get('/data', headers={'If-None-Match': etag}).status_code == 304
+    assert site.renders == 2
+
+
+def test_lru_evicts_least_recently_used(site):
+    for n in (1, 2, 3):
+        site.client.get(f'/item/{n}')
+    site.client.get('/item/1')
+    site.client.get('/item/4')
+    assert site.cache.stats()['entries'] == 3
+    assert site.renders == 4
+
+    site.client.get('/item/1')
+    assert site.renders == 4
+    site.client.get('/item/2')
+    assert site.renders == 5
+
+
+def test_pinned_version_is_immutable(site):
+    pinned = site.client.get('/data?v=v1')
+    assert pinned.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert site.client.get('/data').headers['Cache-Control'] == 'no-cache'
+    assert site.client.get('/data?v=v0').headers['Cache-Control'] == 'no-cache'
+
+
+@pytest.mark.parametrize('n, status', [(0, 400), (999, 404)])
+def test_errors_are_not_cached(site, n, status):
+    for _ in range(2):
+        response = site.client.get(f'/item/{n}')
+        assert response.status_code == status
+        assert 'ETag' not in response.headers
+    assert site.renders == 2
+    assert site.cache.stats()['entries'] == 0
+
+
+def test_head_sends_no_body_bytes(site):
+    site.client.get('/data')
+    sent = site.cache.stats()['bytes_sent']
+    assert sent == len(BODY)
+
+    head = site.client.head('/data')
+    assert head.status_code == 200
+    assert head.data == b''
+    stats = site.cache.stats()
+    assert stats['bytes_sent'] == sent
+    assert stats['bytes_saved'] == 0
+
+
+def test_gzip_bytes_saved(site):
+    response = site.client.get('/data', headers={'Accept-Encoding': 'gzip'})
+    stats = site.cache.stats()
+    assert stats['bytes_sent'] == len(response.data)
+    assert stats['bytes_saved'] == len(BODY) - len(response.data)
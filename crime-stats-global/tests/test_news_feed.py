@@ -0,0 +1,70 @@
+"""FeedRefresher against the stub Google News feed."""
+import time
+
+import pytest
+import requests
+
+import news_feed
+from news_feed import FeedRefresher
+
+
+@pytest.fixture
+def refresher(upstreams, monkeypatch):
+    monkeypatch.setattr(news_feed, 'GOOGLE_NEWS_RSS', f"{upstreams.url}/rss/search")
+    session = requests.Session()
+    refresher = FeedRefresher(lambda: session, interval=600, timeout=(1, 2), first_wait=1.0)
+    refresher.register("Telangana", "Telangana crime police Hyderabad")
+    return refresher
+
+
+def test_first_request_waits_for_first_fetch(refresher, upstreams):
+    upstreams.latency = 0.2
+    payload = refresher.payload("Telangana")
+    assert payload["count"] == 10
+    assert payload["fetched_at"]
+    assert upstreams.calls['rss'] == 1
+
+    # Later requests read the refreshed payload without fetching
+    assert refresher.payload("Telangana") is payload
+    assert upstreams.calls['rss'] == 1
+
+
+def test_first_wait_is_bounded(refresher, upstreams):
+    upstreams.latency = 3
+    started = time.monotonic()
+    payload = refresher.payload("Telangana")
+    assert time.monotonic() - started < 2
+    assert payload["count"] == 0
+
+
+def test_failed_first_fetch_is_not_waited_on_again(refresher, upstreams):
+    upstreams.failing.add('rss')
+    assert refresher.payload("Telangana")["count"] == 0
+    started = time.monotonic()
+    assert refresher.payload("Telangana")["count"] == 0
+    assert time.monotonic() - started < 0.1
+    assert upstreams.calls['rss'] == 1
+
+
+def test_started_refresher_never_blocks_a_request(refresher, upstreams):
+    upstreams.latency = 0.5
+    refresher.start()
+    started = time.monotonic()
+    assert refresher.payload("Telangana")["count"] == 0
+    assert time.monotonic() - started < 0.1
+    wait_for = time.monotonic() + 3
+    while refresher.payload("Telangana")["count"] == 0:
+        assert time.monotonic() < wait_for, "timed out"
+        time.sleep(0.05)
+    assert upstreams.calls['rss'] == 1
+
+
+def test_refresh_uses_conditional_get(refresher, upstreams):
+    first = refresher.payload("Telangana")
+    refresher.refresh_all()
+    assert upstreams.calls['not_modified'] == 1
+    assert refresher.payload("Telangana")["articles"] == first["articles"]
+
+
+def test_unknown_region(refresher):
+    assert refresher.payload("Atlantis") is None
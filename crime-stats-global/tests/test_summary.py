@@ -0,0 +1,118 @@
+"""SummaryEngine against a per-country pandas reference on a synthetic frame."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from summary import SummaryEngine
+
+METRICS = ['intentional_homicide', 'firearms_trafficking']
+
+
+def synthetic_frame(seed=0):
+    """Unsorted rows, repeated years, all-NaN metrics and a missing Country."""
+    rng = np.random.default_rng(seed)
+    rows = 600
+    df = pd.DataFrame({
+        'Country': rng.choice([f"Country {i:02d}" for i in range(30)], rows),
+        'Year': rng.integers(2015, 2025, rows),
+    })
+    for metric in METRICS:
+        values = rng.gamma(2.0, 100.0, rows)
+        values[rng.random(rows) < 0.3] = np.nan
+        df[metric] = values
+    df.loc[df['Country'] == 'Country 07', 'firearms_trafficking'] = np.nan
+    df.loc[5, 'Country'] = None
+    return df
+
+
+def reference(df, metric):
+    df = df.dropna(subset=['Country', 'Year']).sort_values(['Country', 'Year'], kind='stable')
+    averages, trends = {}, {}
+    for country, rows in df.groupby('Country', sort=True):
+        values = rows[metric].dropna()
+        if values.empty:
+            continue
+        averages[country] = round(values.mean(), 2)
+        first, last = values.iloc[0], values.iloc[-1]
+        trends[country] = 'increasing' if last > first else 'decreasing' if last < first else 'stable'
+    return averages, trends
+
+
+@pytest.fixture
+def frame():
+    return synthetic_frame()
+
+
+@pytest.fixture
+def engine(frame):
+    return SummaryEngine(frame, METRICS + ['not_a_column'])
+
+
+def test_row_ranges_cover_each_country_contiguously(frame, engine):
+    ordered = frame.dropna(subset=['Country', 'Year']).sort_values(['Country', 'Year'], kind='stable')
+    countries = ordered['Country'].to_numpy()
+    assert engine.countries == sorted(set(countries))
+    position = 0
+    for country in engine.countries:
+        start, end = engine.row_ranges[country]
+        assert start == position
+        assert (countries[start:end] == country).all()
+        position = end
+    assert position == len(ordered)
+
+
+@pytest.mark.parametrize('metric', METRICS)
+def test_average_and_trend_match_reference(frame, engine, metric):
+    averages, trends = reference(frame, metric)
+    bulk = engine.bulk(metric)
+    assert [s['country'] for s in bulk] == list(averages)
+    for s in bulk:
+        assert s['average_rate'] == pytest.approx(averages[s['country']])
+        assert s['trend'] == trends[s['country']]
+
+
+def test_trend_uses_first_and_last_valid_year():
+    df = pd.DataFrame({
+        'Country': ['A'] * 4 + ['B'] * 3 + ['C'] * 2,
+        'Year': [2021, 2019, 2020, 2022, 2019, 2020, 2021, 2019, 2020],
+        'intentional_homicide': [np.nan, np.nan, 5.0, 3.0, 4.0, 9.0, np.nan, 2.0, 2.0],
+    })
+    engine = SummaryEngine(df, ['intentional_homicide'])
+    assert engine.summary('A', 'intentional_homicide')['trend'] == 'decreasing'
+    assert engine.summary('B', 'intentional_homicide')['trend'] == 'increasing'
+    assert engine.summary('C', 'intentional_homicide')['trend'] == 'stable'
+
+
+def test_risk_levels_are_terciles_of_country_averages():
+    df = pd.DataFrame({
+        'Country': list('ABCDEF') + ['G'],
+        'Year': [2020] * 7,
+        'intentional_homicide': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, np.nan],
+    })
+    engine = SummaryEngine(df, ['intentional_homicide'])
+    risks = {s['country']: s['risk_level'] for s in engine.bulk('intentional_homicide')}
+    assert risks == {'A': 'Low', 'B': 'Low', 'C': 'Medium', 'D': 'Medium', 'E': 'High', 'F': 'High'}
+    assert engine.summary('G', 'intentional_homicide') is None
+
+
+def test_all_nan_metric_is_left_out(engine):
+    assert engine.summary('Country 07', 'firearms_trafficking') is None
+    assert engine.country('Country 07')['firearms_trafficking'] is None
+    assert engine.country('Country 07')['intentional_homicide'] is not None
+    assert 'Country 07' not in {s['country'] for s in engine.bulk('firearms_trafficking')}
+
+
+def test_unknown_country_or_metric(engine):
+    assert engine.metrics == METRICS
+    assert engine.summary('Atlantis', 'intentional_homicide') is None
+    assert engine.summary('Country 01', 'not_a_column') is None
+    assert engine.country('Atlantis') is None
+    assert engine.bulk('not_a_column') is None
+
+
+def test_empty_frame():
+    engine = SummaryEngine(pd.DataFrame({'Country': [], 'Year': [], 'intentional_homicide': []}),
+                           ['intentional_homicide'])
+    assert engine.countries == []
+    assert engine.bulk('intentional_homicide') == []
+    assert engine.summary('A', 'intentional_homicide') is None
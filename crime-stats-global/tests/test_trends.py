@@ -0,0 +1,140 @@
+"""TrendEngine against per-series pandas/numpy code on a synthetic frame.
+
+The reference is the per-country loop from ``benchmarks/trends_benchmark.py``
+(``rolling``, ``pct_change`` and ``np.polyfit`` on each series reindexed to
+the full year range), extended to the r2, forecasts and pooled anomaly
+z-scores the engine also serves.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as crime_app
+from trends import TrendEngine
+
+METRICS = ['intentional_homicide', 'firearms_trafficking']
+WINDOW, HORIZON, Z = 3, 3, 2.5
+
+
+def synthetic_frame(seed=0):
+    """Drifting series with gaps, NaNs, repeated (Country, Year) rows and spikes."""
+    rng = np.random.default_rng(seed)
+    countries, years = 40, np.arange(2013, 2025)
+    df = pd.DataFrame({
+        'Country': np.repeat([f"Country {i:02d}" for i in range(countries)], len(years)),
+        'Year': np.tile(years, countries),
+    })
+    drift = rng.normal(0, 0.1, countries).repeat(len(years)) * np.tile(np.arange(len(years)), countries)
+    for metric in METRICS:
+        values = rng.gamma(4.0, 100.0, len(df)) * np.exp(drift)
+        values[rng.random(len(df)) < 0.1] = np.nan
+        values[rng.random(len(df)) < 0.01] *= 20
+        df[metric] = values
+    df = df.drop(rng.choice(len(df), 40, replace=False))
+    return pd.concat([df, df.sample(30, random_state=seed)], ignore_index=True)
+
+
+def reference(df, years):
+    """Per (metric, country) series and figures, computed one series at a time."""
+    sums = df.groupby(['Country', 'Year'])[METRICS].sum(min_count=1)
+    series, log_changes = {}, {m: [] for m in METRICS}
+    for country, rows in sums.groupby(level='Country'):
+        rows = rows.droplevel('Country').reindex(years)
+        for metric in METRICS:
+            s = rows[metric]
+            series[metric, country] = s
+            log_changes[metric].append(np.log(s / s.shift(1)))
+    pooled = {m: pd.concat(c) for m, c in log_changes.items()}
+
+    figures = {}
+    for (metric, country), s in series.items():
+        observed = s.dropna()
+        if observed.empty:
+            continue
+        f = {
+            'values': s.to_numpy(),
+            'rolling': s.rolling(WINDOW).mean().to_numpy(),
+            'yoy': s.pct_change(fill_method=None).to_numpy(),
+            'z': ((np.log(s / s.shift(1)) - pooled[metric].mean()) / pooled[metric].std(ddof=0)).to_numpy(),
+            'slope': np.nan, 'r2': np.nan, 'forecast': [np.nan] * HORIZON,
+        }
+        if len(observed) >= 2:
+            slope, intercept = np.polyfit(observed.index, observed.to_numpy(), 1)
+            fitted = intercept + slope * observed.index.to_numpy()
+            sst = ((observed - observed.mean()) ** 2).sum()
+            f['slope'] = slope
+            f['r2'] = 1 - ((observed - fitted) ** 2).sum() / sst
+            if len(observed) >= 3:
+                future = years[-1] + np.arange(1, HORIZON + 1)
+                f['forecast'] = np.maximum(intercept + slope * future, 0)
+        figures[metric, country] = f
+    return figures
+
+
+@pytest.fixture(scope='module')
+def frame():
+    return synthetic_frame()
+
+
+@pytest.fixture(scope='module')
+def engine(frame):
+    return TrendEngine(frame, METRICS, window=WINDOW, horizon=HORIZON, z_threshold=Z)
+
+
+@pytest.fixture(scope='module')
+def expected(frame, engine):
+    return reference(frame, engine.years)
+
+
+def assert_close(actual, expected):
+    np.testing.assert_allclose(np.asarray(actual, dtype=np.float64), np.asarray(expected, dtype=np.float64),
+                               rtol=1e-7, atol=1e-9)
+
+
+def test_series_figures_match_pandas(engine, expected):
+    assert len(expected) == sum(len(engine.bulk(m)) for m in METRICS)
+    for (metric, country), f in expected.items():
+        j, i = engine.metrics.index(metric), engine.countries.index(country)
+        assert_close(engine.values[j, i], f['values'])
+        assert_close(engine.rolling[j, i], f['rolling'])
+        assert_close(engine.yoy[j, i], f['yoy'])
+        assert_close(engine.anomaly_z[j, i], f['z'])
+        assert_close(engine.slope[j, i], f['slope'])
+        assert_close(engine.r2[j, i], f['r2'])
+        assert_close(engine.forecast[j, i], f['forecast'])
+
+
+def test_served_rows_match_pandas(engine, expected):
+    flagged = 0
+    for (metric, country), f in expected.items():
+        detail = engine.country(country, metric)
+        observed = np.flatnonzero(~np.isnan(f['values']))
+        span = slice(observed[0], observed[-1] + 1)
+        anomaly_years = [int(y) for y, z in zip(engine.years, f['z']) if abs(z) >= Z]
+        flagged += len(anomaly_years)
+
+        assert detail['years'] == engine.years[span].tolist()
+        assert detail['latest_year'] == int(engine.years[observed[-1]])
+        assert detail['latest_value'] == pytest.approx(f['values'][observed[-1]], abs=0.006)
+        assert detail['anomaly_years'] == anomaly_years
+        assert [a['year'] for a in detail['anomalies']] == anomaly_years
+        for served, value in zip(detail['rolling_mean'], f['rolling'][span]):
+            assert served is None if np.isnan(value) else served == pytest.approx(value, abs=0.006)
+        for served, value in zip(detail['forecast'], f['forecast']):
+            assert served is None if np.isnan(value) else served == pytest.approx(value, abs=0.006)
+    # The spikes make sure the anomaly comparison is not vacuous
+    assert flagged > 0
+
+
+@pytest.mark.parametrize('path, status', [
+    ('/api/trends?metric=intentional_homicide', 200),
+    ('/api/trends?metric=nope', 400),
+    ('/api/trends/Albania?metric=intentional_homicide', 200),
+    ('/api/trends/Albania?metric=nope', 400),
+    ('/api/trends/Atlantis', 404),
+])
+def test_trend_routes(path, status):
+    response = crime_app.app.test_client().get(path)
+    assert response.status_code == status
+    assert response.mimetype == 'application/json'
+    assert response.get_json()
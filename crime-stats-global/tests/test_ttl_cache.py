@@ -0,0 +1,112 @@
+"""SWRCache in front of the real World Bank fetch, against the local stub server."""
+import threading
+import time
+
+import pytest
+
+import app as crime_app
+from ttl_cache import SWRCache
+
+
+@pytest.fixture
+def fetch(upstreams, monkeypatch):
+    monkeypatch.setattr(crime_app, 'WORLDBANK_API', f"{upstreams.url}/v2")
+    return crime_app.fetch_live_homicide
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_concurrent_misses_share_one_upstream_call(fetch, upstreams):
+    upstreams.latency = 0.2
+    cache = SWRCache(fetch, ttl=60)
+    start = threading.Barrier(8)
+    results = []
+
+    def request():
+        start.wait()
+        results.append(cache.get('IN'))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert upstreams.calls['worldbank'] == 1
+    assert len(results) == 8 and all(r == results[0] for r in results)
+    assert len(results[0]['years']) == 25
+    assert cache.misses == 8
+
+
+def test_failure_is_cached_as_fallback(fetch, upstreams):
+    upstreams.failing.add('worldbank')
+    cache = SWRCache(fetch, ttl=60, error_ttl=60, fallback=lambda key: {"years": [], "values": []})
+
+    assert cache.get('IN') == {"years": [], "values": []}
+    assert cache.get('IN') == {"years": [], "values": []}
+    assert upstreams.calls['worldbank'] == 1
+
+    # Retried once error_ttl is over
+    cache.error_ttl = 0
+    cache.invalidate('IN')
+    upstreams.failing.clear()
+    assert len(cache.get('IN')['years']) == 25
+    assert upstreams.calls['worldbank'] == 2
+
+
+def test_failure_without_fallback_raises(fetch, upstreams):
+    upstreams.failing.add('worldbank')
+    cache = SWRCache(fetch, ttl=60)
+    with pytest.raises(Exception, match='503'):
+        cache.get('IN')
+    upstreams.failing.clear()
+    assert len(cache.get('IN')['years']) == 25
+
+
+def test_failed_refresh_keeps_last_good_value(fetch, upstreams):
+    cache = SWRCache(fetch, ttl=0.05, stale_ttl=60, error_ttl=60, fallback=lambda key: {"years": [], "values": []})
+    good = cache.get('IN')
+    time.sleep(0.1)
+
+    upstreams.failing.add('worldbank')
+    assert cache.get('IN') == good
+    wait_for(lambda: not cache._inflight)
+    assert upstreams.calls['worldbank'] == 2
+    # The failure pushed the next retry out by error_ttl, still serving the good copy
+    assert cache.get('IN') == good
+    assert upstreams.calls['worldbank'] == 2
+
+
+def test_stale_value_is_served_while_revalidating(fetch, upstreams):
+    cache = SWRCache(fetch, ttl=0.05, stale_ttl=60)
+    first = cache.get('IN')
+    time.sleep(0.1)
+
+    upstreams.latency = 0.3
+    started = time.monotonic()
+    assert cache.get('IN') == first
+    assert time.monotonic() - started < 0.2, "stale hit waited for the refresh"
+    assert cache.stale_hits == 1
+
+    # Only one background refresh however many stale hits arrive meanwhile
+    for _ in range(5):
+        cache.get('IN')
+    wait_for(lambda: not cache._inflight)
+    assert upstreams.calls['worldbank'] == 2
+    hits = cache.hits
+    cache.get('IN')
+    assert cache.hits == hits + 1
+
+
+def test_expired_stale_value_is_a_blocking_miss(fetch, upstreams):
+    cache = SWRCache(fetch, ttl=0.01, stale_ttl=0.01)
+    cache.get('IN')
+    time.sleep(0.05)
+    cache.get('IN')
+    assert cache.misses == 2 and cache.stale_hits == 0
+    assert upstreams.calls['worldbank'] == 2
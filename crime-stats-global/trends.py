@@ -0,0 +1,175 @@
+import numpy as np
+
+# Series are at most six years long, too short for a z-score within one
+# series to flag anything (the largest possible is about 2), so anomalies are
+# scored against every year-over-year change of the metric across countries.
+
+
+class TrendEngine:
+    """Rolling means, year-over-year change, trend lines, anomalies and forecasts.
+
+    Values are pivoted once into a ``(metrics, countries, years)`` array over
+    a contiguous year range, NaN where a country has no value, and every
+    statistic is computed for all series at once along the year axis:
+
+    * ``rolling``: trailing mean over ``window`` years, where all have a value,
+    * ``yoy``: change on the previous year, as a fraction of it,
+    * ``slope``/``intercept``/``r2``: least-squares line per series of two
+      or more values, with the slope per year,
+    * ``anomaly_z``: z-score of each year's log change against all changes
+      of the metric,
+    * ``forecast``: the line ``horizon`` years past the last year of the
+      data, for series of three or more values, floored at 0.
+    """
+
+    def __init__(self, df, metrics, window=3, horizon=3, z_threshold=2.5):
+        self.metrics = [m for m in metrics if m in df.columns]
+        self.window = window
+        self.z_threshold = z_threshold
+
+        df = df.dropna(subset=['Country', 'Year'])
+        sums = df.groupby([df['Country'].astype(str), 'Year'])[self.metrics].sum(min_count=1)
+        country_codes, countries = sums.index.get_level_values(0).factorize(sort=True)
+        self.countries = countries.tolist()
+        self._country_index = {c: i for i, c in enumerate(self.countries)}
+
+        self._bulk = {m: [] for m in self.metrics}
+        self._rows = {m: {} for m in self.metrics}
+        if not len(sums):
+            return
+
+        year_codes = sums.index.get_level_values(1).to_numpy().astype(np.int64)
+        self.years = np.arange(year_codes.min(), year_codes.max() + 1)
+        self.forecast_years = self.years[-1] + np.arange(1, horizon + 1)
+        values = np.full((len(self.metrics), len(self.countries), len(self.years)), np.nan)
+        values[:, country_codes, year_codes - self.years[0]] = sums.to_numpy(dtype=np.float64).T
+        self.values = values
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self._compute(values)
+            for metric, rows in zip(self.metrics, self._bulk_rows()):
+                self._bulk[metric] = rows
+                self._rows[metric] = {row["country"]: row for row in rows}
+
+    def _compute(self, values):
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+        self.n = n = valid.sum(axis=-1)
+
+        # Rolling mean from running sums of values and of value counts
+        w = self.window
+        pad = np.zeros(values.shape[:-1] + (1,))
+        running = np.concatenate([pad, np.cumsum(filled, axis=-1)], axis=-1)
+        counts = np.concatenate([pad, np.cumsum(valid, axis=-1)], axis=-1)
+        self.rolling = np.full(values.shape, np.nan)
+        if values.shape[-1] >= w:
+            complete = counts[..., w:] - counts[..., :-w] == w
+            self.rolling[..., w - 1:] = np.where(complete, (running[..., w:] - running[..., :-w]) / w, np.nan)
+
+        previous, current = values[..., :-1], values[..., 1:]
+        self.yoy = np.full(values.shape, np.nan)
+        self.yoy[..., 1:] = np.where(previous > 0, (current - previous) / previous, np.nan)
+
+        # Least squares from masked sums, with years centred so they stay small
+        x = self.years - self.years.mean()
+        sx = (valid * x).sum(axis=-1)
+        sxx = (valid * x * x).sum(axis=-1)
+        sy = filled.sum(axis=-1)
+        sxy = (filled * x).sum(axis=-1)
+        denominator = n * sxx - sx * sx
+        fit = (n >= 2) & (denominator > 0)
+        self.slope = np.where(fit, (n * sxy - sx * sy) / denominator, np.nan)
+        self.intercept = np.where(fit, (sy - self.slope * sx) / n, np.nan)
+        self.mean = sy / n
+        fitted = self.intercept[..., None] + self.slope[..., None] * x
+        ssr = np.where(valid, (values - fitted) ** 2, 0.0).sum(axis=-1)
+        sst = np.where(valid, (values - self.mean[..., None]) ** 2, 0.0).sum(axis=-1)
+        self.r2 = np.where(fit & (sst > 0), 1 - ssr / sst, np.nan)
+
+        log_change = np.full(values.shape, np.nan)
+        log_change[..., 1:] = np.where((previous > 0) & (current > 0), np.log(current / previous), np.nan)
+        pooled = log_change.reshape(len(self.metrics), -1)
+        mu = np.nanmean(pooled, axis=1)[:, None, None]
+        sd = np.nanstd(pooled, axis=1)[:, None, None]
+        self.anomaly_z = np.where(sd > 0, (log_change - mu) / sd, np.nan)
+
+        future = self.forecast_years - self.years.mean()
+        forecast = self.intercept[..., None] + self.slope[..., None] * future
+        self.forecast = np.where((n >= 3)[..., None], np.maximum(forecast, 0.0), np.nan)
+
+    def _bulk_rows(self):
+        """Fit and latest figures of every series, as one list per metric."""
+        years = self.years.tolist()
+        valid = ~np.isnan(self.values)
+        latest = valid.shape[-1] - 1 - np.argmax(valid[..., ::-1], axis=-1)
+
+        def at_latest(a):
+            return np.take_along_axis(a, latest[..., None], axis=-1)[..., 0]
+
+        # Anomalies are rare, so their years are collected from the flagged cells only
+        anomaly_years = [[[] for _ in self.countries] for _ in self.metrics]
+        for j, i, k in zip(*(a.tolist() for a in np.nonzero(np.abs(self.anomaly_z) >= self.z_threshold))):
+            anomaly_years[j][i].append(years[k])
+
+        columns = zip(
+            _listify(self.slope), _listify(self.slope / self.mean * 100), _listify(self.r2, 3),
+            self.years[latest].tolist(), _listify(at_latest(self.values)), _listify(at_latest(self.yoy), 4),
+            anomaly_years, _listify(self.forecast), self.n.tolist(),
+        )
+        for metric, metric_columns in zip(self.metrics, columns):
+            yield [
+                {
+                    "country": country,
+                    "metric": metric,
+                    "slope": slope,
+                    "slope_pct": slope_pct,
+                    "r2": r2,
+                    "latest_year": year,
+                    "latest_value": value,
+                    "yoy_change": yoy,
+                    "anomaly_years": flagged,
+                    "forecast": forecast,
+                }
+                for country, slope, slope_pct, r2, year, value, yoy, flagged, forecast, n
+                in zip(self.countries, *metric_columns) if n
+            ]
+
+    def _detail(self, j, i):
+        row = self._rows[self.metrics[j]].get(self.countries[i])
+        if row is None:
+            return None
+        observed = np.flatnonzero(~np.isnan(self.values[j, i]))
+        span = slice(observed[0], observed[-1] + 1)
+        years = self.years[span].tolist()
+        z = self.anomaly_z[j, i, span]
+        flagged = np.flatnonzero(np.abs(z) >= self.z_threshold).tolist()
+        z = np.round(z, 2).tolist()
+        yoy = _listify(self.yoy[j, i, span], 4)
+        return dict(
+            row,
+            years=years,
+            values=_listify(self.values[j, i, span]),
+            rolling_mean=_listify(self.rolling[j, i, span]),
+            yoy_changes=yoy,
+            anomalies=[{"year": years[k], "z": z[k], "yoy_change": yoy[k]} for k in flagged],
+            forecast_years=self.forecast_years.tolist(),
+        )
+
+    def country(self, country, metric=None):
+        """Yearly values and trend figures of one country, per metric or for ``metric``."""
+        i = self._country_index.get(country)
+        if i is None:
+            return None
+        if metric is not None:
+            return self._detail(self.metrics.index(metric), i) if metric in self.metrics else None
+        return {m: self._detail(j, i) for j, m in enumerate(self.metrics)}
+
+    def bulk(self, metric):
+        return self._bulk.get(metric)
+
+
+def _listify(values, digits=2):
+    """Rounded (nested) lists of ``values`` with None for NaN, ready for JSON."""
+    rounded = np.round(values, digits).astype(object)
+    rounded[np.isnan(values)] = None
+    return rounded.tolist()
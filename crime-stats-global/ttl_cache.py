@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until", "failed")
+
+    def __init__(self, value, fresh_until, stale_until, failed=False):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.failed = failed
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SWRCache:
+    """TTL cache with stale-while-revalidate and negative caching.
+
+    ``loader(key)`` fetches a fresh value. Within ``ttl`` an entry is served
+    as is; for a further ``stale_ttl`` it is still served while one background
+    thread refreshes it. If the loader raises, ``fallback(key)`` is cached for
+    ``error_ttl`` (or the stale value is kept, when there is one), so a dead
+    upstream is not hammered. Concurrent misses on the same key share a
+    single loader call.
+    """
+
+    def __init__(self, loader, ttl, stale_ttl=0, error_ttl=60, fallback=None, max_entries=256):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.error_ttl = error_ttl
+        self.fallback = fallback
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if now < entry.fresh_until:
+                    self.hits += 1
+                    return entry.value
+                if now < entry.stale_until:
+                    self.stale_hits += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = _Flight()
+                        threading.Thread(target=self._load, args=(key,), daemon=True).start()
+                    return entry.value
+            self.misses += 1
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if leader:
+            self._load(key)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _load(self, key):
+        flight = self._inflight[key]
+        try:
+            value = self.loader(key)
+            now = time.monotonic()
+            entry = _Entry(value, now + self.ttl, now + self.ttl + self.stale_ttl)
+        except Exception as e:
+            print(f"⚠️ Refresh of {key!r} failed: {e}")
+            now = time.monotonic()
+            with self._lock:
+                previous = self._entries.get(key)
+            if previous is not None and not previous.failed:
+                # Keep serving the last good value, but retry sooner
+                value = previous.value
+                entry = _Entry(value, now + self.error_ttl, max(previous.stale_until, now + self.error_ttl))
+            elif self.fallback is not None:
+                value = self.fallback(key)
+                entry = _Entry(value, now + self.error_ttl, now + self.error_ttl, failed=True)
+            else:
+                flight.error = e
+                entry = None
+                value = None
+
+        with self._lock:
+            if entry is not None:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            del self._inflight[key]
+        flight.value = value
+        flight.done.set()
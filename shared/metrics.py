@@ -0,0 +1,308 @@
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, before_render_template, g, request, template_rendered
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return list(self._values.items())
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            return [(key, [list(counts), total]) for key, (counts, total) in self._values.items()]
+
+
+class _Timer:
+    """Observes the elapsed time as a ``with`` block or around a function."""
+
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+    def __call__(self, fn):
+        def wrapper(*args, **kwargs):
+            with _Timer(self.histogram, self.labels):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = getattr(fn, "__name__", "timed")
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+
+
+class _Callback:
+    """A metric whose samples are read from existing counters at scrape time."""
+
+    def __init__(self, name, help, kind, labelnames, read):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._read = read
+
+    def samples(self):
+        return [(tuple(str(v) for v in key), value) for key, value in self._read().items()]
+
+
+class Registry:
+    """Counters and histograms for one app, rendered in the Prometheus text format.
+
+    Every gunicorn worker has its own registry. When ``directory`` is set,
+    each worker also writes a snapshot there every ``flush_interval``
+    seconds and at exit, and ``render()`` merges them, so a scrape served
+    by any worker covers the whole app. Empty the directory when the app is
+    deployed; snapshots of workers that have since exited keep counting.
+    """
+
+    def __init__(self, directory=None, flush_interval=5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.metrics = {}
+        self.phases = self.histogram("app_phase_duration_seconds", "Time spent in each phase of request handling.",
+                                     ["phase"])
+        self._lock = threading.Lock()
+        self._pid = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self.flush)
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name, help, labelnames, read, kind="counter"):
+        """Expose ``read()``, a dict of label tuple -> value, as a metric."""
+        return self._add(_Callback(name, help, kind, labelnames, read))
+
+    def timed(self, phase):
+        return self.phases.time(phase=phase)
+
+    def _add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        families = {}
+        for metric in list(self.metrics.values()):
+            families[metric.name] = {
+                "kind": metric.kind,
+                "help": metric.help,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "samples": [[list(key), value] for key, value in metric.samples()],
+            }
+        return families
+
+    def ensure_started(self):
+        # One flush thread per process, started after any gunicorn fork
+        if not self.directory or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"⚠️ Failed to write metrics snapshot: {e}")
+
+    def flush(self):
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def render(self):
+        if not self.directory:
+            return render_families(self.snapshot())
+        self.flush()
+        merged = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    merge_families(merged, json.load(f))
+            except (OSError, ValueError):
+                continue
+        return render_families(merged)
+
+
+def merge_families(into, families):
+    for name, family in families.items():
+        target = into.setdefault(name, dict(family, samples=[]))
+        index = {tuple(labels): i for i, (labels, _) in enumerate(target["samples"])}
+        for labels, value in family["samples"]:
+            i = index.get(tuple(labels))
+            if i is None:
+                index[tuple(labels)] = len(target["samples"])
+                target["samples"].append([labels, value])
+            elif family["kind"] == "histogram":
+                counts, total = target["samples"][i][1]
+                target["samples"][i][1] = [[a + b for a, b in zip(counts, value[0])], total + value[1]]
+            else:
+                target["samples"][i][1] += value
+    return into
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def render_families(families):
+    lines = []
+    for name, family in sorted(families.items()):
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['kind']}")
+        names = family["labelnames"]
+        for values, value in sorted(family["samples"]):
+            if family["kind"] != "histogram":
+                lines.append(f"{name}{_labels(names, values)} {value}")
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(family["buckets"] + ["+Inf"], counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                lines.append(f"{name}_bucket{_labels(names, values, ('le', le))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, values)} {total}")
+            lines.append(f"{name}_count{_labels(names, values)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Times every request at the WSGI layer, and profiles the ones that ask.
+
+    The route label is the matched URL rule, recorded by a ``before_request``
+    hook, so ``/country/<country>`` is one series rather than one per country.
+    """
+
+    def __init__(self, wsgi_app, registry, profiler=None):
+        self.wsgi_app = wsgi_app
+        self.registry = registry
+        self.profiler = profiler
+        self.latency = registry.histogram("http_request_duration_seconds", "Request latency by route.",
+                                          ["route", "method"])
+        self.responses = registry.counter("http_responses_total", "Responses by route and status.",
+                                          ["route", "method", "status"])
+
+    def __call__(self, environ, start_response):
+        session = None
+        if self.profiler is not None and self.profiler.wanted(environ):
+            session = self.profiler.start(environ)
+        status = []
+
+        def recording_start_response(status_line, headers, exc_info=None):
+            status.append(status_line.split(" ", 1)[0])
+            if session is not None:
+                headers = headers + [("X-Profile-Stacks", session.name)]
+            return start_response(status_line, headers, exc_info)
+
+        started = time.perf_counter()
+        try:
+            return self.wsgi_app(environ, recording_start_response)
+        finally:
+            elapsed = time.perf_counter() - started
+            if session is not None:
+                self.profiler.finish(session)
+            route = environ.get("metrics.route", "unmatched")
+            method = environ.get("REQUEST_METHOD", "")
+            self.latency.observe(elapsed, route=route, method=method)
+            self.responses.inc(route=route, method=method, status=status[0] if status else "500")
+
+
+def instrument(app, registry, profiler=None, path="/metrics"):
+    """Request metrics, template render timing and a ``/metrics`` endpoint for ``app``."""
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app, registry, profiler)
+
+    def record_route():
+        rule = request.url_rule
+        request.environ["metrics.route"] = rule.rule if rule is not None else "unmatched"
+        registry.ensure_started()
+
+    # First, so later hooks that return early still have the route recorded
+    app.before_request_funcs.setdefault(None, []).insert(0, record_route)
+
+    def render_started(sender, **extra):
+        g._render_started = time.perf_counter()
+
+    def render_finished(sender, **extra):
+        started = g.pop("_render_started", None)
+        if started is not None:
+            registry.phases.observe(time.perf_counter() - started, phase="render")
+
+    before_render_template.connect(render_started, app, weak=False)
+    template_rendered.connect(render_finished, app, weak=False)
+
+    def metrics_view():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    app.add_url_rule(path, "metrics", metrics_view)
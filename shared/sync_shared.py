@@ -0,0 +1,65 @@
+"""Copy the modules shared by the apps into each app's directory.
+
+Every app is deployed from its own directory, so each carries a copy of
+these modules, but they are only edited here. Run after changing one:
+
+    python shared/sync_shared.py          # rewrite the copies
+    python shared/sync_shared.py --check  # exit 1 if any copy is out of date
+"""
+import argparse
+import os
+import sys
+
+SHARED_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(SHARED_DIR)
+MODULES = ['metrics.py', 'profiler.py']
+APPS = ['crime-stats-global', 'Guess_the_Number']
+HEADER = "# Generated from shared/{name} by shared/sync_shared.py; edit that file, not this copy.\n"
+
+
+def expected(name):
+    with open(os.path.join(SHARED_DIR, name), encoding='utf-8') as f:
+        return HEADER.format(name=name) + f.read()
+
+
+def stale(apps=APPS):
+    """Paths of the copies that differ from what the shared module generates."""
+    paths = []
+    for name in MODULES:
+        content = expected(name)
+        for app in apps:
+            path = os.path.join(ROOT, app, name)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    current = f.read()
+            except FileNotFoundError:
+                current = None
+            if current != content:
+                paths.append(path)
+    return paths
+
+
+def sync(apps=APPS):
+    for name in MODULES:
+        content = expected(name)
+        for app in apps:
+            with open(os.path.join(ROOT, app, name), 'w', encoding='utf-8') as f:
+                f.write(content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--check', action='store_true', help='only report out-of-date copies')
+    args = parser.parse_args()
+
+    paths = stale()
+    if args.check:
+        for path in paths:
+            print(f"❌ {os.path.relpath(path, ROOT)} is out of date, run python shared/sync_shared.py")
+        sys.exit(1 if paths else 0)
+    sync()
+    print(f"✅ Synced {len(MODULES)} module(s) into {', '.join(APPS)}")
+
+
+if __name__ == '__main__':
+    main()